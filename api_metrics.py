@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Where does the time of a run go? Every call of ImmichClient.request ends up in here, per
+# workflow, method and endpoint (UUIDs in the path replaced by {id}), with status codes,
+# bytes and latencies. main.py --metrics prints it, --metrics-file writes it for the node
+# exporter (*.prom, textfile collector format) or as JSON (anything else).
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from reused_tools import sizeof_fmt
+
+_UUID = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "immich_help"
+
+
+def endpoint_of(path: str) -> str:
+    """
+    :param path: relative API path like "albums/<UUID>/assets"
+    :return: the same with every UUID replaced, "albums/{id}/assets"
+    """
+    return _UUID.sub("{id}", path.strip("/").split("?", 1)[0])
+
+
+def quantile(sorted_values: list, q: float) -> float:
+    """
+    Nearest rank, no interpolation, with a few hundred calls that is plenty
+
+    :param sorted_values: ascending list, not empty
+    :param q: between 0 and 1
+    :return: the value at that rank
+    """
+    # ! not round(), that rounds half to even and picks the rank above whenever q * n is odd
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+class ApiMetrics:
+    """
+    Counters and latencies of the calls, one bucket per (workflow, method, endpoint). Thread
+    safe, the workers of concurrent_map all record into the same instance.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.workflow = "main" # label of the calls recorded from now on, see start()
+        self.buckets: dict[tuple[str, str, str], dict] = {}
+
+    def start(self, workflow: str) -> None:
+        """
+        Calls recorded after this belong to that workflow, there is only one running at a time
+
+        :param workflow: name like "tags" or "video_seperation"
+        """
+        with self.lock:
+            self.workflow = workflow
+
+    def record(self, method: str, path: str, status: int | str, seconds: float,
+               bytes_out: int = 0, bytes_in: int = 0) -> None:
+        """
+        :param method: HTTP verb
+        :param path: relative API path, see endpoint_of()
+        :param status: HTTP status code or "error" if there was no response at all
+        :param seconds: time until the response (the headers for streamed ones)
+        :param bytes_out: request body size
+        :param bytes_in: response body size
+        """
+        key = (self.workflow, method, endpoint_of(path))
+        with self.lock:
+            if (bucket := self.buckets.get(key)) is None:
+                bucket = self.buckets[key] = {'statuses': Counter(), 'latencies': [], 'bytes_out': 0, 'bytes_in': 0}
+            bucket['statuses'][str(status)] += 1
+            bucket['latencies'].append(seconds)
+            bucket['bytes_out'] += bytes_out
+            bucket['bytes_in'] += bytes_in
+
+    def reset(self) -> None:
+        with self.lock:
+            self.buckets.clear()
+
+    def summary(self, workflow: str | None = None) -> list[dict]:
+        """
+        :param workflow: only this workflow, None for all
+        :return: one dictionary per bucket {'workflow', 'method', 'endpoint', 'count', 'statuses',
+                 'bytes_out', 'bytes_in', 'seconds', 'p50', 'p95', 'p99'}, busiest endpoints first
+        """
+        with self.lock:
+            buckets = [(key, dict(bucket, latencies=sorted(bucket['latencies']), statuses=dict(bucket['statuses'])))
+                       for key, bucket in self.buckets.items() if workflow is None or key[0] == workflow]
+        rows = []
+        for (flow, method, endpoint), bucket in buckets:
+            latencies = bucket['latencies']
+            row = {'workflow': flow, 'method': method, 'endpoint': endpoint, 'count': len(latencies),
+                   'statuses': bucket['statuses'], 'bytes_out': bucket['bytes_out'], 'bytes_in': bucket['bytes_in'],
+                   'seconds': sum(latencies)}
+            for q in QUANTILES:
+                row[f"p{round(q * 100)}"] = quantile(latencies, q)
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+    def table(self, workflow: str | None = None) -> str:
+        """
+        :param workflow: only this workflow, None for all
+        :return: a plain text table for the console
+        """
+        rows = self.summary(workflow)
+        lines = [f"{"Method":<7}{"Endpoint":<28}{"Calls":>7}  {"Status":<18}{"Out":>10}{"In":>10}"
+                 f"{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"Total s":>9}"]
+        for row in rows:
+            statuses = " ".join(f"{status}:{count}" for status, count in sorted(row['statuses'].items()))
+            lines.append(f"{row['method']:<7}{row['endpoint'][:27]:<28}{row['count']:>7}  {statuses:<18}"
+                         f"{sizeof_fmt(row['bytes_out']):>10}{sizeof_fmt(row['bytes_in']):>10}"
+                         f"{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}{row['p99'] * 1000:>9.1f}"
+                         f"{row['seconds']:>9.2f}")
+        if not rows:
+            lines.append("(no API calls)")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps({'endpoints': self.summary()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        :return: all buckets in the text exposition format of the node exporter textfile collector
+        """
+        requests_lines, bytes_lines, duration_lines = [], [], []
+        for row in sorted(self.summary(), key=lambda row: (row['workflow'], row['endpoint'], row['method'])):
+            labels = f'workflow="{row['workflow']}",method="{row['method']}",endpoint="{row['endpoint']}"'
+            for status, count in sorted(row['statuses'].items()):
+                requests_lines.append(f'{METRIC_PREFIX}_requests_total{{{labels},status="{status}"}} {count}')
+            bytes_lines.append(f'{METRIC_PREFIX}_bytes_total{{{labels},direction="out"}} {row['bytes_out']}')
+            bytes_lines.append(f'{METRIC_PREFIX}_bytes_total{{{labels},direction="in"}} {row['bytes_in']}')
+            for q in QUANTILES:
+                duration_lines.append(f'{METRIC_PREFIX}_request_duration_seconds{{{labels},quantile="{q}"}} '
+                                      f'{row[f"p{round(q * 100)}"]:.6f}')
+            duration_lines.append(f"{METRIC_PREFIX}_request_duration_seconds_sum{{{labels}}} {row['seconds']:.6f}")
+            duration_lines.append(f"{METRIC_PREFIX}_request_duration_seconds_count{{{labels}}} {row['count']}")
+        return "\n".join([
+            f"# HELP {METRIC_PREFIX}_requests_total API calls by endpoint and status code",
+            f"# TYPE {METRIC_PREFIX}_requests_total counter", *requests_lines,
+            f"# HELP {METRIC_PREFIX}_bytes_total Body bytes sent (out) and received (in)",
+            f"# TYPE {METRIC_PREFIX}_bytes_total counter", *bytes_lines,
+            f"# HELP {METRIC_PREFIX}_request_duration_seconds Latency of the API calls",
+            f"# TYPE {METRIC_PREFIX}_request_duration_seconds summary", *duration_lines,
+        ]) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes everything recorded so far, *.prom in the Prometheus format, anything else as JSON.
+        Written to a temporary file first and then renamed, the node exporter never sees half a file
+
+        :param path: target file
+        """
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(f"{path}.tmp", "w") as metrics_io:
+            metrics_io.write(text)
+        os.replace(f"{path}.tmp", path)
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
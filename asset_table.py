@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# A dictionary per asset ({'createdAt': "2022-..", 'fileSize': 123, 'fileName': ".."}) costs
+# several hundred bytes, with 100k assets that adds up and summing over it is slow. AssetTable
+# keeps one column per field instead: interned UUIDs, type codes and integer sizes and epoch
+# milliseconds in typed arrays. A single asset is only built as AssetRecord when asked for.
+
+import sys
+from array import array
+from datetime import datetime, timezone
+
+TYPES = ("IMAGE", "VIDEO", "AUDIO", "OTHER") # position is the type code in the table
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+_SORT_KEYS = ('size', 'created', 'name')
+
+
+def to_epoch_ms(iso: str | None) -> int:
+    """
+    :param iso: ISO date like 2022-04-01T12:00:00.000Z, without offset it counts as UTC
+    :return: milliseconds since 1970, 0 if there is no (readable) date
+    """
+    if not iso:
+        return 0
+    try:
+        moment = datetime.fromisoformat(iso)
+    except ValueError:
+        return 0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def from_epoch_ms(millis: int) -> str:
+    """
+    :return: ISO date in UTC like 2022-04-01T12:00:00.000+00:00, empty for 0
+    """
+    if not millis:
+        return ""
+    return datetime.fromtimestamp(millis / 1000, timezone.utc).isoformat(timespec='milliseconds')
+
+
+class AssetRecord:
+    """
+    One row of an AssetTable, only made when a single asset is looked at
+    """
+    __slots__ = ('id', 'type', 'size', 'created', 'name')
+
+    def __init__(self, asset_id: str, asset_type: str, size: int, created: int, name: str):
+        self.id = asset_id
+        self.type = asset_type
+        self.size = size
+        self.created = created # epoch milliseconds
+        self.name = name
+
+    @property
+    def created_at(self) -> str:
+        return from_epoch_ms(self.created)
+
+
+class AssetTable:
+    """
+    Assets as parallel columns, every UUID only once (adding it again does nothing). Iteration
+    for sums and filters runs over the typed arrays, not over objects.
+    """
+    __slots__ = ('ids', 'types', 'sizes', 'created', 'names', '_rows')
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.types = array('B')
+        self.sizes = array('q')
+        self.created = array('q')
+        self.names: list[str] = []
+        self._rows: dict[str, int] = {} # UUID -> row, for the deduplication
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._rows
+
+    def add(self, asset_id: str, asset_type: str, size: int | str | None, created_at: str | int | None,
+            name: str) -> bool:
+        """
+        :param asset_id: UUID
+        :param asset_type: IMAGE, VIDEO..
+        :param size: file size in bytes, the API sometimes has it as string
+        :param created_at: ISO date or epoch milliseconds
+        :param name: original file name
+        :return: False if the asset was already in the table
+        """
+        if asset_id in self._rows:
+            return False
+        asset_id = sys.intern(asset_id) # * the same UUID shows up in several albums and tables
+        self._rows[asset_id] = len(self.ids)
+        self.ids.append(asset_id)
+        self.types.append(_TYPE_CODES.get(asset_type, _TYPE_CODES["OTHER"]))
+        self.sizes.append(int(size or 0))
+        self.created.append(created_at if isinstance(created_at, int) else to_epoch_ms(created_at))
+        self.names.append(name)
+        return True
+
+    def extend(self, other: "AssetTable") -> int:
+        """
+        :param other: table whose rows are added, duplicates are skipped
+        :return: number of rows that were new
+        """
+        added = 0
+        for row, asset_id in enumerate(other.ids):
+            if asset_id not in self._rows:
+                self.add(asset_id, TYPES[other.types[row]], other.sizes[row], other.created[row], other.names[row])
+                added += 1
+        return added
+
+    def record(self, row: int) -> AssetRecord:
+        return AssetRecord(self.ids[row], TYPES[self.types[row]], self.sizes[row], self.created[row], self.names[row])
+
+    def records(self, rows=None):
+        """
+        :param rows: row numbers, like from where() or sorted_rows(), None for all in insertion order
+        :return: generator of AssetRecord
+        """
+        for row in range(len(self.ids)) if rows is None else rows:
+            yield self.record(row)
+
+    def total_size(self, rows=None) -> int:
+        """
+        :param rows: only these rows, None for all
+        :return: sum of the file sizes in bytes
+        """
+        if rows is None:
+            return sum(self.sizes)
+        sizes = self.sizes
+        return sum(sizes[row] for row in rows)
+
+    def where(self, asset_type: str | None = None, min_size: int = 0, created_from: int | None = None,
+              created_until: int | None = None) -> list[int]:
+        """
+        Row numbers of the assets matching every given condition
+
+        :param asset_type: like "VIDEO"
+        :param min_size: at least that many bytes
+        :param created_from: epoch milliseconds, inclusive
+        :param created_until: epoch milliseconds, exclusive
+        :return: list of row numbers in insertion order
+        """
+        rows = range(len(self.ids))
+        if asset_type is not None:
+            code = _TYPE_CODES.get(asset_type, _TYPE_CODES["OTHER"])
+            types = self.types
+            rows = [row for row in rows if types[row] == code]
+        if min_size:
+            sizes = self.sizes
+            rows = [row for row in rows if sizes[row] >= min_size]
+        if created_from is not None or created_until is not None:
+            created = self.created
+            low = created_from if created_from is not None else -2 ** 63
+            high = created_until if created_until is not None else 2 ** 63 - 1
+            rows = [row for row in rows if low <= created[row] < high]
+        return list(rows)
+
+    def sorted_rows(self, key: str = "created", reverse: bool = False, rows=None) -> list[int]:
+        """
+        :param key: 'size', 'created' or 'name'
+        :param reverse: largest / newest / last first
+        :param rows: only these rows, None for all
+        :return: row numbers in that order
+        """
+        if key not in _SORT_KEYS:
+            raise ValueError(f"Can only sort by {", ".join(_SORT_KEYS)}, not {key}")
+        column = {'size': self.sizes, 'created': self.created, 'name': self.names}[key]
+        return sorted(range(len(self.ids)) if rows is None else rows, key=column.__getitem__, reverse=reverse)
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Headless side of main.py, everything that runs without a single input(), for cron and friends.
+#
+#   python main.py tags --regex "^0\.\d+ km" --yes
+#   python main.py retime --album <UUID> --yes
+#   python main.py retime --library --yes
+#   python main.py videos --album <UUID> --album <UUID> --name "Camera Videos" --yes
+#   python main.py rollback --file TagRollback20250101_120000.jsonl.gz --yes
+#   python main.py stats --csv stats/library --json library.json
+#   python main.py batch nightly.txt
+#
+# A batch file has one job per line in exactly that syntax (without "python main.py"),
+# empty lines and lines starting with # are ignored. All jobs share one connection pool
+# and one permission lookup.
+
+import argparse
+import os
+import shlex
+
+import requests
+
+import console_garnish as cg
+from immich_client import client_for
+
+JOB_PERMISSIONS = {
+    'tags': ["asset.read", "tag.read", "tag.delete"],
+    'retime': ["album.read", "asset.read", "asset.update"],
+    'videos': ["album.read", "album.create", "albumAsset.create"],
+    'rollback': ["asset.read", "tag.read", "tag.create", "tag.asset"],
+    'stats': ["asset.read", "album.read"],
+}
+
+
+def add_job_parsers(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the headless subcommands to the main parser
+
+    :param parser: the parser of main.py
+    """
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+    p_tags = sub.add_parser("tags", help="delete tags matching a regex")
+    p_tags.add_argument("--regex", required=True, action="append",
+                        help="python regex the tag names or paths have to match, can be given several times")
+    p_tags.add_argument("--workers", type=int, default=8, help="parallel calls for the rollback snapshot")
+    p_tags.add_argument("--snapshot", choices=("auto", "sweep", "per_tag"), default="auto",
+                        help="how the rollback snapshot is collected")
+    p_retime = sub.add_parser("retime", help="set the dates of the pictures of an album from their names")
+    p_retime_source = p_retime.add_mutually_exclusive_group(required=True)
+    p_retime_source.add_argument("--album", help="Immich Album UUID")
+    p_retime_source.add_argument("--library", action="store_true",
+                                 help="the whole library, only assets whose date doesn't match their name")
+    p_retime.add_argument("--sequence-order", action="store_true",
+                          help="keep the order of one day by the WA#### counter, one call per asset")
+    p_videos = sub.add_parser("videos", help="put all videos of an album in a new album")
+    p_videos.add_argument("--album", action="append", help="Immich Album UUID of a mixed album, can be given several times")
+    p_videos.add_argument("--albums-matching", metavar="REGEX",
+                          help="also every album whose name matches, \"\" for all albums")
+    p_videos.add_argument("--name", required=True, help="name of the new album")
+    p_rollback = sub.add_parser("rollback", help="restore the tags of a TagRollback file")
+    p_rollback.add_argument("--file", required=True, help="TagRollback*.json or TagRollback*.jsonl.gz")
+    p_stats = sub.add_parser("stats", help="sizes per album, type, year and month, needs numpy")
+    p_stats.add_argument("--csv", metavar="PREFIX", help="write one CSV per table, like PREFIX_by_album.csv")
+    p_stats.add_argument("--json", metavar="FILE", help="write the whole report as JSON")
+    p_batch = sub.add_parser("batch", help="run many jobs from a file, one per line")
+    p_batch.add_argument("file", help="batch file")
+    for job_parser in (p_tags, p_retime, p_videos, p_rollback, p_stats, p_batch):
+        job_parser.add_argument("--yes", action="store_true", help="actually do it, otherwise it is a dry run")
+
+
+def load_batch_file(parser: argparse.ArgumentParser, path: str, assume_yes: bool = False) -> list:
+    """
+    Parses every line of a batch file with the same parser as the command line
+
+    :param parser: the parser of main.py
+    :param path: batch file
+    :param assume_yes: --yes on the batch command counts for every job inside
+    :return: list of argparse.Namespace, one per job
+    """
+    jobs = []
+    with open(path, "r") as batch_io:
+        for line_no, line in enumerate(batch_io, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            job = parser.parse_args(shlex.split(line))
+            if job.command in (None, "batch"):
+                parser.error(f"{path}:{line_no}: expected one of {", ".join(JOB_PERMISSIONS)}")
+            job.yes = job.yes or assume_yes
+            jobs.append(job)
+    return jobs
+
+
+def headless_credentials(retrieve) -> dict | None:
+    """
+    Credentials without asking, from IMMICH_INSTANCE / IMMICH_API_KEY or the api_key.json
+
+    :param retrieve: main.retrieve_api_key, handed in to not import main here
+    :return: Credential dictionary {'instance': <url>, 'api_key': <key>} or None
+    """
+    if os.environ.get("IMMICH_INSTANCE") and os.environ.get("IMMICH_API_KEY"):
+        return {'instance': os.environ["IMMICH_INSTANCE"], 'api_key': os.environ["IMMICH_API_KEY"]}
+    creds = retrieve(test_only=True)
+    return creds or None
+
+
+def fetch_permissions(creds: dict) -> list | None:
+    """
+    The one permission lookup every job of a run shares
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: list of permissions of the key or None if endpoint or key don't work
+    """
+    try:
+        resp = client_for(creds).api_key_info()
+    except requests.exceptions.ConnectionError:
+        return None
+    if resp.status_code != 200 or resp.text[:15] == "<!doctype html>":
+        return None
+    return resp.json().get('permissions', [])
+
+
+def missing_permissions(needed: list, granted: list) -> list:
+    """
+    :param needed: permissions a job needs
+    :param granted: permissions of the API key, 'all' covers everything
+    :return: the ones that are missing
+    """
+    if "all" in granted:
+        return []
+    return [perm for perm in needed if perm not in granted]
+
+
+def run_job(creds: dict, granted: list, job: argparse.Namespace) -> bool:
+    """
+    Runs one job, the workflow modules are only imported when a job needs them
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param granted: permissions of the API key, looked up once for all jobs
+    :param job: parsed arguments of one job
+    :return: True if the job went fine
+    """
+    if missing := missing_permissions(JOB_PERMISSIONS[job.command], granted):
+        print(cg.color(f"[{job.command}] Permissions are missing: {", ".join(missing)}", "pure_red"))
+        return False
+    if job.command == "tags":
+        from tag_delete_by_regex import tag_delete_headless
+        return tag_delete_headless(creds, job.regex, job.yes, job.workers, job.snapshot)
+    if job.command == "retime":
+        from retime_whatsapp_pictures import retime_headless
+        return retime_headless(creds, job.album, job.yes, job.sequence_order)
+    if job.command == "videos":
+        from video_seperation import video_seperation_headless
+        if not job.album and job.albums_matching is None:
+            print(cg.color("[videos] Needs --album or --albums-matching", "pure_red"))
+            return False
+        return video_seperation_headless(creds, job.album, job.name, job.yes, job.albums_matching)
+    if job.command == "rollback":
+        from tag_rollback import tag_rollback_headless
+        return tag_rollback_headless(creds, job.file, job.yes)
+    if job.command == "stats":
+        from library_stats import library_stats_headless
+        return library_stats_headless(creds, job.csv, job.json)
+    raise ValueError(f"Unknown job {job.command}")
+
+
+def run_jobs(creds: dict, granted: list, jobs: list, show_metrics: bool = False) -> int:
+    """
+    Runs all jobs one after another, a failed job doesn't stop the next one
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param granted: permissions of the API key
+    :param jobs: list of parsed jobs
+    :param show_metrics: print the API calls of every job after it
+    :return: number of failed jobs
+    """
+    failed = 0
+    metrics = client_for(creds).metrics
+    for i, job in enumerate(jobs, 1):
+        print(cg.color(f"Job {i}/{len(jobs)}: {job.command}", "bold"))
+        label = job.command if len(jobs) == 1 else f"{i}_{job.command}" # * two tags jobs shouldn't mix
+        metrics.start(label)
+        try:
+            ok = run_job(creds, granted, job)
+        except Exception as err: # * one broken job shouldn't take the rest of the night with it
+            print(cg.color(f"[{job.command}] crashed: {err!r}", "pure_red"))
+            ok = False
+        failed += not ok
+        if show_metrics:
+            print(metrics.table(label))
+    print(f"{len(jobs) - failed} of {len(jobs)} jobs went fine.")
+    return failed
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
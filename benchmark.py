@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Benchmarks against the fake instance in fake_immich.py, never against a real one.
+# Run like: python benchmark.py client --calls 2000
+#           python benchmark.py startup --runs 10
+#           python benchmark.py dates --names 1000000
+#           python benchmark.py rss --assets 200000
+#           python benchmark.py assets --assets 200000
+#           python benchmark.py stats --assets 3000000
+#           python benchmark.py suite --scales 1000 10000 100000 --latency 0.005 --throttle 0.01
+
+import argparse
+import collections
+import contextlib
+import glob
+import heapq
+import io
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+import requests
+
+from asset_table import AssetTable, to_epoch_ms
+from fake_immich import FakeImmichServer, FaultInjection, build_library
+from filename_dates import extract_dates
+from immich_client import ImmichClient, client_for, close_all_clients
+from library_stats import LibraryRows, compute_stats
+
+
+def _report(label: str, calls: int, seconds: float, unit: str = "calls", rate: str = "req/s", note: str = "") -> None:
+    print(f"{label:<28} {calls:>7} {unit} {seconds:>8.3f} s {calls / seconds:>10.1f} {rate} {note}".rstrip())
+
+
+def bench_client(calls: int) -> None:
+    """
+    Old style requests.request per call versus the pooled ImmichClient, same endpoint, same count
+    """
+    with FakeImmichServer(build_library(assets=100, tags=100)) as fake:
+        creds = fake.creds
+        headers = {'Accept': 'application/json', 'x-api-key': creds['api_key']}
+        start = time.perf_counter()
+        for _ in range(calls):
+            requests.request("GET", creds['instance'] + "api-keys/me", headers=headers, data={})
+        _report("requests.request (before)", calls, time.perf_counter() - start)
+
+        client = ImmichClient.from_creds(creds)
+        start = time.perf_counter()
+        for _ in range(calls):
+            client.get("api-keys/me")
+        _report("ImmichClient (after)", calls, time.perf_counter() - start)
+        client.close()
+
+
+def bench_startup(runs: int) -> None:
+    """
+    Starts main.py like a user would (api_key.json in the working directory, 0 to exit at the
+    menu) and measures from process start to the first API call and to the menu being printed.
+    The import time of the workflow modules is what the menu no longer has to wait for.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    first_request, to_menu = [], []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(runs):
+            library = build_library(assets=10, tags=10, albums=1)
+            with FakeImmichServer(library) as fake:
+                with open(os.path.join(work_dir, "api_key.json"), "w") as key_io:
+                    json.dump(fake.creds, key_io)
+                start = time.perf_counter()
+                proc = subprocess.Popen([sys.executable, "-u", os.path.join(here, "main.py")], cwd=work_dir,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                for line in proc.stdout:
+                    if "Choose a scripted process" in line:
+                        to_menu.append(time.perf_counter() - start)
+                        break
+                proc.communicate("0\n")
+                if library.first_request_at is not None:
+                    first_request.append(library.first_request_at - start)
+    workflows = "import tag_delete_by_regex, retime_whatsapp_pictures, tag_rollback, video_seperation"
+    imports = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", workflows], cwd=here, check=True)
+        after_workflows = time.perf_counter() - start
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import immich_client"], cwd=here, check=True)
+        imports.append(after_workflows - (time.perf_counter() - start))
+    print(f"{"time to first request":<28} {statistics.median(first_request) * 1000:>8.1f} ms (median of {runs})")
+    print(f"{"time to menu":<28} {statistics.median(to_menu) * 1000:>8.1f} ms (median of {runs})")
+    print(f"{"workflow imports deferred":<28} {statistics.median(imports) * 1000:>8.1f} ms (loaded when chosen)")
+
+
+def _synthetic_names(count: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    names = {}
+    for i in range(count):
+        day = f"{rng.randint(2012, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        kind = rng.random()
+        if kind < 0.6:
+            names[str(i)] = f"IMG-{day}-WA{rng.randint(0, 9999):04d}.jpg"
+        elif kind < 0.7:
+            names[str(i)] = f"VID-{day}-WA{rng.randint(0, 9999):04d}.mp4"
+        elif kind < 0.8:
+            names[str(i)] = f"PXL_{day}_{rng.randint(0, 235959):06d}{rng.randint(0, 999):03d}.jpg"
+        elif kind < 0.9:
+            names[str(i)] = f"Screenshot_{day}-{rng.randint(0, 235959):06d}.png"
+        else:
+            names[str(i)] = f"DSC_{rng.randint(0, 9999):04d}.JPG"
+    return names
+
+
+def bench_dates(count: int) -> None:
+    """
+    The old per file regex compile + strptime (WhatsApp images only) versus the rule engine
+    (all formats) over the same synthetic names
+    """
+    names = _synthetic_names(count)
+    start = time.perf_counter()
+    old_hits = 0
+    for file_name in names.values():
+        matches = re.compile(r"(IMG-)([0-9]{8})(-WA[0-9]{4}.jpg)").match(file_name)
+        if matches:
+            try:
+                time.strptime(f"{matches.group(2)}-120406", "%Y%m%d-%H%M%S")
+                old_hits += 1
+            except ValueError:
+                pass
+    _report(f"regex + strptime ({old_hits} hits)", count, time.perf_counter() - start, "names", "names/s")
+    start = time.perf_counter()
+    dates, misses = extract_dates(names)
+    _report(f"rule engine ({len(dates)} hits)", count, time.perf_counter() - start, "names", "names/s")
+
+
+RSS_FIELDS = ('id', 'createdAt', 'originalFileName', 'exifInfo.fileSizeInByte')
+
+
+def _rss_child(mode: str, instance: str, api_key: str, album_id: str) -> None:
+    """
+    Runs in its own process, so the peak is the one of this read only. VmHWM and not ru_maxrss,
+    the latter keeps the peak of the parent it was forked from
+    """
+    from immich_client import project_fields
+
+    def peak_kib() -> int:
+        with open("/proc/self/status") as status_io:
+            return next(int(line.split()[1]) for line in status_io if line.startswith("VmHWM:"))
+
+    client = ImmichClient(instance, api_key)
+    before = peak_kib()
+    start = time.perf_counter()
+    if mode == "json":
+        assets = [project_fields(asset, RSS_FIELDS) for asset in client.get(f"albums/{album_id}").json()['assets']]
+    else:
+        assets = [asset for page in client.stream_album_assets(album_id, RSS_FIELDS) for asset in page]
+    seconds = time.perf_counter() - start
+    peak = peak_kib()
+    print(json.dumps({'assets': len(assets), 'before': before, 'peak': peak, 'seconds': seconds}))
+
+
+def bench_rss(assets: int) -> None:
+    """
+    Peak memory of reading one big album with all assets: response.json() versus the streamed decode,
+    linux only (/proc)
+    """
+    library = build_library(assets=assets, tags=0, albums=1)
+    for asset in library.assets.values(): # * the real thing carries a lot more exif than the fake
+        asset['exifInfo'].update({'make': "Google", 'model': "Pixel 7", 'lensModel': "Pixel 7 back camera 6.81mm f/1.85",
+                                  'exposureTime': "1/120", 'fNumber': 1.85, 'iso': 120, 'focalLength': 6.81,
+                                  'latitude': 52.52, 'longitude': 13.405, 'city': "Berlin", 'country': "Germany",
+                                  'description': "", 'orientation': "1", 'timeZone': "Europe/Berlin"})
+        asset.update({'deviceAssetId': asset['originalFileName'] + "-1234567", 'isFavorite': False,
+                      'isArchived': False, 'thumbhash': "1QcSHQRnh493V4dIh4eXh1h4kJUI", 'duration': "0:00:00.00000"})
+    album_id = next(iter(library.albums))
+    here = os.path.dirname(os.path.abspath(__file__))
+    with FakeImmichServer(library) as fake:
+        for mode, label in (("json", "response.json() (before)"), ("stream", "streamed decode (after)")):
+            code = (f"import benchmark; benchmark._rss_child({mode!r}, {fake.creds['instance']!r}, "
+                    f"{fake.creds['api_key']!r}, {album_id!r})")
+            out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{label:<28} {result['assets']:>7} assets {result['seconds']:>8.3f} s "
+                  f"peak RSS {result['peak'] / 1024:>8.1f} MiB (+{(result['peak'] - result['before']) / 1024:.1f} MiB)")
+
+
+def _slim_page_json(count: int, seed: int = 42) -> str:
+    """
+    Album members like album_asset_pages hands them out, as JSON text so every string is decoded
+    fresh like it is after a real response, nothing shared between assets
+    """
+    rnd = random.Random(seed)
+    return json.dumps([{'id': f"{rnd.getrandbits(32):08x}-{rnd.getrandbits(16):04x}-4{rnd.getrandbits(12):03x}-"
+                              f"a{rnd.getrandbits(12):03x}-{rnd.getrandbits(48):012x}",
+                        'type': "VIDEO",
+                        'createdAt': f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+                                     f"T{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00.000Z",
+                        'originalFileName': f"VID-20{rnd.randint(10, 24)}0101-WA{i % 10000:04d}.mp4",
+                        'exifInfo.fileSizeInByte': rnd.randint(10_000, 500_000_000)} for i in range(count)])
+
+
+def bench_assets(count: int) -> None:
+    """
+    The old {UUID: {'createdAt', 'fileSize', 'fileName'}} per video versus the AssetTable: memory held
+    after the build (tracemalloc) and the time of the things the workflows do with it
+    """
+    raw = _slim_page_json(count)
+    big = 100 * 1024 * 1024
+    for label in ("dict of dicts (before)", "AssetTable (after)"):
+        tracemalloc.start()
+        start = time.perf_counter()
+        if label.startswith("dict"):
+            videos = {}
+            for asset in json.loads(raw):
+                videos[asset['id']] = {'createdAt': asset['createdAt'], 'fileSize': asset['exifInfo.fileSizeInByte'] or 0,
+                                       'fileName': asset['originalFileName']}
+        else:
+            videos = AssetTable()
+            for asset in json.loads(raw):
+                videos.add(asset['id'], asset['type'], asset['exifInfo.fileSizeInByte'], asset['createdAt'],
+                           asset['originalFileName'])
+        build = time.perf_counter() - start
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        start = time.perf_counter()
+        if label.startswith("dict"):
+            total = sum(int(item['fileSize']) for item in videos.values())
+            large = [key for key, item in videos.items() if int(item['fileSize']) >= big]
+            ordered = sorted(videos.values(), key=lambda item: to_epoch_ms(item['createdAt']))
+        else:
+            total = videos.total_size()
+            large = videos.where(min_size=big)
+            ordered = videos.sorted_rows("created")
+        work = time.perf_counter() - start
+        print(f"{label:<28} {len(videos):>7} assets held {held / 2 ** 20:>7.1f} MiB (peak {peak / 2 ** 20:>7.1f} MiB) "
+              f"build {build:.3f} s, sum+filter+sort {work:.3f} s ({len(large)} large, {total / 2 ** 40:.1f} TiB)")
+        del videos, large, ordered
+
+
+def _synthetic_rows(count: int, albums: int, seed: int = 42) -> LibraryRows:
+    """
+    A library of count assets, every asset in one of the albums and every 20th in a second one
+    """
+    rnd = random.Random(seed)
+    rows = LibraryRows()
+    for i in range(count):
+        rows.add_asset(f"{i:032x}", "VIDEO" if i % 10 == 0 else "IMAGE", rnd.randint(10_000, 500_000_000),
+                       f"20{rnd.randint(10, 24)}-{rnd.randint(1, 12):02d}-01T12:00:00.000Z", f"IMG_{i}.jpg")
+    album_rows = [rows.add_album(f"album-{i}", f"Album {i}") for i in range(albums)]
+    for album_row in album_rows:
+        rows.add_members(album_row, array('i', range(album_row, count, albums)))
+    for album_row in album_rows:
+        rows.add_members(album_row, array('i', range((album_row + 1) % albums, count, albums * 20)))
+    return rows
+
+
+def bench_stats(count: int, albums: int) -> None:
+    """
+    The library statistics over synthetic rows: plain python loops with dictionaries and heapq
+    versus compute_stats, collecting the rows (the network part) is left out of both
+    """
+    start = time.perf_counter()
+    rows = _synthetic_rows(count, albums)
+    print(f"{"synthetic rows built":<28} {count:>7} assets {time.perf_counter() - start:>8.3f} s")
+    start = time.perf_counter()
+    by_type, by_month, by_album = collections.Counter(), collections.Counter(), collections.Counter()
+    per_asset = collections.Counter(rows.member_asset)
+    for row in range(count):
+        size = rows.sizes[row]
+        by_type[rows.types[row]] += size
+        by_month[bytes(rows.months[row * 7:row * 7 + 7])] += size
+    for album_row, asset_row in zip(rows.member_album, rows.member_asset):
+        by_album[album_row] += rows.sizes[asset_row]
+    largest = heapq.nlargest(20, range(count), key=rows.sizes.__getitem__)
+    several = sum(1 for n in per_asset.values() if n > 1)
+    _report("python loops (before)", count, time.perf_counter() - start, "assets", "assets/s")
+    start = time.perf_counter()
+    report = compute_stats(rows)
+    _report("numpy (after)", count, time.perf_counter() - start, "assets", "assets/s")
+    assert report['several_albums']['assets'] == several # * same numbers, just faster
+    del by_type, by_month, by_album, largest
+
+
+def _suite_workflows(album_id: str) -> list:
+    """
+    Every workflow in its headless form, in an order where each one still has work to do:
+    the rollback needs the file of the tag deletion, the library retime whatever the album one left
+
+    :param album_id: the first album of the fake library
+    :return: list of (label, callable(creds) -> bool)
+    """
+    from retime_whatsapp_pictures import retime_headless
+    from tag_delete_by_regex import tag_delete_headless
+    from tag_rollback import tag_rollback_headless
+    from video_seperation import video_seperation_headless
+    return [
+        ("tags", lambda creds: tag_delete_headless(creds, r"^0\.", True)),
+        ("rollback", lambda creds: tag_rollback_headless(creds, sorted(glob.glob("TagRollback*.jsonl.gz"))[-1], True)),
+        ("retime album", lambda creds: retime_headless(creds, album_id, True)),
+        ("retime library", lambda creds: retime_headless(creds, None, True)),
+        ("videos", lambda creds: video_seperation_headless(creds, None, "Videos", True, "")),
+    ]
+
+
+def bench_suite(scales: list, faults: dict) -> None:
+    """
+    Drives every workflow without a single input() against a fresh fake library per scale, the
+    calls are counted by the metrics of the client. Workflow output is swallowed, files they
+    write (journals, rollback) end up in a temporary folder.
+
+    :param scales: numbers of assets, like [1000, 10000, 100000]
+    :param faults: keyword arguments for FaultInjection, empty for a well behaved server
+    """
+    here = os.getcwd()
+    for scale in scales:
+        library = build_library(assets=scale, tags=max(100, scale // 100), albums=max(2, scale // 10000))
+        album_id = next(iter(library.albums))
+        injection = FaultInjection(**faults) if faults else None
+        with tempfile.TemporaryDirectory() as work_dir, FakeImmichServer(library, faults=injection) as fake:
+            os.chdir(work_dir)
+            try:
+                metrics = client_for(fake.creds).metrics
+                total_start = time.perf_counter()
+                for label, workflow in _suite_workflows(album_id):
+                    metrics.start(label)
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        try:
+                            ok = workflow(fake.creds)
+                        except Exception as err: # * a crash is a result too
+                            ok = err
+                    seconds = time.perf_counter() - start
+                    calls = sum(row['count'] for row in metrics.summary(label))
+                    _report(f"{scale} {label}", calls, seconds,
+                            note="" if ok is True else f"FAILED {ok!r}" if ok is not False else "FAILED")
+                total = sum(row['count'] for row in metrics.summary())
+                _report(f"{scale} all workflows", total, time.perf_counter() - total_start)
+                if injection:
+                    print(f"{"":<28} injected: {injection.injected['throttled']} x 429, {injection.injected['failed']} x 500")
+            finally:
+                os.chdir(here)
+                close_all_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks against a local fake Immich instance")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p_client = sub.add_parser("client", help="per-call connections versus the pooled session")
+    p_client.add_argument("--calls", type=int, default=1000)
+    p_startup = sub.add_parser("startup", help="time to the first api call and to the menu of main.py")
+    p_startup.add_argument("--runs", type=int, default=10)
+    p_dates = sub.add_parser("dates", help="dates out of file names, old regex+strptime versus the rule engine")
+    p_dates.add_argument("--names", type=int, default=1000000)
+    p_rss = sub.add_parser("rss", help="peak memory of a whole album read, response.json() versus streamed")
+    p_rss.add_argument("--assets", type=int, default=200000)
+    p_assets = sub.add_parser("assets", help="memory and speed of the asset collection, dicts versus AssetTable")
+    p_assets.add_argument("--assets", type=int, default=200000)
+    p_stats = sub.add_parser("stats", help="library statistics, python loops versus numpy")
+    p_stats.add_argument("--assets", type=int, default=3000000)
+    p_stats.add_argument("--albums", type=int, default=200)
+    p_suite = sub.add_parser("suite", help="every workflow headless at several library sizes")
+    p_suite.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    p_suite.add_argument("--latency", type=float, default=0.0, help="seconds the fake adds to every request")
+    p_suite.add_argument("--jitter", type=float, default=0.0, help="up to this many random seconds on top")
+    p_suite.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with 429")
+    p_suite.add_argument("--fail", type=float, default=0.0, help="share of requests answered with 500")
+    args = parser.parse_args()
+    if args.bench == "client":
+        bench_client(args.calls)
+    elif args.bench == "startup":
+        bench_startup(args.runs)
+    elif args.bench == "dates":
+        bench_dates(args.names)
+    elif args.bench == "rss":
+        bench_rss(args.assets)
+    elif args.bench == "assets":
+        bench_assets(args.assets)
+    elif args.bench == "stats":
+        bench_stats(args.assets, args.albums)
+    elif args.bench == "suite":
+        faults = {'latency': args.latency, 'jitter': args.jitter, 'throttle_rate': args.throttle,
+                  'failure_rate': args.fail}
+        bench_suite(args.scales, {k: v for k, v in faults.items() if v})
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# A very small stand-in for an Immich server, only the endpoints this project uses and only as
+# far as it uses them. Good enough to benchmark against without touching a real library.
+# FaultInjection makes it slow and unreliable on purpose, like a busy instance behind a proxy:
+#
+#   python fake_immich.py --assets 10000 --latency 0.02 --throttle 0.05 --fail 0.01
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_API_KEY = "fake-immich-key"
+ALL_PERMISSIONS = ["all"]
+
+
+class FakeLibrary:
+    """
+    In-memory state of the fake instance, assets, tags and albums as plain dictionaries
+    """
+
+    def __init__(self):
+        self.assets: dict[str, dict] = {}
+        self.tags: dict[str, dict] = {}
+        self.albums: dict[str, dict] = {}
+        self.asset_tags: dict[str, set] = {} # asset UUID -> set of tag UUIDs
+        self.lock = threading.Lock()
+        self.first_request_at: float | None = None # time.perf_counter() of the first call, for the startup benchmark
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace("+00:00", "Z")
+
+    def add_asset(self, file_name: str, asset_type: str = "IMAGE", size: int = 1024,
+                  created_at: str = "2022-04-01T12:00:00.000Z") -> str:
+        asset_id = str(uuid.uuid4())
+        self.assets[asset_id] = {
+            'id': asset_id,
+            'type': asset_type,
+            'originalFileName': file_name,
+            'createdAt': created_at,
+            'fileCreatedAt': created_at,
+            'updatedAt': created_at,
+            'exifInfo': {'fileSizeInByte': size, 'dateTimeOriginal': created_at}
+        }
+        self.asset_tags[asset_id] = set()
+        return asset_id
+
+    def add_tag(self, name: str, parent_id: str | None = None) -> str:
+        tag_id = str(uuid.uuid4())
+        value = name if not parent_id else f"{self.tags[parent_id]['value']}/{name}"
+        self.tags[tag_id] = {'id': tag_id, 'name': name, 'value': value, 'parentId': parent_id,
+                             'createdAt': "2022-04-01T12:00:00.000Z", 'updatedAt': "2022-04-01T12:00:00.000Z"}
+        return tag_id
+
+    def add_album(self, name: str, asset_ids: list) -> str:
+        album_id = str(uuid.uuid4())
+        self.albums[album_id] = {'id': album_id, 'albumName': name, 'description': "",
+                                 'assetIds': list(asset_ids), 'updatedAt': self.now()}
+        return album_id
+
+
+def build_library(assets: int = 1000, tags: int = 100, albums: int = 2, seed: int = 42) -> FakeLibrary:
+    """
+    Creates a deterministic library with WhatsApp style file names, some videos, some tags
+
+    :param assets: number of assets
+    :param tags: number of tags, each gets a handful of random assets
+    :param albums: number of albums, the assets are split evenly between them
+    :param seed: random seed so runs are comparable
+    :return: a filled FakeLibrary
+    """
+    rnd = random.Random(seed)
+    lib = FakeLibrary()
+    ids = []
+    for i in range(assets):
+        if i % 10 == 0:
+            name, kind = f"VID-2019{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}-WA{i % 10000:04d}.mp4", "VIDEO"
+        else:
+            name, kind = f"IMG-2019{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}-WA{i % 10000:04d}.jpg", "IMAGE"
+        ids.append(lib.add_asset(name, kind, rnd.randint(10_000, 50_000_000)))
+    for i in range(tags):
+        tag_id = lib.add_tag(f"0.{i:02d} km north of Berlin")
+        for asset_id in rnd.sample(ids, min(len(ids), 5)):
+            lib.asset_tags[asset_id].add(tag_id)
+    if albums:
+        step = max(1, len(ids) // albums)
+        for i in range(albums):
+            lib.add_album(f"Camera {i}", ids[i * step:(i + 1) * step])
+    return lib
+
+
+class FaultInjection:
+    """
+    Decides per request if it gets delayed, throttled (429 with Retry-After) or fails (500).
+    An injected error happens before the request touches the library, so nothing half done.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, throttle_rate: float = 0.0,
+                 failure_rate: float = 0.0, retry_after: float = 0.1, seed: int = 42):
+        """
+        :param latency: seconds every request is delayed
+        :param jitter: up to this many seconds on top, random per request
+        :param throttle_rate: share of requests answered with 429, 0..1
+        :param failure_rate: share of requests answered with 500, 0..1
+        :param retry_after: seconds told in the Retry-After of a 429
+        :param seed: random seed so runs are comparable
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.injected = {'throttled': 0, 'failed': 0}
+
+    def decide(self) -> tuple[float, int | None]:
+        """
+        :return: (seconds to wait, status to answer with or None to answer normally)
+        """
+        with self.lock:
+            delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0.0)
+            roll = self.random.random()
+            if roll < self.throttle_rate:
+                self.injected['throttled'] += 1
+                return delay, 429
+            if roll < self.throttle_rate + self.failure_rate:
+                self.injected['failed'] += 1
+                return delay, 500
+            return delay, None
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # otherwise there is no keep-alive and the benchmark would be pointless
+    disable_nagle_algorithm = True # headers and body are two writes, Nagle + delayed ACK would add 40ms each
+    library: FakeLibrary = None
+    faults: FaultInjection | None = None
+
+    def log_message(self, format, *args):
+        pass # no spam on the console
+
+    def _send(self, status: int, body=None, headers: dict | None = None):
+        raw = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _route(self, method: str):
+        if self.library.first_request_at is None:
+            self.library.first_request_at = time.perf_counter()
+        if self.headers.get("x-api-key") != FAKE_API_KEY:
+            self._body()
+            return self._send(401, {'message': "Invalid API key", 'statusCode': 401})
+        path = self.path.split("?", 1)[0].removeprefix("/api/").strip("/")
+        parts = path.split("/")
+        body = self._body()
+        if self.faults:
+            delay, status = self.faults.decide()
+            if delay:
+                time.sleep(delay) # * outside the library lock, slow calls still overlap
+            if status == 429:
+                return self._send(429, {'message': "Too Many Requests", 'statusCode': 429},
+                                  {'Retry-After': f"{self.faults.retry_after:g}"})
+            if status == 500:
+                return self._send(500, {'message': "Internal server error", 'statusCode': 500})
+        lib = self.library
+        with lib.lock:
+            if method == "GET" and path == "api-keys/me":
+                return self._send(200, {'id': "fake", 'name': "fake", 'permissions': ALL_PERMISSIONS})
+            if method == "GET" and path == "tags":
+                return self._send(200, list(lib.tags.values()))
+            if method == "PUT" and path == "tags": # upsert, creates the parents of "A/B/C" as well
+                upserted = []
+                for value in body.get('tags', []):
+                    parent_id = None
+                    for depth, name in enumerate(value.split("/")):
+                        partial = "/".join(value.split("/")[:depth + 1])
+                        found = next((t for t in lib.tags.values() if t['value'] == partial), None)
+                        parent_id = found['id'] if found else lib.add_tag(name, parent_id)
+                    upserted.append(lib.tags[parent_id])
+                return self._send(200, upserted)
+            if method == "PUT" and path == "tags/assets":
+                if any(t not in lib.tags for t in body.get('tagIds', [])):
+                    return self._send(400, {'message': "Not found or no tag.asset access", 'statusCode': 400})
+                count = 0
+                for asset_id in body.get('assetIds', []):
+                    if asset_id in lib.asset_tags:
+                        lib.asset_tags[asset_id].update(body['tagIds'])
+                        count += 1
+                return self._send(200, {'count': count})
+            if method == "DELETE" and parts[0] == "tags" and len(parts) == 2:
+                if parts[1] not in lib.tags:
+                    return self._send(404, {'message': "Not found", 'error': "Not found", 'statusCode': 404})
+                gone, todo = set(), [parts[1]]
+                while todo: # children go down with their parent, like the real one does
+                    gone.add(tag_id := todo.pop())
+                    todo.extend(t['id'] for t in lib.tags.values() if t['parentId'] == tag_id)
+                for tag_id in gone:
+                    del lib.tags[tag_id]
+                for tag_set in lib.asset_tags.values():
+                    tag_set -= gone
+                return self._send(204)
+            if method == "POST" and path == "search/metadata":
+                return self._send(200, self._search(body))
+            if method == "POST" and path == "search/statistics":
+                return self._send(200, {'total': len(lib.assets)})
+            if method == "GET" and path == "albums":
+                return self._send(200, [self._album(album, False) for album in lib.albums.values()])
+            if method == "GET" and parts[0] == "albums" and len(parts) == 2:
+                album = lib.albums.get(parts[1])
+                if not album:
+                    return self._send(400, {'message': "Not found or no album.read access", 'statusCode': 400})
+                return self._send(200, self._album(album, "withoutAssets=true" not in self.path))
+            if method == "POST" and path == "albums":
+                album_id = lib.add_album(body.get('albumName', ""), body.get('assetIds', []))
+                return self._send(201, {'id': album_id, 'albumName': body.get('albumName', ""),
+                                        'assetCount': len(body.get('assetIds', []))})
+            if method == "PUT" and parts[0] == "albums" and len(parts) == 3 and parts[2] == "assets":
+                album = lib.albums.get(parts[1])
+                if not album:
+                    return self._send(400, {'message': "Not found or no albumAsset.create access", 'statusCode': 400})
+                members = set(album['assetIds'])
+                results = []
+                for asset_id in body.get('ids', []):
+                    if asset_id in members:
+                        results.append({'id': asset_id, 'success': False, 'error': "duplicate"})
+                    elif asset_id not in lib.assets:
+                        results.append({'id': asset_id, 'success': False, 'error': "not_found"})
+                    else:
+                        album['assetIds'].append(asset_id)
+                        members.add(asset_id)
+                        results.append({'id': asset_id, 'success': True})
+                album['updatedAt'] = lib.now()
+                return self._send(200, results)
+            if method == "PUT" and path == "assets":
+                ids = body.get('ids', [])
+                if any(asset_id not in lib.assets for asset_id in ids): # immich refuses the whole bulk
+                    return self._send(400, {'message': "Not found or no asset.update access", 'statusCode': 400})
+                for asset_id in ids:
+                    if 'dateTimeOriginal' in body:
+                        lib.assets[asset_id]['exifInfo']['dateTimeOriginal'] = body['dateTimeOriginal']
+                        lib.assets[asset_id]['updatedAt'] = lib.now()
+                return self._send(204)
+        return self._send(404, {'message': f"Cannot {method} /{path}", 'statusCode': 404})
+
+    def _album(self, album: dict, with_assets: bool) -> dict:
+        asset_ids = [a for a in album['assetIds'] if a in self.library.assets]
+        result = {'id': album['id'], 'albumName': album['albumName'], 'description': album['description'],
+                  'assetCount': len(asset_ids), 'updatedAt': album['updatedAt']}
+        if with_assets:
+            result['assets'] = [self.library.assets[a] for a in asset_ids]
+        return result
+
+    def _search(self, body: dict) -> dict:
+        lib = self.library
+        size = int(body.get('size', 250))
+        page = int(body.get('page', 1))
+        candidates = lib.assets.values()
+        if tag_ids := body.get('tagIds'):
+            candidates = [a for a in candidates if lib.asset_tags[a['id']].issuperset(tag_ids)]
+        if album_ids := body.get('albumIds'):
+            members = set.intersection(*(set(lib.albums[a]['assetIds']) if a in lib.albums else set()
+                                         for a in album_ids))
+            candidates = [a for a in candidates if a['id'] in members]
+        if file_name := body.get('originalFileName'): # immich does a case insensitive "contains"
+            candidates = [a for a in candidates if file_name.lower() in a['originalFileName'].lower()]
+        if asset_type := body.get('type'):
+            candidates = [a for a in candidates if a['type'] == asset_type]
+        if updated_after := body.get('updatedAfter'):
+            candidates = [a for a in candidates if a['updatedAt'] > updated_after]
+        items = list(candidates)[(page - 1) * size:page * size + 1]
+        next_page = str(page + 1) if len(items) > size else None
+        items = [dict(item, tags=[{'id': t, 'name': lib.tags[t]['name'], 'value': lib.tags[t]['value']}
+                                  for t in lib.asset_tags[item['id']] if t in lib.tags])
+                 for item in items[:size]]
+        return {'albums': {'items': [], 'total': 0, 'count': 0, 'nextPage': None},
+                'assets': {'items': items, 'total': len(items), 'count': len(items), 'nextPage': next_page}}
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+class FakeImmichServer:
+    """
+    Runs the fake instance in a background thread, use as context manager:
+
+        with FakeImmichServer(build_library()) as fake:
+            creds = fake.creds
+    """
+
+    def __init__(self, library: FakeLibrary | None = None, host: str = "127.0.0.1", port: int = 0,
+                 faults: FaultInjection | None = None):
+        self.library = library if library is not None else build_library()
+        self.faults = faults
+        handler = type("BoundFakeHandler", (_FakeHandler,), {'library': self.library, 'faults': faults})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def creds(self) -> dict:
+        host, port = self.httpd.server_address[:2]
+        return {'instance': f"http://{host}:{port}/api/", 'api_key': FAKE_API_KEY}
+
+    def start(self) -> "FakeImmichServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeImmichServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Immich instance for benchmarks")
+    parser.add_argument("--port", type=int, default=2283)
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--tags", type=int, default=100)
+    parser.add_argument("--albums", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many random seconds on top")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--fail", type=float, default=0.0, help="share of requests answered with 500")
+    args = parser.parse_args()
+    faults = FaultInjection(args.latency, args.jitter, args.throttle, args.fail)
+    server = FakeImmichServer(build_library(args.assets, args.tags, args.albums), port=args.port, faults=faults)
+    print(f"Fake Immich running, creds: {server.creds}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
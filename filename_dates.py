@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Dates out of file names. Every rule knows the shape of one naming scheme, the regex only
+# checks the shape, the digits are then read at fixed positions, no strptime involved:
+#
+#   IMG-20150112-WA0017.jpg / .jpeg    WhatsApp picture, no time in the name
+#   VID-20150112-WA0003.mp4            WhatsApp video, no time in the name
+#   PXL_20230415_153012345.jpg         Pixel camera, with time and milliseconds (.MP.jpg, .mp4 too)
+#   Screenshot_20230415-153012.png     Android screenshots, also with _ between date and time
+#   Screenshot_2023-04-15-15-30-12.png ..and the dashed variant of newer versions
+
+import re
+
+WA_DEFAULT_TIME = (12, 4, 6) # 12:04:06 is just a random time
+_DEFAULT_TIME = "T{:02d}:{:02d}:{:02d}.000".format(*WA_DEFAULT_TIME)
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class DateRule:
+    """
+    One naming scheme: a precompiled pattern for the shape and the positions of the digits
+    """
+
+    def __init__(self, name: str, prefix: str, pattern: str, date: tuple[int, int, int],
+                 time: tuple[int, int, int] | None = None, millis: int | None = None, sequence: int | None = None):
+        """
+        :param name: for statistics and error messages
+        :param prefix: literal start of the file name, checked before the regex runs
+        :param pattern: regex of the whole shape, used with match
+        :param date: positions of year, month and day in the name
+        :param time: positions of hour, minute and second, None means WA_DEFAULT_TIME
+        :param millis: position of three digits of milliseconds
+        :param sequence: position of the four digit WA counter
+        """
+        self.name = name
+        self.prefix = prefix
+        self.pattern = re.compile(pattern)
+        self.date = date
+        self.time = time
+        self.millis = millis
+        self.sequence = sequence
+
+
+DATE_RULES = [
+    DateRule("whatsapp_image", "IMG-", r"IMG-\d{8}-WA\d{4}\.(?i:jpe?g)", (4, 8, 10), sequence=15),
+    DateRule("whatsapp_video", "VID-", r"VID-\d{8}-WA\d{4}\.(?i:mp4)", (4, 8, 10), sequence=15),
+    DateRule("pixel", "PXL_", r"PXL_\d{8}_\d{9}", (4, 8, 10), (13, 15, 17), millis=19),
+    DateRule("screenshot", "Screenshot_", r"Screenshot_\d{8}[-_]\d{6}", (11, 15, 17), (20, 22, 24)),
+    DateRule("screenshot_dashed", "Screenshot_", r"Screenshot_\d{4}-\d\d-\d\d-\d\d-\d\d-\d\d", (11, 16, 19), (22, 25, 28)),
+]
+
+
+_RULES_BY_START: dict[str, list[DateRule]] = {}
+for _rule in DATE_RULES:
+    _RULES_BY_START.setdefault(_rule.prefix[:4], []).append(_rule)
+_DAYS: dict[str, str | None] = {} # "20150112" -> "2015-01-12" or None, there are only a few thousand different days
+
+
+def _iso_day(digits: str) -> str | None:
+    """
+    :param digits: YYYYMMDD
+    :return: YYYY-MM-DD or None if there is no such day
+    """
+    if (day := _DAYS.get(digits, False)) is not False:
+        return day
+    year, month, day = int(digits[:4]), int(digits[4:6]), int(digits[6:])
+    valid = 1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month] and \
+        (month != 2 or day < 29 or (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)))
+    _DAYS[digits] = f"{digits[:4]}-{digits[4:6]}-{digits[6:]}" if valid else None
+    return _DAYS[digits]
+
+
+def extract_date(file_name: str, sequence_order: bool = False) -> str | None:
+    """
+    :param file_name: random file name
+    :param sequence_order: WhatsApp files carry no time, with this the WA counter is added as seconds
+                           to WA_DEFAULT_TIME, so pictures of one day keep their order
+    :return: ISO date like 2015-01-12T12:04:06.000 or None if no rule fits
+    """
+    for rule in _RULES_BY_START.get(file_name[:4], ()):
+        if not file_name.startswith(rule.prefix) or not rule.pattern.match(file_name):
+            continue
+        y, m, d = rule.date
+        if (day := _iso_day(file_name[y:y + 4] + file_name[m:m + 2] + file_name[d:d + 2])) is None:
+            return None # * the shape fit but the digits don't, like a 20151345
+        if rule.time:
+            h, mi, s = rule.time
+            hour, minute, second = file_name[h:h + 2], file_name[mi:mi + 2], file_name[s:s + 2]
+            if hour > "23" or minute > "59" or second > "59": # * two digits each, compare as text
+                return None
+            millis = file_name[rule.millis:rule.millis + 3] if rule.millis is not None else "000"
+            return f"{day}T{hour}:{minute}:{second}.{millis}"
+        if sequence_order and rule.sequence is not None: # * WA9999 is 2:46 hours later, still the same day
+            hour, minute, second = WA_DEFAULT_TIME
+            seconds = hour * 3600 + minute * 60 + second + int(file_name[rule.sequence:rule.sequence + 4])
+            return f"{day}T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.000"
+        return day + _DEFAULT_TIME
+    return None
+
+
+def extract_dates(names: dict, sequence_order: bool = False) -> tuple[dict, list]:
+    """
+    The same for a whole batch of names
+
+    :param names: dict {AssetUUID: AssetFileName}
+    :param sequence_order: see extract_date
+    :return: ({AssetUUID: ISODATE}, [file names no rule fits])
+    """
+    dates = {}
+    misses = []
+    for asset_id, file_name in names.items():
+        if (iso := extract_date(file_name, sequence_order)) is not None:
+            dates[asset_id] = iso
+        else:
+            misses.append(file_name)
+    return dates, misses
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+import threading
+import time
+from typing import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_metrics import ApiMetrics
+from json_stream import decode_chunks, iter_array_items
+from rate_control import AimdController, parse_retry_after, THROTTLE_STATUS
+
+DEFAULT_POOL_SIZE = 16 # keep-alive connections per host, more than that and they get thrown away after use
+DEFAULT_TIMEOUT = (10, 300) # (connect, read) in seconds, albums with exif can take a while to arrive
+SEARCH_PAGE_SIZE = 250 # immich default for search/metadata, the server allows up to 1000
+ALBUM_PAGE_SIZE = 1000 # album members per page, the projected pages are small so the biggest size it is
+STREAM_CHUNK_SIZE = 1 << 16 # bytes read at once from a streamed response
+MAX_RETRIES = 3 # for 429 and 503 only, everything else goes straight back to the caller
+
+
+class ImmichApiError(Exception):
+    """
+    Raised by the paginator when a page does not come back as expected, carries the response
+    """
+
+    def __init__(self, message: str, response: requests.Response | None = None):
+        super().__init__(message)
+        self.response = response
+
+
+def project_fields(item: dict, fields: tuple | list) -> dict:
+    """
+    Keeps only the named fields of one asset, nested ones like 'exifInfo.fileSizeInByte'
+    are written with a dot and come back flat under that dotted name
+
+    :param item: one asset dictionary as the API delivers it
+    :param fields: field names to keep
+    :return: a new, much smaller, dictionary
+    """
+    slim = {}
+    for field in fields:
+        value = item
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        slim[field] = value
+    return slim
+
+
+class ImmichClient:
+    """
+    One pooled connection to one Immich instance. Before this every API helper called
+    requests.request on its own, which means a new TCP (and TLS) handshake per call, which
+    is fine for 10 calls but absolutely not for 20.000 of them.
+
+    The session keeps the connections alive and carries the headers, so the helpers only
+    have to say what they actually want.
+    """
+
+    def __init__(self, instance: str, api_key: str,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+                 max_concurrency: int | None = None,
+                 max_retries: int = MAX_RETRIES):
+        """
+        :param instance: path to the API endpoint, usually https://<instance>/api/
+        :param api_key: the Immich API key
+        :param pool_size: number of connections kept alive, should be at least the number of parallel workers
+        :param timeout: seconds or (connect, read) tuple handed to every request
+        :param max_concurrency: upper bound for the AIMD controller, defaults to the pool size
+        :param max_retries: how often a 429/503 is retried after waiting
+        """
+        if not instance.endswith("/"):
+            instance += "/" # otherwise "api" + "tags" becomes "apitags"
+        self.instance = instance
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.controller = AimdController(maximum=max_concurrency or pool_size) # * shared by every thread using this client
+        self.metrics = ApiMetrics() # * every call ends up in there, see main.py --metrics
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'x-api-key': api_key
+        })
+        self.key_info: requests.Response | None = None
+        self.key_info_lock = threading.Lock()
+
+    @classmethod
+    def from_creds(cls, creds: dict, **kwargs) -> "ImmichClient":
+        """
+        Builds a client from the usual credential dictionary, the optional keys 'pool_size',
+        'timeout' and 'max_concurrency' can be put in the api_key.json if the defaults don't fit
+
+        :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+        :return: a new client, see client_for() for the shared one
+        """
+        if 'pool_size' in creds:
+            kwargs.setdefault('pool_size', int(creds['pool_size']))
+        if 'timeout' in creds: # json has no tuples, so [connect, read] comes in as list
+            timeout = creds['timeout']
+            kwargs.setdefault('timeout', tuple(timeout) if isinstance(timeout, list) else timeout)
+        if 'max_concurrency' in creds:
+            kwargs.setdefault('max_concurrency', int(creds['max_concurrency']))
+        return cls(creds['instance'], creds['api_key'], **kwargs)
+
+    def url(self, path: str) -> str:
+        """
+        Joins the relative API path onto the instance
+
+        :param path: something like "tags" or "/albums/<UUID>"
+        :return: the full url
+        """
+        return self.instance + path.lstrip("/")
+
+    def request(self, method: str, path: str, payload: dict | list | None = None, **kwargs) -> requests.Response:
+        """
+        Does one API call over the pooled session, everything the helpers did by hand. The call
+        waits for a slot of the concurrency controller first, and a 429/503 is retried after the
+        Retry-After the server asked for (or a growing pause if it didn't say)
+
+        :param method: HTTP verb like "GET" or "PUT"
+        :param path: relative API path, see url()
+        :param payload: will be sent as JSON body if not None
+        :param kwargs: anything else requests.Session.request understands (params, stream..)
+        :return: the pure request object from the request library
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if payload is not None:
+            kwargs['json'] = payload
+        url = self.url(path)
+        attempt = 0
+        while True:
+            started = self.controller.acquire()
+            sent_at = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                self.metrics.record(method, path, "error", time.perf_counter() - sent_at)
+                self.controller.release(started, None)
+                raise
+            self._record(method, path, resp, time.perf_counter() - sent_at, kwargs.get('stream', False))
+            retry_after = None
+            if resp.status_code in THROTTLE_STATUS:
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            self.controller.release(started, resp.status_code, retry_after)
+            if resp.status_code not in THROTTLE_STATUS or attempt >= self.max_retries:
+                return resp
+            attempt += 1
+            if retry_after is None:
+                time.sleep(min(30.0, 0.5 * 2 ** attempt))
+            # * with a Retry-After the controller holds back every thread, the next acquire waits
+
+    def _record(self, method: str, path: str, resp: requests.Response, seconds: float, streamed: bool) -> None:
+        """
+        Hands one finished call to the metrics, a streamed body isn't read here (that would defeat
+        the point), its size is taken from the Content-Length if the server sent one
+        """
+        body = resp.request.body
+        bytes_out = len(body.encode("utf-8") if isinstance(body, str) else body) if body else 0
+        if streamed:
+            bytes_in = int(resp.headers.get("Content-Length") or 0)
+        else:
+            bytes_in = len(resp.content)
+        self.metrics.record(method, path, resp.status_code, seconds, bytes_out, bytes_in)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, payload: dict | list | None = None, **kwargs) -> requests.Response:
+        return self.request("POST", path, payload, **kwargs)
+
+    def put(self, path: str, payload: dict | list | None = None, **kwargs) -> requests.Response:
+        return self.request("PUT", path, payload, **kwargs)
+
+    def delete(self, path: str, payload: dict | list | None = None, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, payload, **kwargs)
+
+    def search_pages(self, query: dict, size: int = SEARCH_PAGE_SIZE,
+                     fields: tuple | list | None = None) -> Iterator[list[dict]]:
+        """
+        Walks through all pages of search/metadata and hands them out one by one, so the
+        caller can start working on page 1 while nothing else is in memory
+
+        :param query: the search body, like {'tagIds': [<UUID>]}, page and size are set here
+        :param size: assets per page
+        :param fields: if given only those fields are kept per asset, see project_fields(), exif
+                       is only requested from the server if one of them starts with 'exifInfo.'
+        :return: generator of lists of asset dictionaries
+        """
+        payload = dict(query)
+        payload['size'] = size
+        if fields and any(field.startswith("exifInfo.") for field in fields):
+            payload['withExif'] = True
+        page = 1
+        while page:
+            payload['page'] = page
+            resp = self.post("search/metadata", payload)
+            if resp.status_code != 200:
+                raise ImmichApiError(f"search/metadata page {page}: {resp.status_code} - {resp.text}", resp)
+            try:
+                assets = resp.json()['assets']
+                items = assets['items']
+                next_page = assets.get('nextPage')
+            except (KeyError, TypeError, ValueError):
+                raise ImmichApiError(f"search/metadata page {page}: malformed response {resp.text[:200]}", resp)
+            if fields:
+                items = [project_fields(item, fields) for item in items]
+            yield items
+            page = int(next_page) if next_page else None # nextPage comes as string
+
+    def search_ids(self, query: dict, size: int = SEARCH_PAGE_SIZE) -> Iterator[list[str]]:
+        """
+        Same as search_pages but only the asset UUIDs per page
+
+        :param query: the search body, like {'tagIds': [<UUID>]}
+        :param size: assets per page
+        :return: generator of lists of asset UUIDs
+        """
+        for items in self.search_pages(query, size):
+            yield [item['id'] for item in items]
+
+    def album_info(self, album_id: str) -> dict | None:
+        """
+        The album without its assets, GET albums/<id> with assets is one huge body with all
+        exif data of every member
+
+        :param album_id: Immich Album UUID
+        :return: album dictionary (name, assetCount, updatedAt..) or None if there is no such album
+        """
+        resp = self.get(f"albums/{album_id}", params={'withoutAssets': "true"})
+        if resp.status_code != 200:
+            return None
+        return resp.json()
+
+    def album_asset_pages(self, album_id: str, fields: tuple | list, size: int = ALBUM_PAGE_SIZE,
+                          query: dict | None = None) -> Iterator[list[dict]]:
+        """
+        The members of an album page by page via search/metadata, only with the fields asked for.
+        If the server refuses to search by album, the whole album is read as a stream instead.
+
+        :param album_id: Immich Album UUID
+        :param fields: see project_fields()
+        :param size: assets per page
+        :param query: additional search filters, of those only 'type' is known to the stream
+        :return: generator of lists of slim asset dictionaries
+        """
+        pages = self.search_pages(dict(query or {}, albumIds=[album_id]), size, fields)
+        try:
+            first = next(pages, None)
+        except ImmichApiError as err:
+            if err.response is None or err.response.status_code != 400:
+                raise
+            yield from self.stream_album_assets(album_id, fields, size, (query or {}).get('type'))
+            return
+        if first is not None:
+            yield first
+            yield from pages
+
+    def stream_album_assets(self, album_id: str, fields: tuple | list, size: int = ALBUM_PAGE_SIZE,
+                            asset_type: str | None = None) -> Iterator[list[dict]]:
+        """
+        GET albums/<id> with all its assets, but decoded while it arrives, one asset at a time,
+        so neither the body nor the full object tree is ever in memory at once
+
+        :param album_id: Immich Album UUID
+        :param fields: see project_fields()
+        :param size: assets per handed out list, the same shape album_asset_pages gives
+        :param asset_type: only keep assets of this type, like "VIDEO"
+        :return: generator of lists of slim asset dictionaries
+        """
+        with self.get(f"albums/{album_id}", stream=True) as resp:
+            if resp.status_code != 200:
+                raise ImmichApiError(f"albums/{album_id}: {resp.status_code} - {resp.text}", resp)
+            page = []
+            for asset in iter_array_items(decode_chunks(resp.iter_content(STREAM_CHUNK_SIZE)), 'assets'):
+                if asset_type and asset.get('type') != asset_type:
+                    continue
+                page.append(project_fields(asset, fields))
+                if len(page) >= size:
+                    yield page
+                    page = []
+            if page:
+                yield page
+
+    def api_key_info(self) -> requests.Response:
+        """
+        api-keys/me, asked only once per session. The answer doesn't change while the program
+        runs and every permission check used to fetch it again
+
+        :return: the response of the first call, connection errors are raised and only a 200 or 401 is remembered
+        """
+        with self.key_info_lock:
+            if self.key_info is not None:
+                return self.key_info
+            resp = self.get("api-keys/me")
+            if resp.status_code in (200, 401): # * a 5xx or a gateway page might be gone on the next try
+                self.key_info = resp
+            return resp
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_CLIENTS: dict[tuple[str, str], ImmichClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def client_for(creds: dict) -> ImmichClient:
+    """
+    Gives back the shared client for those credentials, the first call builds it. All the
+    helpers still take the 'creds' dictionary, so this is where they get their connection from.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: the one ImmichClient for this instance and key
+    """
+    key = (creds['instance'], creds['api_key'])
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = ImmichClient.from_creds(creds)
+        return _CLIENTS[key]
+
+
+def close_all_clients() -> None:
+    """
+    Closes every pooled session, mostly useful for tests and benchmarks that want a cold start
+    """
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            client.close()
+        _CLIENTS.clear()
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Optional local copy of the parts of the library the scripts care about. Enabled by putting
+# "mirror": "<path>.sqlite" into the api_key.json, without that key nothing in here is used.
+
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from immich_client import client_for, ImmichApiError
+
+DEFAULT_MAX_AGE = 3600 # seconds a sync is considered fresh, the next workflow after that syncs again
+DEFAULT_PRUNE_AGE = 86400 # seconds between two full id sweeps, updatedAfter never tells about deleted assets
+MIRROR_PAGE_SIZE = 1000
+ASSET_FIELDS = ('id', 'type', 'originalFileName', 'exifInfo.fileSizeInByte', 'createdAt',
+                'exifInfo.dateTimeOriginal', 'updatedAt')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    value TEXT,
+    parent_id TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS albums (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    asset_count INTEGER,
+    updated_at TEXT,
+    synced_at TEXT
+);
+CREATE TABLE IF NOT EXISTS assets (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    original_file_name TEXT,
+    file_size INTEGER,
+    created_at TEXT,
+    date_time_original TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS album_assets (
+    album_id TEXT NOT NULL,
+    asset_id TEXT NOT NULL,
+    PRIMARY KEY (album_id, asset_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class ImmichMirror:
+    """
+    SQLite mirror of tags, albums, album membership and slim asset rows. Syncs incrementally,
+    assets by the updatedAfter filter of search/metadata, albums by their updatedAt.
+    """
+
+    def __init__(self, creds: dict, path: str, max_age: float = DEFAULT_MAX_AGE, prune_age: float = DEFAULT_PRUNE_AGE):
+        """
+        :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+        :param path: file name of the sqlite database, gets created if missing
+        :param max_age: seconds after the last sync in which the mirror counts as fresh
+        :param prune_age: seconds after the last full id sweep in which deleted assets aren't looked for
+        """
+        self.creds = creds
+        self.path = path
+        self.max_age = max_age
+        self.prune_age = prune_age
+        self.lock = threading.Lock()
+        self.sync_lock = threading.RLock() # * one sync at a time, workflows ask from several threads
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        if self._state('instance') not in (None, creds['instance']): # another instance, start over
+            self.clear()
+        self._set_state('instance', creds['instance'])
+        self.db.commit()
+
+    def _read(self, sql: str, params: tuple | list = ()) -> list[tuple]:
+        """
+        Every read goes through here or _read_pages, the connection is shared by all threads
+        and sqlite3 doesn't like two of them using it at once
+        """
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def _read_pages(self, sql: str, size: int) -> Iterator[list[tuple]]:
+        """
+        Like _read, the lock is only held per page, not while the caller works on it
+        """
+        with self.lock:
+            cursor = self.db.execute(sql)
+        while True:
+            with self.lock:
+                page = cursor.fetchmany(size)
+            if not page:
+                return
+            yield page
+
+    def _state(self, key: str) -> str | None:
+        rows = self._read("SELECT value FROM sync_state WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def clear(self) -> None:
+        with self.lock, self.db:
+            for table in ("tags", "albums", "assets", "album_assets", "sync_state"):
+                self.db.execute(f"DELETE FROM {table}")
+
+    def is_fresh(self) -> bool:
+        """
+        :return: True if the last complete sync is younger than max_age
+        """
+        last = self._state('last_sync')
+        return last is not None and time.time() - float(last) < self.max_age
+
+    ###
+    ### SYNC
+    ###
+
+    def sync(self) -> dict:
+        """
+        Brings the mirror up to date, only what changed since the last time is downloaded
+
+        :return: counts of what was touched {'tags': n, 'assets': n, 'pruned': n, 'albums': n}
+        """
+        with self.sync_lock: # the prune shares one temp table, two syncs at once would wipe each other's ids
+            counts = {'tags': self._sync_tags(), 'assets': self._sync_assets(), 'pruned': self._prune_assets(),
+                      'albums': self._sync_albums()}
+            with self.lock, self.db:
+                self._set_state('last_sync', str(time.time()))
+        return counts
+
+    def _sync_tags(self) -> int:
+        resp = client_for(self.creds).get("tags") # no updatedAfter for tags, but the list is small anyway
+        resp.raise_for_status()
+        rows = [(t['id'], t['name'], t.get('value'), t.get('parentId'), t.get('updatedAt')) for t in resp.json()]
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM tags")
+            self.db.executemany("INSERT INTO tags VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _upsert_assets(self, items: list) -> None:
+        rows = [(a['id'], a['type'], a['originalFileName'], int(a['exifInfo.fileSizeInByte'] or 0),
+                 a['createdAt'], a['exifInfo.dateTimeOriginal'], a['updatedAt']) for a in items]
+        self.db.executemany("INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _sync_assets(self) -> int:
+        watermark = self._state('assets_updated_at')
+        query = {'updatedAfter': watermark} if watermark else {}
+        newest = watermark or ""
+        count = 0
+        for page in client_for(self.creds).search_pages(query, MIRROR_PAGE_SIZE, ASSET_FIELDS):
+            with self.lock, self.db:
+                self._upsert_assets(page)
+            count += len(page)
+            newest = max([newest] + [a['updatedAt'] or "" for a in page])
+        if newest: # * only moved forward once everything arrived, an aborted sync just repeats
+            with self.lock, self.db:
+                self._set_state('assets_updated_at', newest)
+                if not watermark: # a full listing, nothing old in there that could be gone
+                    self._set_state('last_prune', str(time.time()))
+        return count
+
+    def _prune_assets(self) -> int:
+        """
+        updatedAfter only brings new and changed assets, deleted ones just stop showing up. Once
+        every prune_age all ids of the library are listed and the rows of the missing ones removed,
+        with their album memberships.
+
+        :return: number of removed assets
+        """
+        last = self._state('last_prune')
+        if last is not None and time.time() - float(last) < self.prune_age:
+            return 0
+        with self.lock, self.db:
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+            self.db.execute("DELETE FROM seen")
+        for page in client_for(self.creds).search_ids({}, MIRROR_PAGE_SIZE):
+            with self.lock, self.db:
+                self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(asset_id,) for asset_id in page])
+        with self.lock, self.db: # * only reached if the listing went through completely
+            gone = self.db.execute("DELETE FROM assets WHERE id NOT IN (SELECT id FROM seen)").rowcount
+            self.db.execute("DELETE FROM album_assets WHERE asset_id NOT IN (SELECT id FROM assets)")
+            self.db.execute("DELETE FROM seen")
+            self._set_state('last_prune', str(time.time()))
+        return gone
+
+    def _sync_albums(self) -> int:
+        resp = client_for(self.creds).get("albums")
+        resp.raise_for_status()
+        remote = {album['id']: album for album in resp.json()}
+        known = dict(self._read("SELECT id, synced_at FROM albums"))
+        changed = 0
+        with self.lock, self.db:
+            for gone in set(known) - set(remote):
+                self.db.execute("DELETE FROM albums WHERE id = ?", (gone,))
+                self.db.execute("DELETE FROM album_assets WHERE album_id = ?", (gone,))
+        for album_id, album in remote.items():
+            if known.get(album_id) == album.get('updatedAt'):
+                continue
+            self.sync_album(album_id, album)
+            changed += 1
+        return changed
+
+    def sync_album(self, album_id: str, album: dict | None = None) -> None:
+        """
+        Downloads the membership of one album, the members are also written as asset rows
+
+        :param album_id: Immich Album UUID
+        :param album: the album as in GET albums, fetched if not given
+        """
+        if album is None and (album := client_for(self.creds).album_info(album_id)) is None:
+            raise ImmichApiError(f"albums/{album_id}: not found")
+        member_ids = []
+        for page in client_for(self.creds).album_asset_pages(album_id, ASSET_FIELDS, MIRROR_PAGE_SIZE):
+            with self.lock, self.db:
+                self._upsert_assets(page)
+            member_ids.extend(a['id'] for a in page)
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM album_assets WHERE album_id = ?", (album_id,))
+            self.db.executemany("INSERT OR IGNORE INTO album_assets VALUES (?, ?)",
+                                [(album_id, asset_id) for asset_id in member_ids])
+            self.db.execute("INSERT OR REPLACE INTO albums VALUES (?, ?, ?, ?, ?)",
+                            (album_id, album.get('albumName', ""), len(member_ids),
+                             album.get('updatedAt'), album.get('updatedAt')))
+
+    ###
+    ### READ
+    ###
+
+    def tags(self) -> list[dict]:
+        """
+        :return: list of {'id', 'name', 'value', 'parentId'}, the same fields GET tags delivers
+        """
+        rows = self._read("SELECT id, name, value, parent_id FROM tags")
+        return [{'id': tag_id, 'name': name, 'value': value, 'parentId': parent_id}
+                for tag_id, name, value, parent_id in rows]
+
+    def forget_tags(self, tag_ids) -> None:
+        """
+        Removes deleted tags so the next read doesn't offer them again
+
+        :param tag_ids: iterable of tag UUIDs
+        """
+        with self.lock, self.db:
+            self.db.executemany("DELETE FROM tags WHERE id = ?", [(tag_id,) for tag_id in tag_ids])
+
+    def has_album(self, album_id: str) -> bool:
+        return bool(self._read("SELECT 1 FROM albums WHERE id = ?", (album_id,)))
+
+    def album_assets(self, album_id: str, asset_type: str | None = None) -> list[tuple]:
+        """
+        Slim rows of all members of an album
+
+        :param album_id: Immich Album UUID
+        :param asset_type: optional filter like "VIDEO"
+        :return: list of (id, type, originalFileName, fileSize, createdAt, dateTimeOriginal)
+        """
+        sql = ("SELECT a.id, a.type, a.original_file_name, a.file_size, a.created_at, a.date_time_original "
+               "FROM album_assets m JOIN assets a ON a.id = m.asset_id WHERE m.album_id = ?")
+        params = [album_id]
+        if asset_type:
+            sql += " AND a.type = ?"
+            params.append(asset_type)
+        return self._read(sql, params)
+
+    def set_dates(self, dates: dict) -> None:
+        """
+        Writes dates the scripts changed themselves, no need to wait for the next sync
+
+        :param dates: dictionary {AssetUUID: dateTimeOriginal}
+        """
+        with self.lock, self.db:
+            self.db.executemany("UPDATE assets SET date_time_original = ? WHERE id = ?",
+                                [(date, asset_id) for asset_id, date in dates.items()])
+
+    def assets_named(self, prefix: str) -> list[tuple]:
+        """
+        :param prefix: start of the original file name, like "IMG-"
+        :return: list of (id, originalFileName, dateTimeOriginal)
+        """
+        return self._read("SELECT id, original_file_name, date_time_original FROM assets "
+                          "WHERE substr(original_file_name, 1, ?) = ?", (len(prefix), prefix))
+
+    def asset_pages(self, size: int = MIRROR_PAGE_SIZE) -> Iterator[list[tuple]]:
+        """
+        Every asset row, a page at a time so the whole library is never in one list
+
+        :param size: rows per page
+        :return: generator of lists of (id, type, originalFileName, fileSize, createdAt, dateTimeOriginal)
+        """
+        return self._read_pages("SELECT id, type, original_file_name, file_size, created_at, date_time_original "
+                                "FROM assets", size)
+
+    def albums(self) -> list[tuple]:
+        """
+        :return: list of (id, albumName)
+        """
+        return self._read("SELECT id, name FROM albums ORDER BY name")
+
+    def membership_pages(self, size: int = MIRROR_PAGE_SIZE) -> Iterator[list[tuple]]:
+        """
+        :param size: rows per page
+        :return: generator of lists of (album id, asset id), ordered by album
+        """
+        return self._read_pages("SELECT album_id, asset_id FROM album_assets ORDER BY album_id", size)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+_MIRRORS: dict[str, ImmichMirror] = {}
+_MIRRORS_LOCK = threading.Lock()
+
+
+def mirror_for(creds: dict) -> ImmichMirror | None:
+    """
+    The shared mirror for those credentials, or None if no 'mirror' path is configured
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>, 'mirror': <path>}
+    :return: ImmichMirror or None
+    """
+    path = creds.get('mirror')
+    if not path:
+        return None
+    with _MIRRORS_LOCK:
+        if path not in _MIRRORS:
+            _MIRRORS[path] = ImmichMirror(creds, path, float(creds.get('mirror_max_age', DEFAULT_MAX_AGE)),
+                                          float(creds.get('mirror_prune_age', DEFAULT_PRUNE_AGE)))
+        return _MIRRORS[path]
+
+
+def fresh_mirror(creds: dict, on_message=print) -> ImmichMirror | None:
+    """
+    Same as mirror_for, but syncs first if the last sync is too old. If the sync fails the
+    callers just fall back to the API as if there was no mirror at all.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>, 'mirror': <path>}
+    :param on_message: gets the note about a failed sync, progress.print while bars are drawn
+    :return: an up to date ImmichMirror or None
+    """
+    mirror = mirror_for(creds)
+    if mirror is None:
+        return None
+    if not mirror.is_fresh():
+        with mirror.sync_lock:
+            if not mirror.is_fresh(): # * another thread may have synced while this one waited
+                try:
+                    mirror.sync()
+                except Exception as err: # * no mirror is better than a crashed workflow
+                    on_message(f"Mirror sync failed, using the API directly: {err}")
+                    return None
+    return mirror
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
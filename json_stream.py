@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Just enough of a streaming JSON reader to walk through one big member of a big document
+# without ever holding the whole thing. Every single value is still decoded by the json module.
+
+import codecs
+import json
+from typing import Iterator, TextIO
+
+CHUNK_SIZE = 1 << 20 # characters read per refill
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+class _Scanner:
+    """
+    Sliding buffer over a text stream, the consumed part gets thrown away on every refill
+    """
+
+    def __init__(self, chunks: Iterator[str]):
+        self.chunks = chunks
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found}' in JSON stream")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        refills = 1
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._refill(refills):
+                    refills *= 2 # huge values get re-decoded a logarithmic number of times, not linear
+                    continue # value was cut off at the end of the buffer
+                raise
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue # a number like 12 might really be 1234 in the next chunk
+            self.pos = end
+            return value
+
+    def _refill(self, times: int) -> bool:
+        grown = False
+        for _ in range(times):
+            if not self.fill():
+                break
+            grown = True
+        return grown
+
+    def separator(self, closing: str) -> bool:
+        """
+        :return: True if another element follows, False if the container is closed
+        """
+        char = self.peek()
+        self.pos += 1
+        if char == ",":
+            return True
+        if char == closing:
+            return False
+        raise ValueError(f"Expected ',' or '{closing}' but found '{char}' in JSON stream")
+
+
+def _chunks(fp: TextIO, chunk_size: int) -> Iterator[str]:
+    while chunk := fp.read(chunk_size):
+        yield chunk
+
+
+def decode_chunks(raw_chunks: Iterator[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Bytes to text for chunks like response.iter_content() hands out, a character split
+    between two chunks is put together again
+
+    :param raw_chunks: iterator of bytes
+    :param encoding: of the response
+    :return: generator of str
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for raw in raw_chunks:
+        if text := decoder.decode(raw):
+            yield text
+    if tail := decoder.decode(b"", final=True):
+        yield tail
+
+
+def _enter_member(scanner: _Scanner, key: str) -> bool:
+    """
+    Moves the scanner right in front of the value of the top level member `key`,
+    all other members on the way are decoded and dropped
+    """
+    scanner.expect("{")
+    if scanner.peek() == "}":
+        return False
+    while True:
+        name = scanner.value()
+        scanner.expect(":")
+        if name == key:
+            return True
+        scanner.value()
+        if not scanner.separator("}"):
+            return False
+
+
+def iter_object_items(fp: TextIO, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, object]]:
+    """
+    Yields the members of the object stored under the top level `key`, like the 'tags' of a
+    rollback file, one pair at a time
+
+    :param fp: text stream of a JSON document whose root is an object
+    :param key: name of the top level member, its value has to be an object
+    :param chunk_size: characters read at once
+    :return: generator of (name, value)
+    """
+    scanner = _Scanner(_chunks(fp, chunk_size))
+    if not _enter_member(scanner, key):
+        return
+    scanner.expect("{")
+    if scanner.peek() == "}":
+        return
+    while True:
+        name = scanner.value()
+        scanner.expect(":")
+        yield name, scanner.value()
+        if not scanner.separator("}"):
+            return
+
+
+def iter_array_items(chunks: Iterator[str], key: str) -> Iterator[object]:
+    """
+    Yields the elements of the array stored under the top level `key`, like the 'assets' of
+    an album, one at a time
+
+    :param chunks: the JSON document as iterator of text pieces, see decode_chunks()
+    :param key: name of the top level member, its value has to be an array
+    :return: generator of the decoded elements
+    """
+    scanner = _Scanner(chunks)
+    if not _enter_member(scanner, key):
+        return
+    scanner.expect("[")
+    if scanner.peek() == "]":
+        return
+    while True:
+        yield scanner.value()
+        if not scanner.separator("]"):
+            return
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Statistics over the whole library: how much space per album, type, year and month, the biggest
+# assets and what sits in more than one album. The assets come in page by page as slim rows and
+# go straight into typed columns (like asset_table.py), album membership is just two integer
+# columns (album row, asset row). Once everything arrived NumPy counts it all at once, a few
+# million assets take seconds instead of minutes of python loops.
+#
+# NumPy is only needed here, every other workflow runs without it.
+
+import csv
+import json
+import os
+from array import array
+
+import requests
+
+import console_garnish as cg
+from asset_table import TYPES
+from immich_client import client_for, ImmichApiError
+from immich_mirror import fresh_mirror
+from progress import Progress
+from reused_tools import sizeof_fmt, recursive_number_input, recursive_minimum_str_input, concurrent_map
+
+STATS_FIELDS = ('id', 'type', 'originalFileName', 'exifInfo.fileSizeInByte', 'exifInfo.dateTimeOriginal', 'createdAt')
+STATS_PAGE_SIZE = 1000
+STATS_WORKERS = 4 # albums whose members are read at the same time
+TOP_COUNT = 20 # largest assets and album overlaps in the report
+_TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+_NO_MONTH = b"0000-00"
+_CSV_TABLES = ('by_type', 'by_year', 'by_month', 'by_album', 'largest', 'overlaps')
+
+
+def _numpy():
+    """
+    :return: the numpy module or None if it isn't installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class LibraryRows:
+    """
+    The slim rows of a whole library as columns, filled page by page. Nothing in here needs
+    NumPy, the columns are handed over as buffers once everything arrived.
+    """
+
+    def __init__(self):
+        self.index: dict[str, int] = {} # AssetUUID -> row
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.types = array('B')
+        self.sizes = array('q')
+        self.months = bytearray() # 7 bytes "YYYY-MM" per row, the digits are read by NumPy later
+        self.album_ids: list[str] = []
+        self.album_names: list[str] = []
+        self.member_album = array('i') # one entry per (album, asset) pair
+        self.member_asset = array('i')
+        self.unknown_members = 0 # album members the asset scan didn't deliver
+        self.failed_albums: dict[int, str] = {} # album row -> error, their members are missing in the counts
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_asset(self, asset_id: str, asset_type: str | None, size: int | None, taken: str | None, name: str) -> None:
+        """
+        :param asset_id: Asset UUID, a second row for the same UUID is ignored
+        :param asset_type: IMAGE, VIDEO, AUDIO or OTHER
+        :param size: file size in byte
+        :param taken: ISO date, only year and month are kept
+        :param name: original file name
+        """
+        if asset_id in self.index:
+            return
+        self.index[asset_id] = len(self.ids)
+        self.ids.append(asset_id)
+        self.names.append(name or "")
+        self.types.append(_TYPE_CODES.get(asset_type, _TYPE_CODES['OTHER']))
+        self.sizes.append(int(size or 0))
+        month = (taken or "")[:7].encode("ascii", "replace")
+        self.months += month if len(month) == 7 and month[4:5] == b"-" else _NO_MONTH
+
+    def add_album(self, album_id: str, name: str) -> int:
+        """
+        :return: the row of the album, used for add_members
+        """
+        self.album_ids.append(album_id)
+        self.album_names.append(name)
+        return len(self.album_ids) - 1
+
+    def rows_of(self, asset_ids) -> tuple[array, int]:
+        """
+        Only reads, so it is fine to call from the worker threads once the asset scan is done
+
+        :param asset_ids: iterable of Asset UUIDs
+        :return: (array of their rows, number of UUIDs without a row)
+        """
+        rows = array('i')
+        unknown = 0
+        for asset_id in asset_ids:
+            row = self.index.get(asset_id)
+            if row is None:
+                unknown += 1
+            else:
+                rows.append(row)
+        return rows, unknown
+
+    def add_members(self, album_row: int, asset_rows: array, unknown: int = 0) -> None:
+        """
+        :param album_row: as returned by add_album
+        :param asset_rows: rows of the members, see rows_of
+        :param unknown: members without a row
+        """
+        self.member_album.extend(array('i', [album_row]) * len(asset_rows))
+        self.member_asset.extend(asset_rows)
+        self.unknown_members += unknown
+
+
+def collect_rows(creds: dict, on_progress=None, on_message=print) -> LibraryRows:
+    """
+    Every asset and every album membership of the key owner, from the mirror if there is a
+    fresh one, otherwise via search/metadata (assets) and album_asset_pages (members)
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param on_progress: called as on_progress(stage, done, total) with stage "assets" or "albums",
+                        total is None while it isn't known
+    :param on_message: see fresh_mirror
+    :return: filled LibraryRows
+    """
+    rows = LibraryRows()
+    if mirror := fresh_mirror(creds, on_message):
+        for page in mirror.asset_pages(STATS_PAGE_SIZE):
+            for asset_id, asset_type, name, size, created_at, taken in page:
+                rows.add_asset(asset_id, asset_type, size, taken or created_at, name)
+            if on_progress:
+                on_progress("assets", len(rows), None)
+        album_rows = {album_id: rows.add_album(album_id, name) for album_id, name in mirror.albums()}
+        for page in mirror.membership_pages(STATS_PAGE_SIZE * 10):
+            for album_id, asset_id in page:
+                if (row := rows.index.get(asset_id)) is None:
+                    rows.unknown_members += 1
+                else:
+                    rows.member_album.append(album_rows[album_id])
+                    rows.member_asset.append(row)
+        if on_progress:
+            on_progress("albums", len(album_rows), len(album_rows))
+        return rows
+    client = client_for(creds)
+    for page in client.search_pages({}, STATS_PAGE_SIZE, STATS_FIELDS):
+        for asset in page:
+            rows.add_asset(asset['id'], asset['type'], asset['exifInfo.fileSizeInByte'],
+                           asset['exifInfo.dateTimeOriginal'] or asset['createdAt'], asset['originalFileName'])
+        if on_progress:
+            on_progress("assets", len(rows), None)
+    resp = client.get("albums")
+    resp.raise_for_status()
+    albums = [(rows.add_album(album['id'], album.get('albumName', "")), album['id']) for album in resp.json()]
+
+    def members(album: tuple) -> tuple[array, int] | str:
+        try:
+            return rows.rows_of(asset['id'] for page in client.album_asset_pages(album[1], ('id',), STATS_PAGE_SIZE)
+                                for asset in page)
+        except (ImmichApiError, requests.exceptions.RequestException) as err: # * runs in a worker, the other albums go on
+            return str(err)
+
+    def on_result(album: tuple, found: tuple[array, int] | str):
+        if isinstance(found, str):
+            rows.failed_albums[album[0]] = found
+        else:
+            rows.add_members(album[0], *found)
+
+    def on_done(done: int, total: int):
+        if on_progress:
+            on_progress("albums", done, total)
+
+    # * appending happens in on_result, that runs in this thread, no lock needed
+    concurrent_map(members, albums, STATS_WORKERS, on_done, on_result)
+    return rows
+
+
+def _grouped(np, keys, sizes) -> tuple:
+    """
+    :return: (sorted distinct keys, count per key, bytes per key)
+    """
+    distinct, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    total = np.bincount(inverse, weights=sizes, minlength=len(distinct))
+    return distinct, counts, total
+
+
+def _overlaps(np, album, asset, top: int) -> list[tuple[int, int, int]]:
+    """
+    Pairs of albums that share assets. The memberships are sorted by asset, so the albums of one
+    asset stand next to each other and each distance d between them is one vectorized step.
+
+    :param album: album row per membership, only memberships of assets that are in several albums
+    :param asset: asset row per membership
+    :param top: how many pairs to keep
+    :return: list of (album row, other album row, shared assets), most shared first
+    """
+    if not len(asset):
+        return []
+    order = np.lexsort((album, asset))
+    album, asset = album[order].astype(np.int64), asset[order]
+    width = int(album.max()) + 1
+    pairs = []
+    for distance in range(1, len(asset)):
+        same = asset[distance:] == asset[:-distance]
+        if not same.any():
+            break # * the members of an asset are consecutive, if no asset is that wide none is wider
+        pairs.append(album[:-distance][same] * width + album[distance:][same])
+    keys, counts = np.unique(np.concatenate(pairs), return_counts=True)
+    best = np.argsort(-counts, kind='stable')[:top]
+    return [(int(keys[i] // width), int(keys[i] % width), int(counts[i])) for i in best]
+
+
+def compute_stats(rows: LibraryRows, top: int = TOP_COUNT) -> dict:
+    """
+    Every number of the report in one go, no python loop over the assets
+
+    :param rows: filled LibraryRows
+    :param top: length of the lists of largest assets and album overlaps
+    :return: report dictionary, plain ints and strings only so it goes into JSON as it is
+    """
+    np = _numpy()
+    if np is None:
+        raise RuntimeError("The library statistics need NumPy: pip install numpy")
+    count = len(rows)
+    types = np.frombuffer(rows.types, dtype=np.uint8) if count else np.zeros(0, np.uint8)
+    sizes = np.frombuffer(rows.sizes, dtype=np.int64) if count else np.zeros(0, np.int64)
+    digits = np.frombuffer(bytes(rows.months), dtype=np.uint8).reshape(-1, 7).astype(np.int64) - ord("0")
+    numeric = digits[:, [0, 1, 2, 3, 5, 6]]
+    years = digits[:, :4] @ np.array([1000, 100, 10, 1])
+    months = digits[:, 5] * 10 + digits[:, 6]
+    valid = ((numeric >= 0) & (numeric <= 9)).all(axis=1) & (years > 0) & (months >= 1) & (months <= 12)
+    years = np.where(valid, years, 0)
+    year_months = np.where(valid, years * 100 + months, 0)
+
+    report = {'assets': count, 'bytes': int(sizes.sum()), 'albums': len(rows.album_ids),
+              'unknown_members': rows.unknown_members,
+              'failed_albums': [{'id': rows.album_ids[row], 'name': rows.album_names[row], 'error': error}
+                                for row, error in rows.failed_albums.items()]}
+    type_counts = np.bincount(types, minlength=len(TYPES))
+    type_bytes = np.bincount(types, weights=sizes, minlength=len(TYPES))
+    report['by_type'] = [{'type': name, 'count': int(type_counts[code]), 'bytes': int(type_bytes[code])}
+                         for code, name in enumerate(TYPES) if type_counts[code]]
+    keys, counts, total = _grouped(np, years, sizes)
+    report['by_year'] = [{'year': int(key) or None, 'count': int(n), 'bytes': int(b)}
+                         for key, n, b in zip(keys, counts, total)]
+    keys, counts, total = _grouped(np, year_months, sizes)
+    report['by_month'] = [{'month': f"{key // 100:04d}-{key % 100:02d}" if key else None, 'count': int(n), 'bytes': int(b)}
+                          for key, n, b in zip(keys.tolist(), counts, total)]
+
+    album_count = len(rows.album_ids)
+    album = np.frombuffer(rows.member_album, dtype=np.int32) if len(rows.member_album) else np.zeros(0, np.int32)
+    asset = np.frombuffer(rows.member_asset, dtype=np.int32) if len(rows.member_asset) else np.zeros(0, np.int32)
+    per_asset = np.bincount(asset, minlength=count) # albums each asset is in
+    member_sizes = sizes[asset]
+    shared = per_asset[asset] > 1
+    album_stats = (np.bincount(album, minlength=album_count),
+                   np.bincount(album, weights=member_sizes, minlength=album_count),
+                   np.bincount(album, weights=types[asset] == _TYPE_CODES['VIDEO'], minlength=album_count),
+                   np.bincount(album, weights=shared, minlength=album_count),
+                   np.bincount(album, weights=member_sizes * shared, minlength=album_count))
+    by_album = [{'id': album_id, 'name': name, 'count': int(n), 'bytes': int(b), 'videos': int(v),
+                 'shared': int(s), 'shared_bytes': int(sb)}
+                for album_id, name, n, b, v, s, sb in zip(rows.album_ids, rows.album_names, *album_stats)]
+    report['by_album'] = sorted(by_album, key=lambda row: (-row['bytes'], row['name']))
+
+    several = per_asset > 1
+    report['several_albums'] = {'assets': int(several.sum()), 'bytes': int(sizes[several].sum()),
+                                'extra_bytes': int((sizes * np.maximum(per_asset - 1, 0)).sum()),
+                                'max_albums': int(per_asset.max()) if count else 0}
+    report['without_album'] = {'assets': int((per_asset == 0).sum()), 'bytes': int(sizes[per_asset == 0].sum())}
+    report['overlaps'] = [{'album': rows.album_names[a], 'other_album': rows.album_names[b], 'shared': n,
+                           'album_id': rows.album_ids[a], 'other_album_id': rows.album_ids[b]}
+                          for a, b, n in _overlaps(np, album[shared], asset[shared], top)]
+
+    largest = min(top, count)
+    best = np.argpartition(sizes, count - largest)[count - largest:] if largest else np.zeros(0, np.int64)
+    best = best[np.argsort(-sizes[best], kind='stable')]
+    report['largest'] = [{'id': rows.ids[i], 'name': rows.names[i], 'type': TYPES[types[i]], 'bytes': int(sizes[i]),
+                          'month': f"{year_months[i] // 100:04d}-{year_months[i] % 100:02d}" if year_months[i] else None,
+                          'albums': int(per_asset[i])}
+                         for i in best.tolist()]
+    return report
+
+
+def export_json(report: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as json_io:
+        json.dump(report, json_io, indent=1, ensure_ascii=False)
+
+
+def export_csv(report: dict, prefix: str) -> list[str]:
+    """
+    One CSV per table of the report, like <prefix>_by_album.csv
+
+    :param report: as returned by compute_stats
+    :param prefix: path and start of the file names
+    :return: list of the written files
+    """
+    os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True) # * stats/library shouldn't need a mkdir first
+    written = []
+    for table in _CSV_TABLES:
+        path = f"{prefix}_{table}.csv"
+        columns = list(report[table][0]) if report[table] else ["empty"]
+        with open(path, "w", newline="", encoding="utf-8") as csv_io:
+            writer = csv.DictWriter(csv_io, columns)
+            writer.writeheader()
+            writer.writerows(report[table])
+        written.append(path)
+    return written
+
+
+def _print_report(report: dict, top: int = 10) -> None:
+    print(f"{report['assets']} assets, {sizeof_fmt(report['bytes'])}, in {report['albums']} albums")
+    print(cg.color("By type:", "bold"))
+    for row in report['by_type']:
+        print(f"\t{row['type']:<8} {row['count']:>9} {sizeof_fmt(row['bytes']):>12}")
+    print(cg.color("By year:", "bold"))
+    for row in report['by_year']:
+        print(f"\t{row['year'] or 'unknown':<8} {row['count']:>9} {sizeof_fmt(row['bytes']):>12}")
+    print(cg.color(f"Largest albums (of {len(report['by_album'])}):", "bold"))
+    for row in report['by_album'][:top]:
+        print(f"\t{row['name'][:40]:<40} {row['count']:>8} {sizeof_fmt(row['bytes']):>12} "
+              f"({row['videos']} videos, {row['shared']} also elsewhere)")
+    several = report['several_albums']
+    print(f"{several['assets']} assets sit in more than one album (up to {several['max_albums']}), counting them "
+          f"once per album adds {sizeof_fmt(several['extra_bytes'])}. "
+          f"{report['without_album']['assets']} assets are in no album at all.")
+    for row in report['overlaps'][:top]:
+        print(f"\t{row['album'][:30]} & {row['other_album'][:30]}: {row['shared']} shared")
+    print(cg.color("Largest assets:", "bold"))
+    for row in report['largest'][:top]:
+        print(f"\t{row['name'][:40]:<40} {row['type']:<6} {sizeof_fmt(row['bytes']):>12} {row['month'] or ''}")
+    for album in report['failed_albums']:
+        print(cg.color(f"Album {album['name']} could not be read, its members are missing: {album['error']}", "pure_red"))
+    if report['unknown_members']:
+        print(cg.color(f"Note: {report['unknown_members']} album members were not part of the asset search "
+                       f"and are not counted.", "grey"))
+
+
+def _collect_with_progress(creds: dict) -> LibraryRows:
+    with Progress() as progress:
+        bars = {'assets': progress.bar("AST"), 'albums': progress.bar("ALB")}
+
+        def on_progress(stage: str, done: int, total: int | None):
+            bars[stage].update(done, total)
+
+        return collect_rows(creds, on_progress, progress.print)
+
+
+def library_stats(creds: dict) -> bool:
+    """
+    Console driven dialogue, collects the whole library, prints the statistics and exports them
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: True if a report was made, False if aborted
+    """
+    print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
+    if _numpy() is None:
+        print(f"Error: {cg.color("The library statistics need NumPy, install it with: pip install numpy", "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    print("Collecting every asset and album of the library, this only reads.")
+    rows = _collect_with_progress(creds)
+    report = compute_stats(rows)
+    while True:
+        ###
+        ### DECISION: EXPORT
+        ###
+        print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
+        _print_report(report)
+        print("1 - Export as CSV (one file per table)")
+        print("2 - Export as JSON")
+        print("3 - <Quit>")
+        number = recursive_number_input(1, 3)
+        if number == 3:
+            return True
+        if number == 1:
+            prefix = recursive_minimum_str_input("File prefix (like stats/library): ", 1)
+            written = export_csv(report, prefix)
+            print(f"Wrote {", ".join(written)}")
+        else:
+            path = recursive_minimum_str_input("JSON file: ", 1)
+            export_json(report, path)
+            print(f"Wrote {path}")
+        input("Press the ENTER key to continue")
+
+
+def library_stats_headless(creds: dict, csv_prefix: str | None = None, json_path: str | None = None) -> bool:
+    """
+    The same as library_stats without asking anything, only reads so there is no dry run
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param csv_prefix: write one CSV per table there, see export_csv
+    :param json_path: write the whole report as JSON there
+    :return: True if the report was made and every album could be read
+    """
+    if _numpy() is None:
+        print(cg.color("[stats] NumPy is missing: pip install numpy", "pure_red"))
+        return False
+    rows = collect_rows(creds)
+    report = compute_stats(rows)
+    print(f"[stats] {report['assets']} assets, {sizeof_fmt(report['bytes'])}, {report['albums']} albums, "
+          f"{report['several_albums']['assets']} assets in more than one album")
+    if csv_prefix:
+        print(f"[stats] Wrote {", ".join(export_csv(report, csv_prefix))}")
+    if json_path:
+        export_json(report, json_path)
+        print(f"[stats] Wrote {json_path}")
+    for album in report['failed_albums']:
+        print(cg.color(f"[stats] Album {album['name']} could not be read: {album['error']}", "pure_red"))
+    return not report['failed_albums']
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
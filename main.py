@@ -19,14 +19,17 @@
 #
 # @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
 
+import argparse
+import importlib
 import requests
 import console_garnish as cg
 import json
 
-from tag_delete_by_regex import tag_delete_by_regex
-from retime_whatsapp_pictures import retime_whatsapp_pictures
-from video_seperation import  video_seperation
+from batch_jobs import add_job_parsers, load_batch_file, headless_credentials, fetch_permissions, \
+    missing_permissions, run_jobs
+from immich_client import client_for, close_all_clients
 from reused_tools import recursive_number_input
+# * the workflow modules are imported once a process is chosen, see PROCESSES
 
 
 def save_credentials_to_json(creds: dict) -> bool:
@@ -90,16 +93,8 @@ def check_api_key_rights(cred: dict, *permissions) -> list | bool | None:
     :param permissions: list of Immich api permissions like 'asset.read'
     :return: False if the endpoint doesnt work at all, True if all fine and a list of missing permissions of any
     """
-    API_KEY = cred['api_key']
-    INSTANCE = cred['instance']
-    url = INSTANCE + "api-keys/me"
-    payload = {}
-    headers = {
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
     try:
-        resp = requests.request("GET", url, headers=headers, data=payload)
+        resp = client_for(cred).api_key_info() # * asked once, every later check uses the same answer
     except requests.exceptions.ConnectionError:
         return None # endpoint entirely wrong
     if resp.status_code == 404: # site not found / url exists but not correct
@@ -109,12 +104,7 @@ def check_api_key_rights(cred: dict, *permissions) -> list | bool | None:
     if resp.status_code == 200: # might have accidentally hit a page that works but is no endpoint:
         if resp.text[:15] == "<!doctype html>":
             return False
-    resp_dict = resp.json()
-    missing_perm = []
-    for perm in permissions: # TODO: there is a better way to probe for list overlap
-        if not perm in resp_dict['permissions']:
-            missing_perm.append(perm)
-    if missing_perm:
+    if missing_perm := missing_permissions(permissions, resp.json()['permissions']):
         return missing_perm
     return True # this is stupid, but if its None its good because nothing is missing
 
@@ -161,13 +151,83 @@ def recursive_api_key_retrieval(skip_file : bool = False) -> dict | bool:
     return creds
 
 PROCESSES = {
-    1: {'name': "Delete Tags by Regex", 'active': True},
-    2: {'name': "ReTime Whatsapp Pictures", 'active': True},
-    3: {'name': "Rollback Tag Deletion", 'active': False},
-    4: {'name': "Put all Videos of an Album in a new Album", 'active': True}
+    1: {'name': "Delete Tags by Regex", 'active': True,
+        'module': "tag_delete_by_regex", 'function': "tag_delete_by_regex",
+        'permissions': ["asset.read", "tag.read", "tag.delete"]}, # search for affected assets, find all tags, delete selected tags
+    2: {'name': "ReTime Whatsapp Pictures", 'active': True,
+        'module': "retime_whatsapp_pictures", 'function': "retime_whatsapp_pictures",
+        'permissions': ["album.read", "asset.read", "asset.update"]},
+    3: {'name': "Rollback Tag Deletion", 'active': True,
+        'module': "tag_rollback", 'function': "tag_rollback",
+        'permissions': ["asset.read", "tag.read", "tag.create", "tag.asset"]}, # existing assignments, find, recreate and reattach tags
+    4: {'name': "Put all Videos of an Album in a new Album", 'active': True,
+        'module': "video_seperation", 'function': "video_seperation",
+        'permissions': ["album.read", "album.create", "albumAsset.create"]},
+    5: {'name': "Library Statistics", 'active': True,
+        'module': "library_stats", 'function': "library_stats",
+        'permissions': ["asset.read", "album.read"]} # only reads, needs numpy
 }
 
+def report_metrics(creds: dict, args: argparse.Namespace, workflow: str | None = None) -> None:
+    """
+    --metrics prints the API calls of the workflow, --metrics-file writes all of them
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param args: parsed command line
+    :param workflow: label used with metrics.start(), None for everything
+    """
+    metrics = client_for(creds).metrics
+    if args.metrics and workflow is not None:
+        print(cg.color("API calls:", "bold"))
+        print(metrics.table(workflow))
+    if args.metrics_file:
+        metrics.write(args.metrics_file)
+        print(cg.color(f"Metrics written to {args.metrics_file}", "grey"))
+
+
+def resume_from_journal(creds: dict, journal_path: str) -> bool:
+    """
+    Picks up an interrupted tag deletion or date rewrite where its journal says it stopped
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param journal_path: the Journal_*.jsonl file of the interrupted run
+    :return: whatever the resumed process returns, False if the journal is unusable
+    """
+    from op_journal import OperationJournal
+    try:
+        journal = OperationJournal.load(journal_path)
+    except (OSError, ValueError) as err:
+        print(cg.color(f"Could not read journal {journal_path}: {err}", "pure_red"))
+        return False
+    if journal.operation == "tag_delete":
+        from tag_delete_by_regex import resume_tag_deletion
+        return resume_tag_deletion(creds, journal)
+    if journal.operation == "asset_date":
+        from retime_whatsapp_pictures import resume_asset_dates
+        return resume_asset_dates(creds, journal)
+    print(cg.color(f"Don't know how to resume '{journal.operation}'", "pure_red"))
+    return False
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temporary Immich Help Scripts")
+    parser.add_argument("--resume", metavar="JOURNAL", help="continue an interrupted run from its Journal_*.jsonl")
+    parser.add_argument("--metrics", action="store_true", help="print calls, status codes, bytes and latency per endpoint")
+    parser.add_argument("--metrics-file", metavar="PATH", help="write those metrics, *.prom for the node exporter, else JSON")
+    add_job_parsers(parser)
+    args = parser.parse_args()
+    if args.command: # * headless, no menus, no input(), see batch_jobs.py
+        jobs = load_batch_file(parser, args.file, args.yes) if args.command == "batch" else [args]
+        if not (creds := headless_credentials(retrieve_api_key)):
+            print(cg.color("No credentials, set IMMICH_INSTANCE and IMMICH_API_KEY or create api_key.json", "pure_red"))
+            exit(2)
+        if (granted := fetch_permissions(creds)) is None:
+            print(cg.color(f"API endpoint {creds['instance']} or key doesn't work", "pure_red"))
+            exit(2)
+        failed = run_jobs(creds, granted, jobs, args.metrics)
+        report_metrics(creds, args)
+        close_all_clients()
+        exit(1 if failed else 0)
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts","bright_purple")}")
     print(f"Hello, Welcome to {cg.strike("Aperture Science Enrichment Center")}")
     print(f"...{cg.color("Temporary Immich Help Scripts", "pure_red")}")
@@ -178,6 +238,11 @@ if __name__ == "__main__":
         input("Press the mighty ANY key to exit()")
         exit(1)
     print("Looks good, proceeding...")
+    if args.resume:
+        client_for(creds).metrics.start("resume")
+        resumed = resume_from_journal(creds, args.resume)
+        report_metrics(creds, args, "resume")
+        exit(0 if resumed else 1)
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts","bright_purple")}")
     print(cg.color("Choose a scripted process:", "bold"))
     for i, each in PROCESSES.items():
@@ -187,37 +252,19 @@ if __name__ == "__main__":
             print(cg.strike(f"{i} {each['name']}"))
     print("\n0 - Exit")
     print(cg.color("Choose process by Number", "dull_white"))
-    number = recursive_number_input(0, 4)
+    number = recursive_number_input(0, len(PROCESSES))
     if number == 0:
         exit(0)
     print(f"Congratulations, your chosen process is {cg.color(PROCESSES[number]['name'], "bold")}")
     # when the permissions are in order..you never see this because it gets overwritten by the next part of the script
-    if number == 1:
-        print("Checking if the provided API key got the correct permissions.")
-        needed_perm = ["asset.read", "tag.read", "tag.delete"]  # search for affected assets, find all tags, delete selected tags
-        if missing := check_api_key_rights(creds, *needed_perm):
-            if isinstance(missing, list):
-                print(f"Permissions are missing: {", ".join(missing)}")
-                print("Aborting, see ya next time")
-                input("Press the ENTER key to exit()")
-        tag_delete_by_regex(creds)
-
-    if number == 2:
-        print("Checking if the provided API key got the correct permissions.")
-        needed_perm = ["album.read", "asset.update"]
-        if missing := check_api_key_rights(creds, *needed_perm):
-            if isinstance(missing, list):
-                print(f"Permissions are missing: {", ".join(missing)}")
-                print("Aborting, see ya next time")
-                input("Press the ENTER key to exit()")
-        retime_whatsapp_pictures(creds)
-
-    if number == 4:
-        print("Checking if the provided API key got the correct permissions.")
-        needed_perm = ["album.read", "album.create"]
-        if missing := check_api_key_rights(creds, *needed_perm):
-            if isinstance(missing, list):
-                print(f"Permissions are missing: {", ".join(missing)}")
-                print("Aborting, see ya next time")
-                input("Press the ENTER key to exit()")
-        video_seperation(creds)
+    process = PROCESSES[number]
+    print("Checking if the provided API key got the correct permissions.")
+    if missing := check_api_key_rights(creds, *process['permissions']):
+        if isinstance(missing, list):
+            print(f"Permissions are missing: {", ".join(missing)}")
+            print("Aborting, see ya next time")
+            input("Press the ENTER key to exit()")
+            exit(1)
+    client_for(creds).metrics.start(process['function'])
+    getattr(importlib.import_module(process['module']), process['function'])(creds)
+    report_metrics(creds, args, process['function'])
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Journal of a long running operation, plain JSON lines that only ever get appended:
+#
+#   {"journal": 1, "operation": "tag_delete", "created": "<iso>", "meta": {...}}
+#   {"plan": {"<key>": <value>, ...}}                 what is supposed to happen, in slices
+#   {"state": "done", "keys": ["<key>", ...]}         progress, the last state of a key wins
+#   {"state": "saved", "keys": ["<key>", ...]}        intermediate states are allowed as well
+#   {"state": "failed", "errors": {"<key>": "<message>"}}  (or another failed state like "unsaved")
+#   {"meta": {...}}                                   additional info like phases or file names
+#
+# A line cut off by a crash is ignored, so the worst case is repeating the last few calls.
+
+import datetime
+import json
+import os
+import threading
+import time
+
+JOURNAL_VERSION = 1
+PLAN_SLICE = 1000 # plan entries per line
+FSYNC_INTERVAL = 1.0 # seconds, lines are flushed always, but only forced to disk this often
+
+DONE = "done"
+FAILED = "failed"
+SAVED = "saved" # e.g. snapshotted for the rollback but not yet deleted
+UNSAVED = "unsaved" # the snapshot for the rollback failed, must not be deleted before a retry worked
+
+
+def new_journal_name(operation: str) -> str:
+    return f"Journal_{operation}_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl"
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as journal_io:
+        journal_io.seek(-1, os.SEEK_END)
+        return journal_io.read(1) == b"\n"
+
+
+class OperationJournal:
+    """
+    Records the planned work of an operation and the state of every planned key while it runs,
+    so an interrupted run can pick up where it stopped
+    """
+
+    def __init__(self, path: str, operation: str, plan: dict, meta: dict | None = None,
+                 states: dict | None = None, errors: dict | None = None):
+        self.path = path
+        self.operation = operation
+        self.plan = plan
+        self.meta = meta or {}
+        self.states: dict[str, str] = states or {}
+        self.errors: dict[str, str] = errors or {}
+        self.lock = threading.Lock()
+        self.io = open(path, "a")
+        if self.io.tell() and not _ends_with_newline(path): # * the cut off line of a crash, don't glue onto it
+            self.io.write("\n")
+            self.io.flush()
+        self.last_sync = time.monotonic()
+
+    @classmethod
+    def create(cls, path: str, operation: str, plan: dict, meta: dict | None = None) -> "OperationJournal":
+        """
+        Starts a new journal
+
+        :param path: file name, see new_journal_name()
+        :param operation: what kind of work, like 'tag_delete' or 'asset_date'
+        :param plan: {key: value} of everything that is going to happen
+        :param meta: anything else the resume needs to know
+        :return: the open journal
+        """
+        journal = cls(path, operation, plan, meta)
+        journal._write({'journal': JOURNAL_VERSION, 'operation': operation,
+                        'created': datetime.datetime.now().isoformat(), 'meta': journal.meta})
+        items = list(plan.items())
+        for i in range(0, len(items), PLAN_SLICE):
+            journal._write({'plan': dict(items[i:i + PLAN_SLICE])})
+        journal._sync(force=True)
+        return journal
+
+    @classmethod
+    def load(cls, path: str) -> "OperationJournal":
+        """
+        Reads an existing journal, new progress gets appended to the same file
+
+        :param path: file name of the journal
+        :return: the open journal
+        """
+        operation, meta, plan, states, errors = None, {}, {}, {}, {}
+        with open(path, "r") as journal_io:
+            for line in journal_io:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # * the cut off last line of a crash
+                if 'journal' in entry:
+                    operation = entry['operation']
+                    meta.update(entry.get('meta', {}))
+                elif 'plan' in entry:
+                    plan.update(entry['plan'])
+                elif 'meta' in entry:
+                    meta.update(entry['meta'])
+                elif 'errors' in entry:
+                    for key, message in entry['errors'].items():
+                        states[key] = entry['state']
+                        errors[key] = message
+                elif 'state' in entry:
+                    for key in entry['keys']:
+                        states[key] = entry['state']
+                        errors.pop(key, None)
+        if operation is None:
+            raise ValueError(f"{path} is not a journal")
+        return cls(path, operation, plan, meta, states, errors)
+
+    def _write(self, entry: dict) -> None:
+        self.io.write(json.dumps(entry) + "\n")
+        self.io.flush()
+
+    def _sync(self, force: bool = False) -> None:
+        if force or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+            os.fsync(self.io.fileno())
+            self.last_sync = time.monotonic()
+
+    def mark(self, keys, state: str) -> None:
+        """
+        :param keys: iterable of plan keys
+        :param state: their new state, like DONE or SAVED
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        with self.lock:
+            for key in keys:
+                self.states[key] = state
+                self.errors.pop(key, None)
+            self._write({'state': state, 'keys': keys})
+            self._sync()
+
+    def mark_done(self, keys) -> None:
+        self.mark(keys, DONE)
+
+    def mark_failed(self, errors: dict, state: str = FAILED) -> None:
+        """
+        :param errors: {key: message} of plan keys that failed
+        :param state: which kind of failure, FAILED or something like UNSAVED
+        """
+        if not errors:
+            return
+        with self.lock:
+            for key, message in errors.items():
+                self.states[key] = state
+                self.errors[key] = message
+            self._write({'state': state, 'errors': errors})
+            self._sync()
+
+    def update_meta(self, **meta) -> None:
+        with self.lock:
+            self.meta.update(meta)
+            self._write({'meta': meta})
+            self._sync(force=True)
+
+    def pending(self, skip: tuple = (DONE,)) -> dict:
+        """
+        :param skip: states that count as finished
+        :return: {key: value} of the plan that is not finished yet, failed ones included
+        """
+        return {key: value for key, value in self.plan.items() if self.states.get(key) not in skip}
+
+    def summary(self) -> str:
+        done = sum(1 for key in self.plan if self.states.get(key) == DONE)
+        failed = sum(1 for key in self.plan if key in self.errors)
+        return f"{done} of {len(self.plan)} done, {failed} failed, {len(self.plan) - done - failed} untouched"
+
+    def close(self) -> None:
+        with self.lock:
+            self._sync(force=True)
+            self.io.close()
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Progress bars that cost nearly nothing per item. Updates only count, the drawing happens at
+# most every `interval` seconds (10 Hz), so a 100k loop doesn't spend its time on the terminal.
+# Several bars can be shown at once (parallel stages), all of it is thread safe, and if stdout
+# is not a terminal (cron, a pipe, a log file) it writes a plain line every few seconds instead.
+#
+#   with Progress() as progress:
+#       bar = progress.bar("DEL", len(tags))
+#       for tag in tags:
+#           ...
+#           bar.advance(errors=0 if ok else 1)
+
+import shutil
+import sys
+import threading
+import time
+
+DRAW_INTERVAL = 0.1 # seconds between two redraws, 10 Hz
+LOG_INTERVAL = 5.0 # seconds between two log lines if stdout is no terminal
+
+
+def _duration(seconds: float) -> str:
+    """
+    :return: h:mm:ss or m:ss
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressBar:
+    """
+    One line of a Progress, knows its counts and start time, drawing is done by the Progress
+    """
+
+    def __init__(self, progress: "Progress", label: str, total: int | None = None):
+        self.progress = progress
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self.finished: float | None = None
+        self.logged = False # final log line written, only without a terminal
+
+    def advance(self, count: int = 1, errors: int = 0) -> None:
+        """
+        :param count: items finished since the last call
+        :param errors: how many of those failed
+        """
+        with self.progress.lock:
+            self.done += count
+            self.errors += errors
+        self.progress.tick()
+
+    def update(self, done: int, total: int | None = None, errors: int | None = None) -> None:
+        """
+        Absolute numbers, fits the on_progress(done, total) callbacks of the workflows directly
+
+        :param done: items finished so far
+        :param total: changes the total if given
+        :param errors: failed items so far
+        """
+        with self.progress.lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+            if errors is not None:
+                self.errors = errors
+        self.progress.tick()
+
+    def finish(self) -> None:
+        with self.progress.lock:
+            self.finished = self.finished or time.monotonic()
+        self.progress.tick(force=True)
+
+    def stats(self) -> str:
+        """
+        :return: "123/1000 45.2/s ETA 0:19 2 errors", without the parts that are unknown
+        """
+        elapsed = (self.finished or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        text = f"{self.done}/{self.total}" if self.total else f"{self.done}"
+        text += f" {rate:.1f}/s"
+        if self.finished:
+            text += f" in {_duration(elapsed)}"
+        elif self.total and rate > 0:
+            text += f" ETA {_duration((self.total - self.done) / rate)}"
+        if self.errors:
+            text += f" {self.errors} errors"
+        return text
+
+    def render(self, width: int) -> str:
+        """
+        :param width: columns of the terminal
+        :return: LABEL|=====>     |stats, the bar takes whatever space is left
+        """
+        stats = self.stats()
+        space = width - len(self.label) - len(stats) - 3 # 3 character long garnish
+        if not self.total or space < 10:
+            return f"{self.label} {stats}"[:width - 1]
+        filled = min(space, round(self.done / self.total * space))
+        arrow = "" if filled == space else ">"
+        return f"{self.label}|{"=" * filled}{arrow}{" " * (space - filled - len(arrow))}|{stats}"
+
+
+class Progress:
+    """
+    A group of bars drawn together, use as context manager so the last state is always drawn
+    """
+
+    def __init__(self, out=None, interval: float = DRAW_INTERVAL, log_interval: float = LOG_INTERVAL):
+        """
+        :param out: stream to draw on, None is sys.stdout at the time of creation
+        :param interval: seconds between redraws on a terminal
+        :param log_interval: seconds between log lines on anything else
+        """
+        self.out = out or sys.stdout
+        self.tty = hasattr(self.out, "isatty") and self.out.isatty()
+        self.interval = interval if self.tty else log_interval
+        self.lock = threading.RLock()
+        self.bars: list[ProgressBar] = []
+        self.drawn = 0 # lines of the last drawing, the cursor sits below them
+        self.next_draw = 0.0
+
+    def bar(self, label: str, total: int | None = None) -> ProgressBar:
+        """
+        :param label: short text in front, like "DEL"
+        :param total: number of items, None if unknown
+        :return: a new bar below the existing ones
+        """
+        with self.lock:
+            self.bars.append(bar := ProgressBar(self, label, total))
+        return bar
+
+    def tick(self, force: bool = False) -> None:
+        """
+        Draws if the last drawing is older than the interval, otherwise does nothing (cheaply)
+
+        :param force: draw now
+        """
+        if not force and time.monotonic() < self.next_draw: # * unlocked peek, the common case
+            return
+        with self.lock:
+            now = time.monotonic()
+            if not force and now < self.next_draw:
+                return
+            self.next_draw = now + self.interval
+            self._draw()
+
+    def _draw(self) -> None:
+        if not self.tty:
+            for bar in self.bars:
+                if bar.logged:
+                    continue # * finished ones only once
+                self.out.write(f"{bar.label} {bar.stats()}\n")
+                bar.logged = bar.finished is not None
+            self.out.flush()
+            return
+        width = shutil.get_terminal_size().columns
+        text = f"\x1b[{self.drawn}F" if self.drawn else ""
+        text += "".join(f"\x1b[2K{bar.render(width)}\n" for bar in self.bars)
+        self.out.write(text)
+        self.out.flush()
+        self.drawn = len(self.bars)
+
+    def print(self, *args, **kwargs) -> None:
+        """
+        print() that doesn't break the bars, the message goes above them
+        """
+        with self.lock:
+            if self.tty and self.drawn:
+                self.out.write(f"\x1b[{self.drawn}F\x1b[J")
+                self.drawn = 0
+            print(*args, file=self.out, **kwargs)
+            if self.tty:
+                self._draw()
+
+    def close(self) -> None:
+        """
+        Marks every bar as finished and draws the final state, which stays on the screen
+        """
+        with self.lock:
+            now = time.monotonic()
+            for bar in self.bars:
+                bar.finished = bar.finished or now
+            self.next_draw = now + self.interval
+            self._draw()
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+THROTTLE_STATUS = (429, 503) # the server explicitly says "not now"
+THROUGHPUT_WINDOW = 10.0 # seconds the throughput metric looks back
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Retry-After is either a number of seconds or a http date
+
+    :param value: the header value
+    :return: seconds to wait or None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AimdController:
+    """
+    Decides how many requests may be in flight at once. Every good response raises the limit
+    by one per "round" (additive increase), every 429/5xx or too slow response cuts it in half
+    (multiplicative decrease), like TCP does with its window. A Retry-After pauses everybody.
+    """
+
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 16,
+                 increase: float = 1.0, decrease: float = 0.5, latency_target: float = 5.0):
+        """
+        :param initial: limit at the start
+        :param minimum: the limit never goes below, 1 means sequential
+        :param maximum: the limit never goes above, should not be more than the connection pool
+        :param increase: added to the limit once per full window of good responses
+        :param decrease: factor the limit is multiplied with on pressure
+        :param latency_target: seconds, slower responses count as pressure
+        """
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.completed = 0
+        self.throttled = 0
+        self.slow = 0
+        self.finished_at: deque[float] = deque()
+        self.cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Blocks till a slot is free and no pause is active
+
+        :return: start time, hand it back to release()
+        """
+        with self.cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < max(1, int(self.limit)):
+                    break
+                self.cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, status: int | None, retry_after: float | None = None) -> None:
+        """
+        Gives the slot back and feeds the result into the limit
+
+        :param started: what acquire() returned
+        :param status: http status code, None for connection errors
+        :param retry_after: seconds the server asked us to wait
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self.cond:
+            self.in_flight -= 1
+            self.completed += 1
+            self.finished_at.append(now)
+            while self.finished_at and self.finished_at[0] < now - THROUGHPUT_WINDOW:
+                self.finished_at.popleft()
+            pressure = status is None or status in THROTTLE_STATUS or status >= 500
+            if status in THROTTLE_STATUS:
+                self.throttled += 1
+            if not pressure and latency > self.latency_target:
+                self.slow += 1
+                pressure = True
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if pressure:
+                # * only once per round, requests started before the last cut saw the old load
+                if started >= self.last_decrease:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self.cond.notify_all()
+
+    def metrics(self) -> dict:
+        """
+        :return: {'limit', 'in_flight', 'completed', 'throttled', 'slow', 'throughput'} throughput in req/s
+        """
+        with self.cond:
+            now = time.monotonic()
+            recent = [t for t in self.finished_at if t >= now - THROUGHPUT_WINDOW]
+            span = min(THROUGHPUT_WINDOW, now - recent[0]) if recent else 0
+            return {'limit': round(self.limit, 2), 'in_flight': self.in_flight, 'completed': self.completed,
+                    'throttled': self.throttled, 'slow': self.slow,
+                    'throughput': round(len(recent) / span, 2) if span > 0 else 0.0}
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -20,15 +20,23 @@
 # @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
 
 import requests
-import json
 from datetime import datetime
-import re
+from typing import Iterator
 
 import console_garnish as cg
-from reused_tools import recursive_input_regex, recursive_number_input, simple_progress_bar
+from filename_dates import DATE_RULES, extract_date, extract_dates
+from immich_client import client_for, ImmichApiError
+from immich_mirror import fresh_mirror, mirror_for
+from op_journal import OperationJournal, new_journal_name
+from progress import Progress
+from reused_tools import recursive_input_regex, recursive_number_input
 
-WA_IMAGE_REGEX = r"(IMG-)([0-9]{8})(-WA[0-9]{4}.jpg)"  # ? change this if you got like .jpeg or so
-# ! match  group 2 must be the date
+# ? the file name patterns moved to filename_dates.DATE_RULES, add new ones there
+ALBUM_FIELDS = ('id', 'originalFileName')
+LIBRARY_FIELDS = ('id', 'originalFileName', 'exifInfo.dateTimeOriginal')
+LIBRARY_PAGE_SIZE = 1000
+DATE_CHUNK_SIZE = 500 # ids per PUT, all WhatsApp pictures of one day get the very same timestamp anyway
+BISECT_STATUS = (400, 403, 404) # refusals a single bad id can cause, only those are worth splitting the chunk
 
 
 def _change_asset_date(creds: dict, photo_uuid: str, new_date: str) -> requests.Response:
@@ -46,85 +54,246 @@ def _change_asset_date(creds: dict, photo_uuid: str, new_date: str) -> requests.
     :param new_date: the new date in datetime.isoformat(timespec='milliseconds')
     :return: the pure request object from the request library
     """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = f"{INSTANCE}assets"
-    payload = json.dumps({
+    return _change_assets_date(creds, [photo_uuid], new_date)
+
+
+def _change_assets_date(creds: dict, photo_uuids: list, new_date: str) -> requests.Response:
+    """
+    Same as _change_asset_date but for many assets that get the very same date, the endpoint
+    takes a list of ids anyway
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param photo_uuids: list of asset uuids
+    :param new_date: the new date in datetime.isoformat(timespec='milliseconds')
+    :return: the pure request object from the request library
+    """
+    payload = {
         "dateTimeOriginal": new_date,
-        "ids": [
-            photo_uuid
-        ]
-    })
-    headers: dict[str, str] = { # its so obvious that i c&p this from elsewhere
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
+        "ids": photo_uuids
     }
-    return requests.request("PUT", url, headers=headers, data=payload)
+    return client_for(creds).put("assets", payload)
+
+
+def _put_date_chunk(creds: dict, photo_uuids: list, new_date: str, errors: dict) -> None:
+    """
+    Sends one chunk, if the server refuses the chunk because of its ids (400, 403, 404) it gets
+    split in half till the culprits are found, so those errors are still reported per asset.
+    Throttling or a server error has nothing to do with single ids, then the whole chunk fails
+    at once instead of trying every id on its own against a server that is down.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param photo_uuids: list of asset uuids that all get new_date
+    :param new_date: the new date in datetime.isoformat(timespec='milliseconds')
+    :param errors: dictionary {UUID: "<status> - <text>"} that gets filled with the failed assets
+    """
+    resp = _change_assets_date(creds, photo_uuids, new_date)
+    if resp.status_code == 204: # 204 NO CONTENT is to expected when doing a put
+        return
+    if resp.status_code not in BISECT_STATUS:
+        message = f"{resp.status_code} - {resp.text}"
+        if len(photo_uuids) > 1:
+            message = f"chunk of {len(photo_uuids)} failed: {message}"
+        errors.update(dict.fromkeys(photo_uuids, message)) # * per id anyway, the journal retries them
+        return
+    if len(photo_uuids) == 1:
+        errors[photo_uuids[0]] = f"{resp.status_code} - {resp.text}"
+        return
+    half = len(photo_uuids) // 2
+    _put_date_chunk(creds, photo_uuids[:half], new_date, errors)
+    _put_date_chunk(creds, photo_uuids[half:], new_date, errors)
+
+
+def _apply_asset_dates(creds: dict, dict_of_uuids: dict, chunk_size: int = DATE_CHUNK_SIZE,
+                       on_progress=None, journal: OperationJournal | None = None) -> dict:
+    """
+    Groups the assets by their new date and sends one PUT per chunk of each group instead
+    of one per asset
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param dict_of_uuids: {<UUID:str>: <ISODATE:str>}
+    :param chunk_size: maximum number of ids per PUT
+    :param on_progress: called as on_progress(done, total, failed) after each chunk
+    :param journal: if given every chunk is recorded there as done or failed
+    :return: the errors as {UUID: "<status> - <text>"}, empty if all went fine
+    """
+    by_date: dict[str, list] = {}
+    for key, value in dict_of_uuids.items():
+        by_date.setdefault(value, []).append(key)
+    countdown = len(dict_of_uuids)
+    done = 0
+    errors = {}
+    mirror = mirror_for(creds)
+    for new_date, photo_uuids in by_date.items():
+        for i in range(0, len(photo_uuids), chunk_size):
+            chunk = photo_uuids[i:i + chunk_size]
+            chunk_errors = {}
+            _put_date_chunk(creds, chunk, new_date, chunk_errors)
+            if journal:
+                journal.mark_done(uuid for uuid in chunk if uuid not in chunk_errors)
+                journal.mark_failed(chunk_errors)
+            if mirror: # * otherwise the next library run within mirror_max_age would see the old dates
+                mirror.set_dates({uuid: new_date for uuid in chunk if uuid not in chunk_errors})
+            errors.update(chunk_errors)
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, countdown, len(errors))
+    return errors
 
 
 def _extract_wa_image_date(file_name: str) -> datetime | None:
     """
-    Throws Regex on a provided file_name, also double as check
-    if the file name actually fits the prescribed format
+    Reads the date out of a provided file_name, also double as check
+    if the file name actually fits one of the known formats, see filename_dates.py
 
     :param file_name: random file name
-    :return: None if no match was found, otherwise a datetime (with 12:04 and 6 seconds as time part)
+    :return: None if no match was found, otherwise a datetime (with 12:04 and 6 seconds as time part for WhatsApp)
     """
-    pattern = re.compile(WA_IMAGE_REGEX)
-    matches = pattern.match(file_name)
-    if not matches:
-        return None
-    yearmonthday = matches.group(2)
-    return datetime.strptime(f"{yearmonthday}-120406", "%Y%m%d-%H%M%S") #12:04:06 is just a random time
+    iso = extract_date(file_name)
+    return datetime.fromisoformat(iso) if iso else None
 
 
-def _check_album_uuid(creds: dict, album_uuid: str) -> None | dict:
+def _check_album_uuid(creds: dict, album_uuid: str) -> None | Iterator[dict]:
     """
-    Sends an API call and checks if the album actually exists.
+    Sends an API call and checks if the album actually exists. The members come page by page
+    with only id and file name, the album is never downloaded in one piece
 
     :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param album_uuid: Immich Album UUID
-    :return: None if the UUID didn't yield, or a dict {AssetUUID: AssetFileName}
+    :return: None if the UUID didn't yield, or a generator of dicts {AssetUUID: AssetFileName}, one per page
     """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = f"{INSTANCE}albums/{album_uuid}"
+    if (mirror := fresh_mirror(creds)) and mirror.has_album(album_uuid):
+        return iter([{row[0]: row[2] for row in mirror.album_assets(album_uuid)}])
+    client = client_for(creds)
+    if client.album_info(album_uuid) is None:
+        return None
+    # ? names should be like "IMG-20150112-WA0017.jpg"
+    return ({asset['id']: asset['originalFileName'] for asset in page}
+            for page in client.album_asset_pages(album_uuid, ALBUM_FIELDS))
 
-    payload = {}
-    headers = {
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    response = requests.request("GET", url, headers=headers, data=payload)
-    if response.status_code != 200: # so success
+
+def _dates_from_names(names: dict, sequence_order: bool = False) -> tuple[dict, list]:
+    """
+    Converts file names to the new dates
+
+    :param names: dict {AssetUUID: AssetFileName}
+    :param sequence_order: add the WA#### counter as seconds, so one day keeps its order (costs one PUT per asset)
+    :return: ({AssetUUID: ISODATE}, [file names that didn't fit the pattern])
+    """
+    return extract_dates(names, sequence_order)
+
+
+def _album_dates(creds: dict, album_uuid: str, sequence_order: bool = False) -> None | tuple[int, dict, list]:
+    """
+    Converts the names of an album page by page while they arrive, only the resulting dates are kept
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param album_uuid: Immich Album UUID
+    :param sequence_order: see _dates_from_names
+    :return: None if the album doesn't exist, else (number of assets, {AssetUUID: ISODATE}, [file names that didn't fit])
+    """
+    if (pages := _check_album_uuid(creds, album_uuid)) is None:
         return None
-    album_info = response.json()
-    name_list = {}
-    for i, asset in enumerate(album_info['assets']):
-        name_list[asset['id']] = asset['originalFileName']
-        # ? names should be like "IMG-20150112-WA0017.jpg"
-    return name_list
+    count = 0
+    new_dates = {}
+    list_of_errors = []
+    for names in pages:
+        page_dates, page_errors = _dates_from_names(names, sequence_order)
+        new_dates.update(page_dates)
+        list_of_errors.extend(page_errors)
+        count += len(names)
+    return count, new_dates, list_of_errors
+
+
+def _same_date(current: str | None, new_date: str) -> bool:
+    """
+    Compared to the second, the server answers with an offset or a Z, the new date has none
+
+    :param current: dateTimeOriginal as the server has it, can be None
+    :param new_date: date out of the file name, like 2015-01-12T12:04:06.000
+    :return: True if nothing would change
+    """
+    return bool(current) and current[:19].replace(" ", "T") == new_date[:19]
+
+
+def _library_candidates(creds: dict, on_message=print) -> Iterator[list[tuple]]:
+    """
+    Every asset of the library whose name starts like one of the known formats, page by page.
+    search/metadata filters originalFileName with a "contains", so the start is checked again here
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param on_message: see fresh_mirror
+    :return: generator of lists of (AssetUUID, AssetFileName, current dateTimeOriginal)
+    """
+    prefixes = sorted({rule.prefix for rule in DATE_RULES})
+    if mirror := fresh_mirror(creds, on_message):
+        for prefix in prefixes:
+            yield mirror.assets_named(prefix)
+        return
+    client = client_for(creds)
+    for prefix in prefixes:
+        for page in client.search_pages({'originalFileName': prefix}, LIBRARY_PAGE_SIZE, LIBRARY_FIELDS):
+            yield [(asset['id'], asset['originalFileName'], asset['exifInfo.dateTimeOriginal'])
+                   for asset in page if asset['originalFileName'].startswith(prefix)]
 
 
-def _bulk_change_asset_date(creds:dict, dict_of_uuids: dict) -> bool:
+def _library_dates(creds: dict, sequence_order: bool = False, on_page=None,
+                   on_message=print) -> tuple[int, dict, int]:
     """
-    Changes all provided assets to the accompanied date
+    Goes through the whole library instead of an album, only assets whose current date doesn't
+    match their name are kept, so a second run has (nearly) nothing to do. Names that only look
+    like one of the formats are no error here, they are just not part of it
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param sequence_order: see _dates_from_names
+    :param on_page: called as on_page(assets_seen) after every page
+    :param on_message: see fresh_mirror
+    :return: (number of assets with a date in the name, {AssetUUID: ISODATE} that differ, number already right)
+    """
+    seen = fitting = unchanged = 0
+    new_dates = {}
+    for page in _library_candidates(creds, on_message):
+        for asset_uuid, file_name, current in page:
+            if (new_date := extract_date(file_name, sequence_order)) is None:
+                continue
+            fitting += 1
+            if _same_date(current, new_date):
+                unchanged += 1
+            else:
+                new_dates[asset_uuid] = new_date
+        seen += len(page)
+        if on_page:
+            on_page(seen)
+    return fitting, new_dates, unchanged
+
+
+def _write_error_log(list_of_errors: list) -> str:
+    """
+    :param list_of_errors: file names that didn't fit
+    :return: name of the written log file
+    """
+    log_file = f"WA-Errors_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log"
+    with open(log_file, "w") as log_io:
+        for file_name in list_of_errors:
+            log_io.write(f"{file_name}\n")
+    return log_file
+
+
+def _bulk_change_asset_date(creds:dict, dict_of_uuids: dict, journal: OperationJournal | None = None) -> bool:
+    """
+    Changes all provided assets to the accompanied date, assets with the same date
+    are sent together, see _apply_asset_dates
 
     Provides rudimentary interface for error handling
 
     :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param dict_of_uuids: {<UUID:str>: <ISODATE:str>}
+    :param journal: if given the progress is recorded there, see resume_asset_dates
     :return: Always True
     """
     countdown = len(dict_of_uuids)
-    errors = {}
-    for i, (key, value) in enumerate(dict_of_uuids.items()):
-        simple_progress_bar(i, countdown, "PUT", f"{i + 1}/{countdown}")
-        resp = _change_asset_date(creds, key, value)
-        if resp.status_code != 204: # 204 NO CONTENT is to expected when doing a put
-            errors[key] = f"{resp.status_code} - {resp.text}"
-    simple_progress_bar(0, 0, clear=True)
+    with Progress() as progress:
+        errors = _apply_asset_dates(creds, dict_of_uuids, on_progress=progress.bar("PUT", countdown).update,
+                                    journal=journal)
     if len(errors) > 0:
         print(cg.color(f"There were {len(errors)} errors in the process (of {countdown} entries in total)", "pure_red"))
         print(f"There are two choices now")
@@ -147,19 +316,32 @@ def retime_whatsapp_pictures(creds) -> bool:
     """
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
     print("Let's scramble the dates of a few files")
+    ###
+    ### DECISION: ALBUM OR LIBRARY
+    ###
+    print("1 - Pictures of an album (you put them there by hand)")
+    print("2 - The whole library, only assets whose date doesn't match their name")
+    print("3 - <Abort/Quit>")
+    number = recursive_number_input(1, 3)
+    if number == 3:
+        return False
+    if number == 2:
+        return _retime_library(creds)
     print(cg.color("Note: This works as follows: you first put the pictures you want manually into an album","grey"))
     print(cg.color("Then, you copy & paste the UUID here and \"I\" do the magic. Hopefully","grey"))
     album_uuid = input("Album UUID: ")
-    names = _check_album_uuid(creds, album_uuid)
-    new_dates = {}
-    list_of_errors = []
-    for key, value in names.items():
-        if new_date := _extract_wa_image_date(value):
-            new_dates[key] = new_date.isoformat(timespec='milliseconds')
-        else:
-            list_of_errors.append(value)
+    try:
+        album = _album_dates(creds, album_uuid)
+    except ImmichApiError as err:
+        album = None
+        print(err)
+    if album is None:
+        print(f"Error: {cg.color(f"Album {album_uuid} could not be fetched", "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    asset_count, new_dates, list_of_errors = album
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
-    print(f"<I/We> found {len(names)} entries in Album {album_uuid}")
+    print(f"<I/We> found {asset_count} entries in Album {album_uuid}")
     print(f"<We/I> already converted all file names to proper datetimes and back to an ISO Format")
     if len(list_of_errors) > 0:
         print(f"...but with {len(list_of_errors)} errors. Do you wish to review those? (Comes in 500 Batches)")
@@ -174,18 +356,112 @@ def retime_whatsapp_pictures(creds) -> bool:
                     print(f"Haltpoint - More entries ({(len(list_of_errors) - i)}) to come, press ENTER")
                     input()
         if number == 2:
-            log_file = f"WA-Errors_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log"
-            with open(log_file, "w") as log_io:
-                for file_name in list_of_errors:
-                    log_io.write(f"{file_name}\n")
+            log_file = _write_error_log(list_of_errors)
             print(f"Written all errors to local log file {log_file}")
     else:
         print("...without any errors. Which is awesome by the way. Good job building that album!")
     print("\nDo you wish to carry on and set new dates for ALL files")
-    print(cg.color("Note: Every single change is an https API call..that takes time", "grey"))
+    print(cg.color(f"Note: Assets with the same date are changed together, up to {DATE_CHUNK_SIZE} per API call", "grey"))
     print(f"1 - Continue and change all album assets ({len(new_dates)} Assets)")
     print("2 - Abort everything")
     number = recursive_number_input(1, 2)
     if number == 2:
         return False
-    _bulk_change_asset_date(creds, new_dates)
+    journal = OperationJournal.create(new_journal_name("asset_date"), "asset_date", new_dates, {'album': album_uuid})
+    print(cg.color(f"Note: Progress is written to {journal.path}, if this gets interrupted run main.py --resume {journal.path}", "grey"))
+    _bulk_change_asset_date(creds, new_dates, journal)
+    journal.close()
+
+
+def _retime_library(creds: dict) -> bool:
+    """
+    The library wide part of the dialogue, no album needed
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: True if the dates were changed (or nothing had to), False if aborted
+    """
+    print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
+    print(cg.color(f"Note: Looking for {", ".join(rule.prefix for rule in DATE_RULES)}.. file names in the whole library", "grey"))
+    try:
+        with Progress() as progress:
+            fitting, new_dates, unchanged = _library_dates(creds, on_page=progress.bar("Scan").update,
+                                                           on_message=progress.print)
+    except ImmichApiError as err:
+        print(f"Error: {cg.color(str(err), "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    print(f"<I/We> found {fitting} assets with a date in their name, {unchanged} of them already carry that date.")
+    if not new_dates:
+        print("Nothing to do, press ENTER to continue")
+        input()
+        return True
+    print(cg.color(f"Note: Assets with the same date are changed together, up to {DATE_CHUNK_SIZE} per API call", "grey"))
+    print(f"1 - Continue and change the others ({len(new_dates)} Assets)")
+    print("2 - Abort everything")
+    number = recursive_number_input(1, 2)
+    if number == 2:
+        return False
+    journal = OperationJournal.create(new_journal_name("asset_date"), "asset_date", new_dates, {'library': True})
+    print(cg.color(f"Note: Progress is written to {journal.path}, if this gets interrupted run main.py --resume {journal.path}", "grey"))
+    _bulk_change_asset_date(creds, new_dates, journal)
+    journal.close()
+    return True
+
+
+def resume_asset_dates(creds: dict, journal: OperationJournal) -> bool:
+    """
+    Continues an interrupted date rewrite, assets already done are skipped, failed and
+    untouched ones are sent again
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param journal: loaded journal of an 'asset_date' operation
+    :return: Always True
+    """
+    print(f"Resuming date changes from {journal.path}: {journal.summary()}")
+    _bulk_change_asset_date(creds, journal.pending(), journal)
+    journal.close()
+    return True
+
+
+def retime_headless(creds: dict, album_uuid: str | None, assume_yes: bool = False, sequence_order: bool = False) -> bool:
+    """
+    The same as retime_whatsapp_pictures without asking anything, for cron and batch files.
+    File names that don't fit are written to a log file, without assume_yes nothing is changed.
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param album_uuid: Immich Album UUID, None for the whole library (only assets whose date differs)
+    :param assume_yes: actually change the dates, otherwise it is a dry run
+    :param sequence_order: see _dates_from_names
+    :return: True if everything went fine
+    """
+    try:
+        if album_uuid is None:
+            fitting, new_dates, unchanged = _library_dates(creds, sequence_order)
+        else:
+            album = _album_dates(creds, album_uuid, sequence_order)
+    except ImmichApiError as err:
+        print(cg.color(f"[retime] {err}", "pure_red"))
+        return False
+    if album_uuid is None:
+        print(f"[retime] {fitting} assets in the library with a date in their name, {unchanged} already carry it")
+    elif album is None:
+        print(cg.color(f"[retime] Album {album_uuid} could not be fetched", "pure_red"))
+        return False
+    else:
+        asset_count, new_dates, list_of_errors = album
+        print(f"[retime] {asset_count} assets in album {album_uuid}, {len(new_dates)} with a date in their name")
+        if list_of_errors:
+            print(f"[retime] {len(list_of_errors)} file names didn't fit, written to {_write_error_log(list_of_errors)}")
+    if not assume_yes:
+        print(f"[retime] Dry run, nothing changed. Add --yes to change the dates of {len(new_dates)} assets.")
+        return True
+    if not new_dates:
+        return True
+    meta = {'library': True} if album_uuid is None else {'album': album_uuid}
+    journal = OperationJournal.create(new_journal_name("asset_date"), "asset_date", new_dates, meta)
+    errors = _apply_asset_dates(creds, new_dates, journal=journal)
+    journal.close()
+    print(f"[retime] Changed {len(new_dates) - len(errors)} of {len(new_dates)} assets, journal {journal.path}")
+    for uuid, text in errors.items():
+        print(f"\t[{uuid}] {text}")
+    return not errors
@@ -20,8 +20,8 @@
 # @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
 
 import re
-import readline
-import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
 
 
 def recursive_input_regex(prompt: str = "", default_regex: str = "") -> str:
@@ -98,6 +98,7 @@ def input_with_prefill(prompt: str, text: str) -> str:
     :param text: text you want to pre-write
     :return: the input text
     """
+    import readline # * only here, the menu doesn't need it and it costs startup time
     def hook():
         readline.insert_text(text)
         readline.redisplay()
@@ -106,54 +107,33 @@ def input_with_prefill(prompt: str, text: str) -> str:
     readline.set_pre_input_hook()
     return result
 
-def simple_progress_bar(current: float,
-                        maxi: float,
-                        pre: str= "",
-                        suf: str= "",
-                        out=sys.stdout,
-                        clear: bool=False,
-                        clear_chr: chr=" ") -> bool | None:
+
+def concurrent_map(func: Callable, items: Iterable, workers: int = 8,
+                   on_done: Callable[[int, int], None] | None = None,
+                   on_result: Callable[[object, object], None] | None = None) -> list:
     """
-        Simple Progress Bar, any other print called between will break it
-
-        :param float current: current absolute numer
-        :param float maxi: upper treshhold
-        :param str pre: Additional text before bar
-        :param str suf: Additional text after the bar
-        :param file out: theoretical output, cant imagine anything else than console making sense
-        :param bool clear: if TRUE, does not draw a progress bar but just an empty line
-        :param chr clear_chr: character used for the clear line
-        :return: False if no shutil is available or parameters got the wrong type
+    Runs func over all items with at most `workers` threads at the same time, meant for
+    the many-small-API-calls situations where we mostly wait for the network anyway
+
+    :param func: called once per item with the item as only argument
+    :param items: anything iterable, gets materialized to know the total
+    :param workers: upper bound of parallel calls, keep it at or below the client pool size
+    :param on_done: called as on_done(finished, total) in the calling thread whenever one item completes
+    :param on_result: called as on_result(item, result) in the calling thread in the order of completion
+    :return: the results in the same order as the items, no matter in which order they finished
     """
-    try:
-        import shutil
-    except ImportError:
-        print("Import Error", file=out)
-        return False
-    try:
-        current = float(current)
-        maxi = float(maxi)
-        pre = str(pre)
-        suf = str(suf)
-    except ValueError:
-        print("Parameter malformed", file=out)
-        return False
-    if current > maxi:
-        current = maxi  # 100%
-    console_length, row = shutil.get_terminal_size()
-    del row
-    if clear:
-        print(clear_chr*console_length)
-        return None
-    extra_space = console_length - len(pre) - len(suf) - 3  # 3 character long garnish
-    extra_length = round((current / maxi) * extra_space)
-    if extra_length == extra_space:
-        arrow = "="
-    else:
-        arrow = ">"
-    the_bar = "="*extra_length + arrow + " "*(extra_space-extra_length)
-    print(pre + "|" + the_bar + "|" + suf, file=out, end="\r")
-    return True
+    items = list(items)
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(func, item): i for i, item in enumerate(items)}
+        for finished, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result:
+                on_result(items[index], results[index])
+            if on_done:
+                on_done(finished, len(items))
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# The rollback format, written while the snapshot is still running:
+#
+# TagRollback<date>.jsonl.gz is a row of independent gzip members ("blocks"), each one fsync'ed
+# when written, so a crash loses at most the block that was being collected. Every block holds
+# JSON lines of three kinds:
+#
+#   {"v": 2, "dateCreated": "<iso>"}                      only in the very first block
+#   {"first": 17, "assets": ["<UUID>", ...]}              asset ids get numbers 17, 18..
+#   {"tag": "<name>", "id": "<UUID>", "assets": [3, 17]}  the tag with its numbered assets
+#
+# Every asset UUID is written once and then only referred to by its number. On a clean close
+# an index (<file>.idx, plain json) with the byte offsets of the blocks is written next to it,
+# with it a single tag can be restored by reading only the blocks it needs.
+
+import bisect
+import datetime
+import gzip
+import json
+import os
+import zlib
+from typing import Iterator
+
+from json_stream import iter_object_items
+
+ROLLBACK_VERSION = 2
+BLOCK_TAGS = 64 # tags collected before a block gets written, also the most a crash can lose
+
+
+def new_rollback_name() -> str:
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    name, number = f"TagRollback{stamp}.jsonl.gz", 1
+    while os.path.exists(name): # * a resume right after the first try must not overwrite its file
+        number += 1
+        name = f"TagRollback{stamp}_{number}.jsonl.gz"
+    return name
+
+
+class RollbackWriter:
+    """
+    Appends tags to a rollback file while they arrive, use as context manager so the index
+    gets written at the end
+    """
+
+    def __init__(self, path: str, block_tags: int = BLOCK_TAGS):
+        """
+        :param path: file to create, see new_rollback_name()
+        :param block_tags: tags per gzip block
+        """
+        self.path = path
+        self.block_tags = block_tags
+        self.io = open(path, "wb")
+        self.interned: dict[str, int] = {}
+        self.new_assets: list[str] = []
+        self.header = json.dumps({'v': ROLLBACK_VERSION, 'dateCreated': datetime.datetime.now().isoformat()})
+        self.lines: list[str] = []
+        self.pending_tags: list[str] = []
+        self.tag_offsets: dict[str, int] = {}
+        self.blocks: list[list[int]] = [] # [offset, first asset number, count of new assets]
+
+    def add(self, name: str, tag_id: str, asset_ids: list | bool) -> None:
+        """
+        :param name: tag name, the key the rollback works with
+        :param tag_id: UUID the tag had
+        :param asset_ids: list of asset UUIDs or False if the snapshot of this tag failed
+        """
+        numbers = None
+        if asset_ids is not False:
+            numbers = []
+            for asset_id in asset_ids:
+                number = self.interned.get(asset_id)
+                if number is None:
+                    number = self.interned[asset_id] = len(self.interned)
+                    self.new_assets.append(asset_id)
+                numbers.append(number)
+        self.lines.append(json.dumps({'tag': name, 'id': tag_id, 'assets': numbers}))
+        self.pending_tags.append(name)
+        if len(self.pending_tags) >= self.block_tags:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes everything collected so far as one gzip block and forces it to disk
+        """
+        if not self.lines and self.blocks:
+            return
+        first = len(self.interned) - len(self.new_assets)
+        out = [] if self.blocks else [self.header]
+        if self.new_assets: # * the ids have to come before the tags using them
+            out.append(json.dumps({'first': first, 'assets': self.new_assets}))
+        out.extend(self.lines)
+        offset = self.io.tell()
+        self.io.write(gzip.compress(("\n".join(out) + "\n").encode("utf-8")))
+        self.io.flush()
+        os.fsync(self.io.fileno())
+        self.blocks.append([offset, first, len(self.new_assets)])
+        for name in self.pending_tags:
+            self.tag_offsets[name] = offset
+        self.lines, self.new_assets, self.pending_tags = [], [], []
+
+    def close(self) -> None:
+        self.flush()
+        self.io.close()
+        with open(self.path + ".idx", "w") as idx_io:
+            json.dump({'v': ROLLBACK_VERSION, 'blocks': self.blocks, 'tags': self.tag_offsets}, idx_io)
+
+    def __enter__(self) -> "RollbackWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _iter_lines(path: str) -> Iterator[dict]:
+    """
+    All lines of all blocks, a block cut off by a crash just ends the iteration
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as gz_io:
+        try:
+            for line in gz_io:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, zlib.error, json.JSONDecodeError):
+            return # * the half written block of a crash, everything before it is fine
+
+
+def _read_block(path: str, offset: int) -> list[dict]:
+    """
+    Decompresses exactly one block starting at offset
+    """
+    lines = []
+    with open(path, "rb") as raw_io:
+        raw_io.seek(offset)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # 16+ means gzip header
+        text = b""
+        while not decompressor.eof and (chunk := raw_io.read(1 << 16)):
+            text += decompressor.decompress(chunk)
+    for line in text.decode("utf-8").splitlines():
+        if line.strip():
+            lines.append(json.loads(line))
+    return lines
+
+
+def iter_rollback(path: str) -> Iterator[tuple[str, list | bool]]:
+    """
+    Streams the tags of a rollback file, either format
+
+    :param path: a TagRollback*.jsonl.gz or an old style TagRollback*.json
+    :return: generator of (tag name, [AssetUUID, ...] or False)
+    """
+    if not path.endswith(".gz"):
+        with open(path, "r") as js_io:
+            yield from iter_object_items(js_io, 'tags')
+        return
+    assets: list[str] = []
+    for line in _iter_lines(path):
+        if 'assets' in line and 'first' in line:
+            assets.extend(line['assets'])
+        elif 'tag' in line:
+            numbers = line['assets']
+            yield line['tag'], False if numbers is None else [assets[n] for n in numbers]
+
+
+def read_one_tag(path: str, name: str) -> list | bool | None:
+    """
+    Restores the asset list of a single tag, with the index only the needed blocks are read,
+    without one (crashed run) the file is scanned
+
+    :param path: a TagRollback*.jsonl.gz
+    :param name: the tag name
+    :return: [AssetUUID, ...], False if its snapshot failed, None if the tag isn't in the file
+    """
+    try:
+        with open(path + ".idx", "r") as idx_io:
+            index = json.load(idx_io)
+    except (OSError, json.JSONDecodeError):
+        return next((asset_ids for tag, asset_ids in iter_rollback(path) if tag == name), None)
+    if name not in index['tags']:
+        return None
+    line = next(line for line in _read_block(path, index['tags'][name]) if line.get('tag') == name)
+    if line['assets'] is None:
+        return False
+    firsts = [first for offset, first, count in index['blocks']]
+    resolved: dict[int, str] = {}
+    for block_no in sorted({bisect.bisect_right(firsts, n) - 1 for n in line['assets']}):
+        # * bisect_right lands on the last block with that 'first', blocks without new assets come before it
+        offset, first, count = index['blocks'][block_no]
+        table = next(block_line for block_line in _read_block(path, offset) if 'first' in block_line)
+        for i, asset_id in enumerate(table['assets']):
+            resolved[first + i] = asset_id
+    return [resolved[n] for n in line['assets']]
+
+
+def export_json(path: str, json_path: str) -> int:
+    """
+    Writes the old TagRollback*.json format, streaming, the result works with everything that
+    read the old files
+
+    :param path: a TagRollback*.jsonl.gz
+    :param json_path: target file
+    :return: number of exported tags
+    """
+    created = next(_iter_lines(path), {}).get('dateCreated', datetime.datetime.now().isoformat())
+    count = 0
+    with open(json_path, "w") as js_io:
+        js_io.write('{\n  "dateCreated": ' + json.dumps(created) + ',\n  "tags": {')
+        for name, asset_ids in iter_rollback(path):
+            js_io.write(("," if count else "") + "\n    " + json.dumps(name) + ": " + json.dumps(asset_ids))
+            count += 1
+        js_io.write("\n  }\n}\n")
+    return count
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
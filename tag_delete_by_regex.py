@@ -19,124 +19,240 @@
 #
 # @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
 
-import datetime
-
 import requests
 import re
 import json
 import console_garnish as cg
 
-from copy import copy
-from reused_tools import recursive_input_regex, recursive_number_input, simple_progress_bar
+from immich_client import client_for, ImmichApiError, SEARCH_PAGE_SIZE
+from immich_mirror import fresh_mirror, mirror_for
+from op_journal import OperationJournal, new_journal_name, SAVED, DONE, FAILED, UNSAVED
+from rollback_store import RollbackWriter, new_rollback_name
+from progress import Progress
+from tag_index import TagIndex
+from reused_tools import recursive_input_regex, recursive_number_input, concurrent_map
 
 LINE_TRESHHOLD = 30 # number of Lines that get show for Regex Filters
+SNAPSHOT_WORKERS = 8 # parallel search calls for the rollback snapshot, the client pool has 16 connections
+SWEEP_PAGE_SIZE = 1000 # biggest page search/metadata hands out, used when walking the whole library
 
-def _get_all_tags(cred:dict) -> dict:
+def _get_all_tags(cred:dict) -> TagIndex:
     """
     Retrieves all available tags from the API
 
     :param cred: Credential dictionary {'instance': <url>, 'api_key': <key>}
-    :return: dictionary {name: UUID}
+    :return: index of all tags by their full value (Parent/Child), see tag_index.py
     """
-    API_KEY = cred['api_key']
-    INSTANCE = cred['instance']
-    url = INSTANCE + "tags"
-    payload = {}
-    headers = {
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    resp = requests.request("GET", url, headers=headers, data=payload)
-    resp_dict = resp.json()
-    keyvalue = dict()
-    for tag_dict in resp_dict:
-        keyvalue[tag_dict['name']] = tag_dict['id']
-    return keyvalue
+    if mirror := fresh_mirror(cred):
+        return TagIndex(mirror.tags())
+    resp = client_for(cred).get("tags")
+    resp.raise_for_status()
+    return TagIndex(resp.json())
 
 
-def _filter_tags_by_regex(regex: str, tags: dict):
+def _filter_tags_by_regex(regex: str | list, tags: TagIndex) -> dict:
     """
-    Filters the given dictionary with the provided regex
-    and gives back all those hits and discards the rest
-    :param regex: Regex string
-    :param tags: dictionary of tags {Name: UUID}
-    :return:
+    Filters the given tags with the provided regex (or several of them in one pass)
+    and gives back all those hits and discards the rest. A regex hits if it matches the
+    name or the full value of a tag.
+    :param regex: Regex string or list of them
+    :param tags: index of all tags
+    :return: dictionary {value: UUID}
+    """
+    return tags.match(regex)
+
+
+def _plan_tag_deletion(filtered_tags: dict, tags: TagIndex) -> tuple[dict, dict, dict]:
     """
-    pattern = re.compile(regex)
-    hits = {} # I just add the entire thing instead of just the name
-    for key, value in tags.items():
-        if pattern.match(key):
-            hits[key] = value
-    return hits
+    Deleting a tag in Immich deletes its children as well. So the children of a hit vanish
+    even if they didn't match, those are added to the plan to be in the rollback, and a hit
+    below another hit doesn't need its own DELETE call.
 
+    :param filtered_tags: hits of the regex {value: UUID}
+    :param tags: index of all tags
+    :return: (plan {value: UUID} hits plus their children,
+              covered {value: [values deleted along with it]} only for the ones that take others along,
+              extra {value: UUID} children that didn't match but go as well)
+    """
+    plan_ids = tags.closure(filtered_tags.values())
+    plan = {tags.value_of(tag_id): tag_id for tag_id in plan_ids}
+    extra = {value: tag_id for value, tag_id in plan.items() if value not in filtered_tags}
+    covered = {tags.value_of(root): [tags.value_of(child) for child in children]
+               for root, children in tags.covering(plan_ids).items() if children}
+    return plan, covered, extra
 
-def _get_assoc_assets(cred: dict, tag_id: str, page:int=1, recursive_list:list = []) -> list | bool:
+
+def _get_assoc_assets(cred: dict, tag_id: str, size: int = SEARCH_PAGE_SIZE, on_message=print) -> list | bool:
     """
     Retrieves the asset IDs for one tag for later use (in this context mostly for rollback
 
     :param cred:  Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param tag_id: UUID of the tag that is searched of
-    :param page: results might be paginated, with more than 250 hits per page
-    :param recursive_list: transfer list for the recursive use of this
-    :return:
+    :param size: assets per page, turns out, this is paginated if there are more than 250 of them
+    :param on_message: gets the error messages, this runs in a worker while the bars are drawn
+    :return: list of asset UUIDs or False if a page came back malformed or the connection failed
     """
-    API_KEY = cred['api_key']
-    INSTANCE = cred['instance']
-    url = INSTANCE + "search/metadata"
-    payload = json.dumps({
-      "tagIds": [
-        tag_id
-      ],
-      "page": page # turns out, this is paginated if there are more than 250 of them
-    })
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    resp = requests.request("POST", url, headers=headers, data=payload)
-    data = resp.json()
-    new_page = None
     saved_entries = [] # for rollbacks
-    if recursive_list:
-        saved_entries = copy(recursive_list) # i had this without copy before and it was accumulating..but it shouldn't?
     try:
-        if 'nextPage' in data['assets']:
-            new_page = data['assets']['nextPage']
-        for item in data['assets']['items']:
-            saved_entries.append(item['id'])
-        if new_page:
-            return _get_assoc_assets(cred, tag_id, new_page, recursive_list) # I really love recursion in the project
-        else:
-            return saved_entries
-    except KeyError:
-        print(cg.color("Response seems to be malformed", "pure_red"))
-        print(data)
+        for page in client_for(cred).search_ids({"tagIds": [tag_id]}, size):
+            saved_entries.extend(page)
+    except ImmichApiError as err:
+        on_message(cg.color("Response seems to be malformed", "pure_red"))
+        on_message(err)
+        return False
+    except requests.exceptions.RequestException as err: # * runs in a worker, raising here would end the whole run
+        on_message(cg.color(f"No answer for tag {tag_id}: {err}", "pure_red"))
         return False
+    return saved_entries
+
+
+def _library_size(creds: dict) -> int | None:
+    """
+    Asks the server how many assets there are in total
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: number of assets or None if the server doesn't tell
+    """
+    resp = client_for(creds).post("search/statistics", {})
+    if resp.status_code != 200:
+        return None
+    try:
+        return int(resp.json()['total'])
+    except (KeyError, TypeError, ValueError):
+        return None
 
 
-def _actually_delete_tags(creds: dict, tag_ids: dict) -> bool:
+def _choose_snapshot_mode(matched_tags: int, library_size: int | None, sweep_size: int = SWEEP_PAGE_SIZE) -> str:
     """
-    Deletes all provided tags
+    Per tag it is at least one search call per matched tag, the sweep is one call per page of the
+    whole library. Whatever needs fewer calls wins.
+
+    :param matched_tags: number of tags that will be deleted
+    :param library_size: number of assets in the library, None if unknown
+    :param sweep_size: page size of the sweep
+    :return: 'sweep' or 'per_tag'
+    """
+    if library_size is None:
+        return "per_tag"
+    sweep_calls = max(1, -(-library_size // sweep_size)) # ceil
+    return "sweep" if sweep_calls < matched_tags else "per_tag"
+
+
+def _sweep_tag_index(creds: dict, tag_ids: set, library_size: int | None = None,
+                     size: int = SWEEP_PAGE_SIZE) -> dict | None:
+    """
+    Walks once through every asset of the library and notes which of the wanted tags it
+    carries, the result is an inverted index tag -> assets
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param tag_ids: set of tag UUIDs we care about, all other tags are ignored
+    :param library_size: only for the progress bar
+    :param size: assets per page
+    :return: dictionary {TagUUID: [AssetUUID, ...]} or None if the server does not deliver tags with the
+             assets or the sweep broke off
+    """
+    index = {tag_id: [] for tag_id in tag_ids}
+    with Progress() as progress:
+        bar = progress.bar("Sweep", library_size)
+        try:
+            for page in client_for(creds).search_pages({}, size):
+                if bar.done == 0 and page and not any('tags' in item for item in page):
+                    return None # * this immich version doesn't put tags into search results, nothing to sweep
+                for item in page:
+                    for tag in item.get('tags') or []:
+                        if tag['id'] in index:
+                            index[tag['id']].append(item['id'])
+                bar.advance(len(page))
+        except (ImmichApiError, requests.exceptions.RequestException) as err:
+            progress.print(cg.color("Sweep failed, falling back to one search per tag", "pure_red"))
+            progress.print(err)
+            return None
+    return index
+
+
+def _snapshot_tag_assets(creds: dict, tags: dict, sink, workers: int = SNAPSHOT_WORKERS,
+                         mode: str = "auto") -> int:
+    """
+    Fetches the asset lists of all provided tags for the rollback file, either by one search per
+    tag (in parallel) or by one sweep over the whole library, which is cheaper if many tags match.
+    Every tag is handed to the sink as soon as it is known, nothing is collected here.
+
+    :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param tags: dictionary of tags {Name: UUID}
+    :param sink: called as sink(name, UUID, [AssetUUID, ...]), the list is False for malformed responses
+    :param workers: number of search calls in flight at the same time
+    :param mode: 'auto', 'sweep' or 'per_tag', auto decides by matched tags versus library size
+    :return: number of tags whose snapshot failed
+    """
+    if mode != "per_tag":
+        library_size = _library_size(creds)
+        if mode == "auto":
+            mode = _choose_snapshot_mode(len(tags), library_size)
+        if mode == "sweep":
+            if (index := _sweep_tag_index(creds, set(tags.values()), library_size)) is not None:
+                for key, value in tags.items():
+                    sink(key, value, index[value])
+                return 0
+
+    failed = 0
+    names = {value: key for key, value in tags.items()}
+
+    with Progress() as progress:
+        bar = progress.bar("Save", len(tags))
+
+        def collect(tag_id: str, asset_list: list | bool):
+            nonlocal failed
+            failed += asset_list is False
+            sink(names[tag_id], tag_id, asset_list)
+            bar.advance(errors=asset_list is False)
+
+        concurrent_map(lambda tag_id: _get_assoc_assets(creds, tag_id, on_message=progress.print), tags.values(),
+                       workers, None, collect)
+    return failed
+
+
+def _actually_delete_tags(creds: dict, tag_ids: dict, journal: OperationJournal | None = None,
+                          covered: dict | None = None) -> bool:
+    """
+    Deletes all provided tags, parents first: tags that go down with a parent that is
+    deleted as well don't get a call of their own
 
     :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param tag_ids: ids of the tags to be deleted in a dictionary {'<name>': '<UUID>'
+    :param journal: if given every deleted or failed tag is recorded there
+    :param covered: {value: [values of its children]} see _plan_tag_deletion
     :return: If _everything_ worked True, if there were errors, False
     """
-    countdown = len(tag_ids.items())
+    covered = {key: [child for child in children if child in tag_ids]
+               for key, children in (covered or {}).items() if key in tag_ids}
+    riding_along = {child for children in covered.values() for child in children}
+    to_call = {key: value for key, value in tag_ids.items() if key not in riding_along}
+    countdown = len(to_call)
     errors = {}
-    for i, (key, value) in enumerate(tag_ids.items()):
-        resp = _delete_one_tag(creds, value)
-        simple_progress_bar(i, countdown, "DEL", f"{i+1}/{countdown}")
-        if resp['statusCode'] != 200:
-            errors[key] = {'value': value, 'message': resp['error']}
-    simple_progress_bar(0, 0, clear=True) # * Reset line to empty
-    print(f"Deleted {countdown} tags", end="")
+    with Progress() as progress:
+        bar = progress.bar("DEL", countdown)
+        for key, value in to_call.items():
+            resp = _delete_one_tag(creds, value)
+            children = covered.get(key, [])
+            bar.advance(errors=resp['statusCode'] != 200)
+            if resp['statusCode'] != 200:
+                errors[key] = {'value': value, 'message': resp['error']}
+                for child in children: # * still there, the next try goes through the parent again
+                    errors[child] = {'value': tag_ids[child], 'message': f"parent {key} failed"}
+                if journal:
+                    journal.mark_failed({k: errors[k]['message'] for k in [key] + children})
+            elif journal:
+                journal.mark_done([key] + children)
+    if mirror := mirror_for(creds):
+        mirror.forget_tags(value for key, value in tag_ids.items() if key not in errors)
+    print(f"Deleted {len(tag_ids)} tags", end="")
+    if riding_along:
+        print(f" in {countdown} calls ({len(riding_along)} saved, children went with their parents)", end="")
     if len(errors) <= 0:
         print(" with no errors.")
         return True
     else:
-        print(f"With {len(errors)} errors. Listing:")
+        print(f", with {len(errors)} errors. Listing:")
         for key, value in errors.items():
             print(f"\t{key} - {value['message']}")
         return False
@@ -156,19 +272,11 @@ def _delete_one_tag_from_assets(creds:dict, tag_id: str, asset_ids: list) -> req
     :param asset_ids: List of all the assets that contain it
     :return:
     """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = INSTANCE + "tags/" + tag_id + "/assets"
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    payload = json.dumps({
+    payload = {
         "ids": asset_ids
-    })
+    }
     print(f"Deleting TAG [{tag_id}] from Assets [{", ".join(asset_ids)}]")
-    return requests.request("DELETE", url, headers=headers, data=payload)
+    return client_for(creds).delete("tags/" + tag_id + "/assets", payload)
     #400 BAD REQUEST
     #404 NOT FOUND
 
@@ -178,31 +286,36 @@ def _delete_one_tag(creds: dict, tag_id: str):
     Apparently one has to delete all instances of the used tag first. Pain.
     :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param tag_id: <UUID> of an Immich tag
-    :return:
+    :return: {'statusCode': 200, 'message': "Success"} or {'statusCode': <code>, 'error': <message>}
     """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = INSTANCE + "tags/" + tag_id
-    payload = {}
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    resp = requests.request("DELETE", url, headers=headers, data=payload)
+    try:
+        resp = client_for(creds).delete("tags/" + tag_id)
+    except requests.exceptions.RequestException as err: # * one dead call shouldn't end the whole loop
+        return {'statusCode': 0, 'error': f"no answer - {err}"}
     if resp.status_code == 204: # HTML 204 NO CONTENT
         return {'statusCode': 200, 'message': "Success"} # there is actually no text response upon success, so I craft my own for unified output
-    else:
-        return json.loads(resp.text)
+    try:
+        body = json.loads(resp.text)
+    except json.JSONDecodeError: # ! a proxy in front of immich answers a 502 with html
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    # * NestJS only sends 'error' for some codes, a 429 or 5xx just has statusCode and message
+    message = body.get('error') or body.get('message') or resp.text or resp.reason
+    return {'statusCode': resp.status_code, 'error': f"{resp.status_code} - {message}"}
 
 
-def tag_delete_by_regex(creds: dict, default_regex: str = '') -> bool:
+def tag_delete_by_regex(creds: dict, default_regex: str = '', workers: int = SNAPSHOT_WORKERS,
+                        snapshot_mode: str = "auto", tags: TagIndex | None = None) -> bool:
     """
     Console input routine for deleting a number of tags that match
     a regex
 
     :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param default_regex: pre filled regex for recursion purpose
+    :param workers: number of parallel calls for the rollback snapshot
+    :param snapshot_mode: 'auto', 'sweep' or 'per_tag', see _snapshot_tag_assets
+    :param tags: the tag index of the previous attempt, so editing the regex doesn't download all tags again
     :return: If everything was successfully, True
     """
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
@@ -213,14 +326,14 @@ def tag_delete_by_regex(creds: dict, default_regex: str = '') -> bool:
     ###
     print(cg.color("Enter a valid python regex", "bold"))
     my_regex = recursive_input_regex("Regex Str: ", default_regex)
-    tags = _get_all_tags(creds)
-    #print(tags)
+    if tags is None:
+        tags = _get_all_tags(creds)
     filtered_tags = _filter_tags_by_regex(my_regex, tags)
     number_of_tags = len(filtered_tags)
     if number_of_tags <= 0:
         print(f"Error: {cg.color("Not a single hit, you might want to try again", "pure_red")}")
         input("Press the ENTER key to continue")
-        return tag_delete_by_regex(creds, my_regex)
+        return tag_delete_by_regex(creds, my_regex, workers, snapshot_mode, tags)
     if number_of_tags  > LINE_TRESHHOLD:
         ###
         ### DECISION: MANY LINES
@@ -235,13 +348,17 @@ def tag_delete_by_regex(creds: dict, default_regex: str = '') -> bool:
             print("kthxbye, till next time")
             return False
         if number == 3: # do this 255 times and python hates you
-            tag_delete_by_regex(creds)
+            tag_delete_by_regex(creds, workers=workers, snapshot_mode=snapshot_mode, tags=tags)
             return False
     for i, key in enumerate(filtered_tags.keys()):
         print(f"{i} - {key}")
         if i and i % 500 == 0:
             print(f"Haltpoint - More entries ({number_of_tags-i}) to come, press ENTER")
             input()
+    plan, covered, extra = _plan_tag_deletion(filtered_tags, tags)
+    if extra:
+        print(cg.color(f"Note: {len(extra)} child tags that didn't match go down with their parents, "
+                       f"they are in the rollback as well: {", ".join(list(extra)[:5])}{"..." if len(extra) > 5 else ""}", "grey"))
     ###
     ### DECISION: DELETE OR EDIT
     ###
@@ -252,31 +369,116 @@ def tag_delete_by_regex(creds: dict, default_regex: str = '') -> bool:
     print("2 - Enter/Edit Regex")
     number = recursive_number_input(1, 2)
     if number == 2:
-        return tag_delete_by_regex(creds, my_regex)
+        return tag_delete_by_regex(creds, my_regex, workers, snapshot_mode, tags)
     # if number == 1 GO AHEAD
-    saved_tags = {} # * so this is plain text tag to asset uuid
-    tag_id_to_asset = {} # + and this is UUID tag to asset uuid
-    print("Creating a backup file to make a roll back later possible.")
-    tag_len = len(filtered_tags)
-    print(cg.color(f"Note: These are {tag_len} API calls, so it takes a while due networking.","grey"))
-    for i, (key, value) in enumerate(filtered_tags.items()):
-        asset_list = _get_assoc_assets(creds, value)
-        progress_number_str = f"{str(i+1)}/{str(tag_len)}"
-        simple_progress_bar(i, tag_len, "Save", progress_number_str)
-        #print(f"Saves: [{key}:{value}] {len(asset_list)}") # todo: one line ncurse progress bar here
-        saved_tags[key] = asset_list
-        tag_id_to_asset[value] = asset_list
-    simple_progress_bar(0, 0, clear=True) # * Reset line to empty
-    file_name = "TagRollback" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
-    print("Creating rollback file...")
-    with open(file_name, "w") as js_io:
-        save_object = {
-            'dateCreated': datetime.datetime.now().isoformat(),
-            'tags': saved_tags
-        }
-        json.dump(save_object, js_io, indent=2)
-    _actually_delete_tags(creds, filtered_tags)
-    return True
+    journal = OperationJournal.create(new_journal_name("tag_delete"), "tag_delete", plan,
+                                      {'phase': "snapshot", 'rollback': [], 'covered': covered})
+    print(cg.color(f"Note: Progress is written to {journal.path}, if this gets interrupted run main.py --resume {journal.path}", "grey"))
+    return _run_tag_deletion(creds, journal, workers, snapshot_mode)
+
+
+def _run_tag_deletion(creds: dict, journal: OperationJournal, workers: int = SNAPSHOT_WORKERS,
+                      snapshot_mode: str = "auto") -> bool:
+    """
+    Snapshot and deletion of the tags planned in the journal, only what is not recorded as
+    finished there is done, so this works for fresh and for interrupted runs alike
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param journal: journal of a 'tag_delete' operation, plan {value: UUID}, meta 'covered' see _plan_tag_deletion
+    :param workers: number of parallel calls for the rollback snapshot
+    :param snapshot_mode: 'auto', 'sweep' or 'per_tag', see _snapshot_tag_assets
+    :return: True if all tags are gone
+    """
+    # * FAILED here means the delete failed, the snapshot of those is already in a rollback file
+    if to_save := journal.pending(skip=(SAVED, DONE, FAILED)):
+        print("Creating a backup file to make a roll back later possible.")
+        tag_len = len(to_save)
+        print(cg.color(f"Note: These are up to {tag_len} API calls, {workers} at a time, so it still takes a bit.","grey"))
+        file_name = new_rollback_name()
+        journal.update_meta(rollback=journal.meta.get('rollback', []) + [file_name])
+
+        def save(name: str, tag_id: str, asset_list: list | bool):
+            if asset_list is False: # ! no rollback data, so it stays until a resume manages to save it
+                journal.mark_failed({name: "rollback snapshot failed"}, UNSAVED)
+                return
+            rollback.add(name, tag_id, asset_list)
+            journal.mark([name], SAVED)
+
+        with RollbackWriter(file_name) as rollback: # * written while the snapshot runs, a crash keeps what was there
+            failed = _snapshot_tag_assets(creds, to_save, save, workers, snapshot_mode)
+        print(f"Rollback file {file_name} written", end="")
+        print(f", but {failed} tags could not be saved, they are not deleted." if failed else ".")
+        journal.update_meta(phase="delete")
+    unsaved = [key for key, state in journal.states.items() if state == UNSAVED]
+    # * deleting a parent takes its children with it, so parents of an unsaved tag have to wait as well
+    held = {key for key in journal.pending()
+            if journal.states.get(key) == UNSAVED or any(other.startswith(key + "/") for other in unsaved)}
+    to_delete = {key: value for key, value in journal.pending().items() if key not in held}
+    result = _actually_delete_tags(creds, to_delete, journal, journal.meta.get('covered'))
+    if held:
+        print(cg.color(f"{len(held)} tags were kept because the rollback snapshot of them (or of a child) failed, "
+                       f"run main.py --resume {journal.path} to try again.", "pure_red"))
+    journal.close()
+    return result and not held
+
+
+def resume_tag_deletion(creds: dict, journal: OperationJournal, workers: int = SNAPSHOT_WORKERS) -> bool:
+    """
+    Continues an interrupted tag deletion, tags already saved aren't snapshotted again and
+    tags already deleted aren't deleted again
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param journal: loaded journal of a 'tag_delete' operation
+    :param workers: number of parallel calls for the rollback snapshot
+    :return: True if all tags are gone
+    """
+    print(f"Resuming tag deletion from {journal.path}: {journal.summary()}")
+    if rollback_files := journal.meta.get('rollback'):
+        print(cg.color(f"Note: The rollback data is spread over {", ".join(rollback_files)}", "grey"))
+    return _run_tag_deletion(creds, journal, workers)
+
+
+def tag_delete_headless(creds: dict, regex: str | list, assume_yes: bool = False, workers: int = SNAPSHOT_WORKERS,
+                        snapshot_mode: str = "auto") -> bool:
+    """
+    The same as tag_delete_by_regex without asking anything, for cron and batch files.
+    Without assume_yes it only lists what would be deleted.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param regex: python regex the tag names have to match, or a list of them (any of them)
+    :param assume_yes: actually delete, otherwise it is a dry run
+    :param workers: number of parallel calls for the rollback snapshot
+    :param snapshot_mode: 'auto', 'sweep' or 'per_tag', see _snapshot_tag_assets
+    :return: True if everything went fine
+    """
+    regexes = [regex] if isinstance(regex, str) else regex
+    try:
+        for each in regexes:
+            re.compile(each)
+    except re.error as err:
+        print(cg.color(f"[tags] Regex seems to be malformed: {err}", "pure_red"))
+        return False
+    tags = _get_all_tags(creds)
+    filtered_tags = _filter_tags_by_regex(regexes, tags)
+    print(f"[tags] {len(filtered_tags)} tags match {" or ".join(repr(each) for each in regexes)}")
+    if not filtered_tags:
+        return True
+    plan, covered, extra = _plan_tag_deletion(filtered_tags, tags)
+    if extra:
+        print(f"[tags] {len(extra)} child tags that didn't match go down with their parents")
+    if not assume_yes:
+        for i, key in enumerate(filtered_tags.keys()):
+            if i >= LINE_TRESHHOLD:
+                print(f"\t...and {len(filtered_tags) - i} more")
+                break
+            print(f"\t{key}")
+        print("[tags] Dry run, nothing deleted. Add --yes to delete them.")
+        return True
+    journal = OperationJournal.create(new_journal_name("tag_delete"), "tag_delete", plan,
+                                      {'phase': "snapshot", 'rollback': [], 'covered': covered})
+    print(f"[tags] Journal {journal.path}")
+    return _run_tag_deletion(creds, journal, workers, snapshot_mode)
+
 
 if __name__ == "__main__":
-    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
\ No newline at end of file
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Tags in Immich are a tree, "Places/Berlin" is the tag "Berlin" with the parent "Places". The
+# name alone isn't unique ("Places/Berlin" and "Trips/Berlin"), the full path, called value, is.
+
+import bisect
+import re
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+_BACKREFERENCE = re.compile(r"\\\d|\(\?P=")
+_HIGHEST = "\U0010ffff" # sorts after every other character, upper end of a prefix range
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    The part at the start of a regex that can only match itself, "Places/Ber.*" gives
+    "Places/Ber". Everything that matches the regex starts with it.
+
+    :param pattern: python regex, used with re.match
+    :return: the literal prefix, empty if there is none or the regex is too clever
+    """
+    if "|" in pattern: # * an alternative could start with anything
+        return ""
+    prefix = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char = pattern[i + 1] # escaped literal like \. or \/
+            i += 1
+        elif char in _REGEX_META:
+            if char in "*?{" and prefix:
+                prefix.pop() # the character before is optional
+            break
+        prefix.append(char)
+        i += 1
+    return "".join(prefix)
+
+
+def compile_patterns(patterns: list[str]) -> list[re.Pattern]:
+    """
+    Several regexes as one alternation, so every name is only looked at once. Backreferences
+    would point to the wrong group after joining, those (and anything that doesn't compile
+    joined, like inline flags in the middle) stay separate.
+
+    :param patterns: list of python regexes
+    :return: list of compiled patterns, usually just one
+    """
+    if len(patterns) == 1:
+        return [re.compile(patterns[0])]
+    if not any(_BACKREFERENCE.search(pattern) for pattern in patterns):
+        try:
+            return [re.compile("|".join(f"(?:{pattern})" for pattern in patterns))]
+        except re.error:
+            pass
+    return [re.compile(pattern) for pattern in patterns]
+
+
+class TagIndex:
+    """
+    All tags of an instance, keyed by their full value, with parent/child links. The child
+    links are a trie over the path segments, so everything below "Places/Germany" is one walk
+    away. Sorted lists of values and names answer prefix questions without looking at every tag.
+    """
+
+    def __init__(self, tags: list[dict]):
+        """
+        :param tags: tag dictionaries like GET tags delivers them, 'id' and 'name' are needed,
+                     'value' and 'parentId' are used if there
+        """
+        self.by_id: dict[str, dict] = {}
+        self.by_value: dict[str, str] = {}
+        for tag in tags:
+            value = tag.get('value') or tag['name']
+            self.by_id[tag['id']] = {'id': tag['id'], 'name': tag['name'], 'value': value,
+                                     'parentId': tag.get('parentId')}
+            self.by_value[value] = tag['id']
+        self.children: dict[str | None, dict[str, str]] = {None: {}} # parent UUID -> {name: child UUID}, None is the root
+        for tag in self.by_id.values():
+            parent_id = tag['parentId']
+            if parent_id is None and "/" in tag['value']: # * older servers and old mirrors don't say
+                parent_id = self.by_value.get(tag['value'].rsplit("/", 1)[0])
+            if parent_id not in self.by_id:
+                parent_id = None
+            tag['parentId'] = parent_id
+            self.children.setdefault(parent_id, {})[tag['name']] = tag['id']
+        self.sorted_values = sorted(self.by_value)
+        self.sorted_names = sorted((tag['name'], tag['id']) for tag in self.by_id.values())
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.by_value
+
+    def value_of(self, tag_id: str) -> str:
+        return self.by_id[tag_id]['value']
+
+    def parent_of(self, tag_id: str) -> str | None:
+        return self.by_id[tag_id]['parentId']
+
+    def ancestors(self, tag_id: str) -> list[str]:
+        """
+        :return: UUIDs from the direct parent up to the root
+        """
+        found = []
+        while (tag_id := self.by_id[tag_id]['parentId']) is not None:
+            found.append(tag_id)
+        return found
+
+    def descendants(self, tag_id: str) -> list[str]:
+        """
+        :return: UUIDs of all children, grandchildren and so on, parents before their children
+        """
+        found = []
+        todo = list(self.children.get(tag_id, {}).values())
+        while todo:
+            child_id = todo.pop()
+            found.append(child_id)
+            todo.extend(self.children.get(child_id, {}).values())
+        return found
+
+    def closure(self, tag_ids) -> list[str]:
+        """
+        :param tag_ids: iterable of UUIDs
+        :return: those UUIDs plus everything below them, each once
+        """
+        found = dict.fromkeys(tag_ids)
+        for tag_id in list(found):
+            found.update(dict.fromkeys(self.descendants(tag_id)))
+        return list(found)
+
+    def covering(self, tag_ids) -> dict[str, list[str]]:
+        """
+        The fewest tags whose deletion removes all given ones, deleting a tag in Immich takes
+        its children with it. Only exact if every descendant of a given tag is given as well,
+        see closure().
+
+        :param tag_ids: iterable of UUIDs
+        :return: dictionary {UUID to delete: [UUIDs of the given tags that go with it]}
+        """
+        selected = dict.fromkeys(tag_ids) # * a set would lose the order
+        cover = {}
+        for tag_id in selected:
+            if not any(ancestor in selected for ancestor in self.ancestors(tag_id)):
+                cover[tag_id] = [child for child in self.descendants(tag_id) if child in selected]
+        return cover
+
+    def lookup(self, path: str) -> str | None:
+        """
+        Walks the trie segment by segment
+
+        :param path: full value like "Places/Germany/Berlin"
+        :return: UUID or None
+        """
+        node = None
+        for segment in path.strip("/").split("/"):
+            node = self.children.get(node, {}).get(segment)
+            if node is None:
+                return None
+        return node
+
+    def subtree(self, path: str) -> dict:
+        """
+        :param path: full value of a tag
+        :return: dictionary {value: UUID} of that tag and everything below it, empty if it doesn't exist
+        """
+        if (tag_id := self.lookup(path)) is None:
+            return {}
+        return {self.value_of(t): t for t in [tag_id] + self.descendants(tag_id)}
+
+    def _prefixed(self, prefix: str) -> set[str]:
+        """
+        :return: UUIDs of tags whose value or name starts with prefix
+        """
+        start = bisect.bisect_left(self.sorted_values, prefix)
+        end = bisect.bisect_left(self.sorted_values, prefix + _HIGHEST)
+        found = {self.by_value[value] for value in self.sorted_values[start:end]}
+        start = bisect.bisect_left(self.sorted_names, (prefix,))
+        end = bisect.bisect_left(self.sorted_names, (prefix + _HIGHEST,))
+        found.update(tag_id for name, tag_id in self.sorted_names[start:end])
+        return found
+
+    def match(self, patterns: str | list[str]) -> dict:
+        """
+        All tags where one of the regexes matches (re.match) either the name or the full value,
+        so old name based regexes keep working and paths like "Places/.*" work as well. If every
+        regex starts with some literal text only the tags starting with it are tried.
+
+        :param patterns: one python regex or a list of them
+        :return: dictionary {value: UUID} in value order
+        """
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        compiled = compile_patterns(patterns)
+        prefixes = [literal_prefix(pattern) for pattern in patterns]
+        if all(prefixes):
+            candidates = set()
+            for prefix in prefixes:
+                candidates |= self._prefixed(prefix)
+            tags = [self.by_id[tag_id] for tag_id in candidates]
+        else:
+            tags = self.by_id.values()
+        hits = {}
+        for tag in tags:
+            for pattern in compiled:
+                if pattern.match(tag['name']) or (tag['value'] != tag['name'] and pattern.match(tag['value'])):
+                    hits[tag['value']] = tag['id']
+                    break
+        return dict(sorted(hits.items()))
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
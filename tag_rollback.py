@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+import glob
+from itertools import islice
+from typing import Iterator
+
+import requests
+
+import console_garnish as cg
+from immich_client import client_for, ImmichApiError
+from immich_mirror import mirror_for
+from rollback_store import iter_rollback, export_json
+from progress import Progress
+from reused_tools import recursive_number_input, recursive_minimum_str_input, concurrent_map
+
+ROLLBACK_CHUNK_SIZE = 1000 # asset ids per PUT tags/assets
+ROLLBACK_WORKERS = 8 # chunks in flight at the same time
+ROLLBACK_TAG_BATCH = 200 # tags read from the file and created at once, keeps memory bounded
+
+
+def _iter_rollback_file(path: str) -> Iterator[tuple[str, list]]:
+    """
+    Streams the tags of a rollback file (.jsonl.gz or old .json), the file is never loaded as a whole
+
+    :param path: path to the rollback file
+    :return: generator of (tag name, [AssetUUID, ...])
+    """
+    for name, asset_ids in iter_rollback(path):
+        yield name, asset_ids or [] # a failed snapshot was saved as false
+
+
+def _count_rollback_file(path: str) -> tuple[int, int]:
+    """
+    :param path: path to the rollback file
+    :return: (number of tags, number of tag assignments)
+    """
+    tags = assignments = 0
+    for name, asset_ids in _iter_rollback_file(path):
+        tags += 1
+        assignments += len(asset_ids)
+    return tags, assignments
+
+
+def _existing_tags(creds: dict) -> dict:
+    """
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: dictionary {value: UUID}, value being the full path like Parent/Child
+    """
+    resp = client_for(creds).get("tags")
+    resp.raise_for_status()
+    return {tag.get('value') or tag['name']: tag['id'] for tag in resp.json()}
+
+
+def _upsert_tags(creds: dict, values: list) -> dict:
+    """
+    Creates all tags that don't exist yet in one call, parents of hierarchical values
+    like "Places/Berlin" are created by Immich along the way
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param values: list of tag values
+    :return: dictionary {value: UUID} for all of them
+    """
+    resp = client_for(creds).put("tags", {'tags': values})
+    if resp.status_code != 200:
+        raise ImmichApiError(f"PUT tags: {resp.status_code} - {resp.text}", resp)
+    return {tag.get('value') or tag['name']: tag['id'] for tag in resp.json()}
+
+
+def _tag_assets_chunk(creds: dict, tag_id: str, asset_ids: list) -> str | None:
+    """
+    Puts one tag on a chunk of assets via the bulk endpoint
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param tag_id: UUID of the tag
+    :param asset_ids: list of asset UUIDs
+    :return: None if it worked, otherwise the error text
+    """
+    try:
+        resp = client_for(creds).put("tags/assets", {'tagIds': [tag_id], 'assetIds': asset_ids})
+    except requests.exceptions.RequestException as err: # * runs in a worker, one dead chunk shouldn't end the restore
+        return f"no answer - {err}"
+    if resp.status_code != 200:
+        return f"{resp.status_code} - {resp.text}"
+    return None
+
+
+def _already_tagged(creds: dict, tag_id: str) -> set:
+    """
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param tag_id: UUID of an existing tag
+    :return: set of asset UUIDs that carry it right now
+    """
+    tagged = set()
+    for page in client_for(creds).search_ids({'tagIds': [tag_id]}, 1000):
+        tagged.update(page)
+    return tagged
+
+
+def restore_rollback(creds: dict, path: str, workers: int = ROLLBACK_WORKERS,
+                     chunk_size: int = ROLLBACK_CHUNK_SIZE, on_progress=None) -> dict:
+    """
+    Recreates the tags of a rollback file and puts them back on their assets. The file is read
+    in batches of tags, every batch gets its missing tags created in one call and then all its
+    assignments are sent in chunks, several at the same time
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param path: path to the rollback file
+    :param workers: parallel calls
+    :param chunk_size: asset ids per bulk call
+    :param on_progress: called as on_progress(tags_done, assignments_done, errors) after each batch
+    :return: statistics {'tags', 'created', 'assigned', 'skipped', 'errors': {name: message}}
+    """
+    stats = {'tags': 0, 'created': 0, 'assigned': 0, 'skipped': 0, 'errors': {}}
+    handled = 0 # assignments done, skipped or failed, only for on_progress
+    known = _existing_tags(creds)
+    entries = _iter_rollback_file(path)
+
+    def already_tagged(name: str) -> set:
+        try:
+            return _already_tagged(creds, known[name])
+        except (ImmichApiError, requests.exceptions.RequestException): # * PUT tags/assets doesn't mind assets that have it already, so just send all
+            return set()
+
+    while batch := list(islice(entries, ROLLBACK_TAG_BATCH)):
+        missing = [name for name, asset_ids in batch if name not in known]
+        if missing:
+            try:
+                known.update(_upsert_tags(creds, missing))
+                stats['created'] += len(missing)
+            except ImmichApiError as err:
+                for name in missing:
+                    stats['errors'][name] = str(err)
+        restorable = [(name, asset_ids) for name, asset_ids in batch if name in known]
+        # * only tags that were there before can already carry some of the assets
+        existing = [name for name, asset_ids in restorable if name not in missing]
+        tagged_lists = concurrent_map(already_tagged, existing, workers)
+        already = dict(zip(existing, tagged_lists))
+        jobs = []
+        for name, asset_ids in restorable:
+            todo = [asset_id for asset_id in asset_ids if asset_id not in already.get(name, ())]
+            stats['skipped'] += len(asset_ids) - len(todo)
+            for i in range(0, len(todo), chunk_size):
+                jobs.append((name, todo[i:i + chunk_size]))
+        results = concurrent_map(lambda job: _tag_assets_chunk(creds, known[job[0]], job[1]), jobs, workers)
+        for (name, chunk), error in zip(jobs, results):
+            if error:
+                stats['errors'][name] = error
+            else:
+                stats['assigned'] += len(chunk)
+        stats['tags'] += len(batch)
+        handled += sum(len(asset_ids) for name, asset_ids in batch)
+        if on_progress:
+            on_progress(stats['tags'], handled, len(stats['errors']))
+    if mirror := mirror_for(creds):
+        mirror.clear() # tags and ids changed underneath it, next run syncs from scratch
+    return stats
+
+
+def tag_rollback(creds: dict) -> bool:
+    """
+    Console driven dialogue to roll back a tag deletion done by tag_delete_by_regex
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :return: True if the rollback ran, False if aborted
+    """
+    print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
+    print("Let's undo some tag deletions.")
+    print(cg.color("Note: Tags that don't exist anymore are recreated, then put back on every asset that had them.", "grey"))
+    files = sorted(glob.glob("TagRollback*.json") + glob.glob("TagRollback*.jsonl.gz"),
+                   reverse=True) # newest first, thanks to the timestamp
+    ###
+    ### DECISION: ROLLBACK FILE
+    ###
+    print(cg.color("Choose a rollback file:", "bold"))
+    for i, file_name in enumerate(files, 1):
+        print(f"{i} - {file_name}")
+    print("0 - Enter a path manually")
+    number = recursive_number_input(0, len(files))
+    if number == 0:
+        path = recursive_minimum_str_input("Rollback file: ", 1)
+    else:
+        path = files[number - 1]
+    try:
+        tag_count, assignment_count = _count_rollback_file(path)
+    except (OSError, ValueError) as err:
+        print(f"Error: {cg.color(f"Could not read {path}: {err}", "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    ###
+    ### DECISION: GO OR NO GO
+    ###
+    print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
+    print(f"{path} contains {tag_count} tags with {assignment_count} tag assignments.")
+    print(cg.color(f"Note: Assignments are sent in chunks of {ROLLBACK_CHUNK_SIZE}, {ROLLBACK_WORKERS} at a time.", "grey"))
+    print("1 - Restore tags")
+    print("2 - <Abort/Quit>")
+    if path.endswith(".gz"):
+        print("3 - Export as plain JSON (the old format) and quit")
+    number = recursive_number_input(1, 3 if path.endswith(".gz") else 2)
+    if number == 2:
+        return False
+    if number == 3:
+        json_path = path.removesuffix(".jsonl.gz") + ".json"
+        exported = export_json(path, json_path)
+        print(f"Exported {exported} tags to {json_path}")
+        input("Press the ENTER key to continue")
+        return False
+    with Progress() as progress:
+        tag_bar = progress.bar("TAG", tag_count)
+        assignment_bar = progress.bar("SET", assignment_count)
+
+        def on_progress(tags_done: int, assignments_done: int, errors: int):
+            tag_bar.update(tags_done, errors=errors)
+            assignment_bar.update(assignments_done)
+
+        stats = restore_rollback(creds, path, on_progress=on_progress)
+    print(f"Restored {stats['tags']} tags ({stats['created']} recreated), {stats['assigned']} assignments sent, "
+          f"{stats['skipped']} were already there", end="")
+    if not stats['errors']:
+        print(" with no errors.")
+    else:
+        print(f", with {len(stats['errors'])} errors. Listing:")
+        for name, message in stats['errors'].items():
+            print(f"\t{name} - {message}")
+    input("Press the ENTER key to continue")
+    return not stats['errors']
+
+
+
+def tag_rollback_headless(creds: dict, path: str, assume_yes: bool = False) -> bool:
+    """
+    The same as tag_rollback without asking anything, for cron and batch files.
+    Without assume_yes it only counts what is in the file.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param path: path to the rollback file
+    :param assume_yes: actually restore, otherwise it is a dry run
+    :return: True if everything went fine
+    """
+    try:
+        tag_count, assignment_count = _count_rollback_file(path)
+    except (OSError, ValueError) as err:
+        print(cg.color(f"[rollback] Could not read {path}: {err}", "pure_red"))
+        return False
+    print(f"[rollback] {path} contains {tag_count} tags with {assignment_count} tag assignments")
+    if not assume_yes:
+        print("[rollback] Dry run, nothing restored. Add --yes to restore.")
+        return True
+    stats = restore_rollback(creds, path)
+    print(f"[rollback] Restored {stats['tags']} tags ({stats['created']} recreated), {stats['assigned']} assignments "
+          f"sent, {stats['skipped']} were already there, {len(stats['errors'])} errors")
+    for name, message in stats['errors'].items():
+        print(f"\t{name} - {message}")
+    return not stats['errors']
+
+
+if __name__ == "__main__":
+    print("This file is part of TemporarImmichHelp, but does nothing in itself. Run main.py")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Run with: python -m unittest
+
+import unittest
+
+from api_metrics import quantile
+
+
+class QuantileTest(unittest.TestCase):
+
+    def test_nearest_rank_when_q_times_n_is_odd(self):
+        # * n=6, q=0.5: rank ceil(3) = 3, round(3.5) used to give 4
+        self.assertEqual(quantile([1, 2, 3, 4, 5, 6], 0.5), 3)
+        self.assertEqual(quantile(list(range(1, 11)), 0.9), 9)
+        self.assertEqual(quantile([1, 2], 0.5), 1)
+
+    def test_ends(self):
+        values = [10, 20, 30]
+        self.assertEqual(quantile(values, 0.0), 10)
+        self.assertEqual(quantile(values, 1.0), 30)
+        self.assertEqual(quantile([7], 0.99), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
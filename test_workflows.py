@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2025 by BurnoutDV, <development@burnoutdv.com>
+#
+# This file is part of TemporaryImmichHelp.
+#
+# TemporaryImmichHelp is free software: you can redistribute
+# it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# TemporaryImmichHelp is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+# of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
+
+# Run with: python -m unittest
+#
+# The workflows end to end against the fake instance of fake_immich.py, journals and rollback
+# files end up in a temporary folder.
+
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import unittest
+
+from fake_immich import FakeImmichServer, FaultInjection, build_library
+from immich_client import client_for, close_all_clients
+from op_journal import OperationJournal, DONE, FAILED, UNSAVED
+from tag_delete_by_regex import tag_delete_headless, resume_tag_deletion
+from tag_rollback import restore_rollback
+
+TAG_REGEX = r"^0\.0" # the first ten of the 20 tags of build_library
+
+
+def _tagged(library, prefix: str = "0.0") -> dict:
+    """
+    :return: {tag value: frozenset of asset UUIDs} of the tags in the fake library starting with prefix
+    """
+    members = {tag_id: set() for tag_id, tag in library.tags.items() if tag['value'].startswith(prefix)}
+    for asset_id, tag_ids in library.asset_tags.items():
+        for tag_id in tag_ids & members.keys():
+            members[tag_id].add(asset_id)
+    return {library.tags[tag_id]['value']: frozenset(assets) for tag_id, assets in members.items()}
+
+
+def _journal(path: str) -> OperationJournal:
+    """
+    :return: the journal as it is on disk, closed again, only states, plan and meta are looked at
+    """
+    journal = OperationJournal.load(path)
+    journal.close()
+    return journal
+
+
+class WorkflowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.library = build_library(assets=200, tags=20)
+        self.faults = FaultInjection(retry_after=0.01)
+        self.fake = FakeImmichServer(self.library, faults=self.faults).start()
+        self.creds = self.fake.creds
+        self.here = os.getcwd()
+        self.work_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.work_dir.name)
+
+    def tearDown(self):
+        os.chdir(self.here)
+        close_all_clients()
+        self.fake.stop()
+        self.work_dir.cleanup()
+
+    def _delete(self) -> tuple[bool, OperationJournal]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = tag_delete_headless(self.creds, TAG_REGEX, assume_yes=True, snapshot_mode="per_tag")
+        return ok, _journal(glob.glob("Journal_tag_delete_*.jsonl")[0])
+
+
+class TagDeletionTest(WorkflowTest):
+
+    def test_throttled_run_deletes_everything(self):
+        self.faults.throttle_rate = 0.3
+        client_for(self.creds).max_retries = 20 # * 0.3**4 would still run out of retries now and then
+        ok, journal = self._delete()
+        self.assertTrue(ok)
+        self.assertGreater(self.faults.injected['throttled'], 0)
+        self.assertEqual(set(journal.states.values()), {DONE})
+        self.assertEqual(len(journal.states), 10)
+        self.assertEqual(_tagged(self.library), {})
+
+    def test_failing_run_keeps_what_it_could_not_do(self):
+        # * 500s aren't retried, every tag has to end up in a state a resume can work with
+        self.faults.failure_rate = 0.2
+        ok, journal = self._delete()
+        self.assertGreater(self.faults.injected['failed'], 0)
+        self.assertLessEqual(set(journal.states.values()), {DONE, FAILED, UNSAVED})
+        self.assertEqual(journal.states.keys(), journal.plan.keys())
+        self.assertEqual(ok, set(journal.states.values()) == {DONE})
+        left = _tagged(self.library)
+        for key, state in journal.states.items():
+            self.assertEqual(key in left, state != DONE, key)
+
+        self.faults.failure_rate = 0.0
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(resume_tag_deletion(self.creds, OperationJournal.load(journal.path)))
+        self.assertEqual(set(_journal(journal.path).states.values()), {DONE})
+        self.assertEqual(_tagged(self.library), {})
+
+
+class TagRollbackTest(WorkflowTest):
+
+    def test_rollback_restores_the_deleted_tags(self):
+        before = _tagged(self.library)
+        ok, journal = self._delete()
+        self.assertTrue(ok)
+        self.assertEqual(_tagged(self.library), {})
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = restore_rollback(self.creds, journal.meta['rollback'][0])
+        self.assertEqual(stats['errors'], {})
+        self.assertEqual(stats['tags'], len(before))
+        self.assertEqual(_tagged(self.library), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
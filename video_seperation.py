@@ -19,75 +19,168 @@
 #
 # @license GPL-3.0-only <https://www.gnu.org/licenses/gpl-3.0.en.html>
 
+import re
+
 import requests
-import json
 
 import console_garnish as cg
-from reused_tools import sizeof_fmt, recursive_number_input, recursive_minimum_str_input
+from asset_table import AssetTable
+from immich_client import client_for, ImmichApiError
+from immich_mirror import fresh_mirror
+from progress import Progress
+from reused_tools import sizeof_fmt, recursive_number_input, recursive_minimum_str_input, concurrent_map, \
+    recursive_input_regex
+
+ALBUM_FIELDS = ('id', 'type', 'createdAt', 'originalFileName', 'exifInfo.fileSizeInByte')
+ALBUM_CHUNK_SIZE = 1000 # asset ids per PUT albums/<id>/assets
+ALBUM_WORKERS = 4 # chunks or albums in flight at the same time
 
-def _fetch_videos_of_album(creds: dict, album_uuid: str) -> None | dict:
+
+def _fetch_videos_of_album(creds: dict, album_uuid: str, on_message=print) -> AssetTable | None:
     """
-    Sends an API call and checks if the album actually exists.
+    Sends an API call and checks if the album actually exists. The server only hands out the
+    videos (type VIDEO in search/metadata), page by page with only the fields needed here
 
     :param creds:  Credential dictionary {'instance': <url>, 'api_key': <key>}
     :param album_uuid: Immich Album UUID
-    :return: None if the UUID didn't yield, or a dict {AssetUUID: {'createdAt', 'fileSize', 'fileName'}
-    """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = f"{INSTANCE}albums/{album_uuid}"
-
-    payload = {}
-    headers = {
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    response = requests.request("GET", url, headers=headers, data=payload)
-    if response.status_code != 200: # so success
+    :param on_message: see fresh_mirror
+    :return: None if the UUID didn't yield, or an AssetTable of the videos
+    """
+    video_files = AssetTable()
+    if (mirror := fresh_mirror(creds, on_message)) and mirror.has_album(album_uuid):
+        for row in mirror.album_assets(album_uuid, "VIDEO"):
+            video_files.add(row[0], row[1], row[3], row[4], row[2])
+        return video_files
+    client = client_for(creds)
+    if client.album_info(album_uuid) is None:
         return None
-    album_info = response.json()
-    video_files = {}
-    for asset in album_info['assets']:
-        if asset['type'] == "VIDEO":
-            video_files[asset['id']] = {'createdAt': asset['createdAt'],
-                                        'fileSize': asset['exifInfo']['fileSizeInByte'],
-                                        'fileName': asset['originalFileName']}
+    for page in client.album_asset_pages(album_uuid, ALBUM_FIELDS, query={'type': "VIDEO"}):
+        for asset in page:
+            video_files.add(asset['id'], asset['type'], asset['exifInfo.fileSizeInByte'], asset['createdAt'],
+                            asset['originalFileName'])
     return video_files
 
-def _put_assets_in_new_album(creds: dict, new_album_name: str, *asset_uuids) -> bool:
+
+def _fetch_videos_of_albums(creds: dict, album_uuids: list, workers: int = ALBUM_WORKERS,
+                            on_progress=None, on_message=print) -> tuple[AssetTable, list]:
     """
-    Does what it says in the title..it also creates the album in the first place, but this is all one
-    API call which makes it very convinient, needs the `album.create` permission
+    The videos of several albums, the albums are scanned at the same time. A video that sits in
+    more than one of them is only counted once.
 
-    In theory it would probably be wise if it would give back the new albums UUID, but in this context its not needed
-    For future reference, its response.json()['id'] if status_code is 201
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param album_uuids: list of Immich Album UUIDs
+    :param workers: albums scanned at the same time
+    :param on_progress: called as on_progress(albums_done, albums_total)
+    :param on_message: see fresh_mirror
+    :return: (AssetTable of the videos, [UUIDs of albums that didn't yield])
+    """
+    album_uuids = list(dict.fromkeys(album_uuids))
+    video_files = AssetTable()
+    missing = []
+    results = concurrent_map(lambda album_uuid: _fetch_videos_of_album(creds, album_uuid, on_message),
+                             album_uuids, workers, on_progress)
+    for album_uuid, album_videos in zip(album_uuids, results):
+        if album_videos is None:
+            missing.append(album_uuid)
+        else:
+            video_files.extend(album_videos)
+    return video_files, missing
+
+
+def _list_albums(creds: dict, name_regex: str | None = None) -> list[dict] | None:
+    """
+    All albums of the key owner, GET albums comes without the assets
 
     :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
-    :param new_album_name: any one string, probably with a max length, shouldn't be blank
-    :param asset_uuids: a list of uuids of existing assets
-    :return: True or False whether this whole operation worked, no details
+    :param name_regex: only albums whose name matches (re.match), like the "Camera" auto upload albums
+    :return: list of {'id', 'albumName', 'assetCount'} sorted by name, None if the call failed
+    """
+    resp = client_for(creds).get("albums")
+    if resp.status_code != 200:
+        return None
+    pattern = re.compile(name_regex) if name_regex else None
+    albums = [{'id': album['id'], 'albumName': album['albumName'], 'assetCount': album.get('assetCount', 0)}
+              for album in resp.json() if not pattern or pattern.match(album['albumName'])]
+    return sorted(albums, key=lambda album: album['albumName'])
+
+
+def _create_album(creds: dict, new_album_name: str, description: str = "Album of only videos") -> str | None:
     """
-    API_KEY = creds['api_key']
-    INSTANCE = creds['instance']
-    url = f"{INSTANCE}albums"
+    Creates an empty album, needs the `album.create` permission
 
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param new_album_name: any one string, probably with a max length, shouldn't be blank
+    :param description: album description
+    :return: the UUID of the new album or None if it didn't work
+    """
     # ! despite the docs saying something different, you actually don't have to specify the owner of the album
     # ! it just defaults to the owner of the API key which is the desired behaviour anyway
-    payload = json.dumps({
-        "albumName": new_album_name,
-        "assetIds": asset_uuids,
-        "description": "Album of only videos"
-    })
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'x-api-key': API_KEY
-    }
-    response = requests.request("POST", url, headers=headers, data=payload)
+    response = client_for(creds).post("albums", {"albumName": new_album_name, "description": description})
     if response.status_code == 201:
-        return True # * the response contains the entire new album and in theory we could check if everything is there
-    return False
-    # 201 on success
+        return response.json()['id']
+    return None
+
+
+def _add_assets_chunk(creds: dict, album_uuid: str, asset_uuids: list) -> list[dict]:
+    """
+    One PUT albums/<id>/assets, needs the `albumAsset.create` permission
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param album_uuid: the target album
+    :param asset_uuids: a chunk of asset UUIDs
+    :return: per id result [{'id', 'success', 'error'}], a refused call gives an error for every id of the chunk
+    """
+    try:
+        response = client_for(creds).put(f"albums/{album_uuid}/assets", {'ids': asset_uuids})
+    except requests.exceptions.RequestException as err: # * runs in a worker, the other chunks go on
+        return [{'id': asset_uuid, 'success': False, 'error': f"no answer - {err}"} for asset_uuid in asset_uuids]
+    if response.status_code != 200:
+        error = f"{response.status_code} - {response.text}"
+        return [{'id': asset_uuid, 'success': False, 'error': error} for asset_uuid in asset_uuids]
+    return response.json()
+
+
+def _put_assets_in_new_album(creds: dict, new_album_name: str, *asset_uuids,
+                             chunk_size: int = ALBUM_CHUNK_SIZE, workers: int = ALBUM_WORKERS,
+                             on_progress=None) -> tuple[str | None, dict]:
+    """
+    Does what it says in the title. The album is created empty first, then the assets are added
+    in chunks, several at the same time, instead of one giant body that might get refused as a whole
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param new_album_name: any one string, probably with a max length, shouldn't be blank
+    :param asset_uuids: a list of uuids of existing assets
+    :param chunk_size: asset ids per call
+    :param workers: calls in flight at the same time
+    :param on_progress: called as on_progress(chunks_done, chunks_total)
+    :return: (UUID of the new album or None if it couldn't be created,
+              {'added': n, 'duplicate': n, 'failed': {AssetUUID: error}})
+    """
+    report = {'added': 0, 'duplicate': 0, 'failed': {}}
+    album_uuid = _create_album(creds, new_album_name)
+    if album_uuid is None:
+        return None, report
+    chunks = [list(asset_uuids[i:i + chunk_size]) for i in range(0, len(asset_uuids), chunk_size)]
+    for results in concurrent_map(lambda chunk: _add_assets_chunk(creds, album_uuid, chunk), chunks, workers, on_progress):
+        for result in results:
+            if result.get('success'):
+                report['added'] += 1
+            elif result.get('error') == "duplicate": # * already in there, not really a failure
+                report['duplicate'] += 1
+            else:
+                report['failed'][result['id']] = result.get('error', "unknown")
+    return album_uuid, report
+
+
+def _print_album_report(album_uuid: str, report: dict, prefix: str = "") -> None:
+    print(f"{prefix}Album {album_uuid}: {report['added']} videos added, {report['duplicate']} were already in it", end="")
+    if not report['failed']:
+        print(", no errors.")
+        return
+    print(f", {len(report['failed'])} failed:")
+    for asset_uuid, error in report['failed'].items():
+        print(f"\t{asset_uuid} - {error}")
+
 
 def video_seperation(creds: dict) -> bool:
     """
@@ -97,34 +190,59 @@ def video_seperation(creds: dict) -> bool:
     :return: True if the deed was done, False if not
     """
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
-    print(cg.color("Note: First we fetch an album, then we extract all videos, some decisions, and then we create an album. The rest is up to you.", "grey"))
-    album_uuid = recursive_minimum_str_input("Album UUID: ", 35) # ? one would actually need
-    album_videos = _fetch_videos_of_album(creds, album_uuid)                 # ? recursive_str_input_validated_by_regex
-    if not album_uuid:
+    print(cg.color("Note: First we fetch the videos of one or more albums, then some decisions, and then we create an album. The rest is up to you.", "grey"))
+    ###
+    ### DECISION: SOURCE ALBUMS
+    ###
+    print("Where do the videos come from?")
+    print("1 - Album UUIDs (one or more, separated by spaces)")
+    print("2 - All albums whose name matches a regex (like the auto upload ones)")
+    print("3 - <Abort/Quit>")
+    number = recursive_number_input(1, 3)
+    if number == 3:
+        return False
+    if number == 1:
+        album_uuids = recursive_minimum_str_input("Album UUIDs: ", 35).replace(",", " ").split() # ? one would actually need
+    else:                                                                                      # ? recursive_str_input_validated_by_regex
+        albums = _list_albums(creds, recursive_input_regex("Album name regex (empty for all): "))
+        for album in albums or []:
+            print(f"\t{album['albumName']} - {album['assetCount']} assets")
+        album_uuids = [album['id'] for album in albums or []]
+    try:
+        with Progress() as progress:
+            album_videos, missing = _fetch_videos_of_albums(creds, album_uuids, on_progress=progress.bar("ALB").update,
+                                                            on_message=progress.print)
+    except ImmichApiError as err: # * anything but the 400 of a server that can't search by album
+        print(f"Error: {cg.color(str(err), "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    if missing or not album_uuids:
         ###
         ### DECISION
         ###
         print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
-        print(f"Error: {cg.color("The request came back without data, try again?", "pure_red")}")
+        print(f"Error: {cg.color(f"{len(missing)} of {len(album_uuids)} albums came back without data, try again?", "pure_red")}")
+        for album_uuid in missing:
+            print(f"\t{album_uuid}")
         print(cg.color("Note: We don't debug here. At this point the API Endpoint, key and rights should be okay. But a wrong UUID is not the only possibility for a bad request here.", "grey"))
-        print("1 - Retry (with a different album UUID)")
+        print("1 - Retry (with different albums)")
         print("2 - <Abort/Quit>")
-        number = recursive_number_input(1, 2)
+        if album_videos:
+            print("3 - Continue without them")
+        number = recursive_number_input(1, 3 if album_videos else 2)
         if number == 2:
             return False
-        else:
+        if number == 1:
             return video_seperation(creds)
     # * Calculating total file size..for now reason at all
-    kumo_size = 0 # byte
-    for item in album_videos.values():
-        kumo_size+= int(item['fileSize'])
+    kumo_size = album_videos.total_size() # byte
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
-    print(f"Found {len(album_videos)} videos in the provided album, with a total size of {sizeof_fmt(kumo_size)}.")
+    print(f"Found {len(album_videos)} videos in {len(album_uuids) - len(missing)} albums, with a total size of {sizeof_fmt(kumo_size)}.")
     ###
     ### DECISION:
     ###
     print("Make a choice:")
-    print("1 - List all Entries (in 500 Batches)")
+    print("1 - List all Entries, oldest first (in 500 Batches)")
     print("2 - Continue")
     print("3 - <Abort/Quit>")
     number = recursive_number_input(1, 3)
@@ -132,8 +250,8 @@ def video_seperation(creds: dict) -> bool:
         return False
     if number == 1:
         print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
-        for i, asset in enumerate(album_videos.values()):
-            print(f"[{i}] {asset['fileName']}, {sizeof_fmt(asset['fileSize'])} - {asset['createdAt']}")
+        for i, asset in enumerate(album_videos.records(album_videos.sorted_rows("created"))):
+            print(f"[{i}] {asset.name}, {sizeof_fmt(asset.size)} - {asset.created_at}")
             if i and i % 500 == 0:
                 print(f"Haltpoint - More entries ({(len(album_videos) - i)}) to come, press ENTER")
                 input()
@@ -148,4 +266,57 @@ def video_seperation(creds: dict) -> bool:
     print(f"\x1b[2J\033[H{cg.color("Temporary Immich Help Scripts", "bright_purple")}")
     print("Choose a name for the new album")
     new_album_name = recursive_minimum_str_input("Album Name: ")
-    return _put_assets_in_new_album(creds, new_album_name, *album_videos.keys())
\ No newline at end of file
+    with Progress() as progress:
+        album_uuid, report = _put_assets_in_new_album(creds, new_album_name, *album_videos.ids,
+                                                      on_progress=progress.bar("ADD").update)
+    if album_uuid is None:
+        print(f"Error: {cg.color(f"Album '{new_album_name}' could not be created", "pure_red")}")
+        input("Press the ENTER key to continue")
+        return False
+    _print_album_report(album_uuid, report)
+    input("Press the ENTER key to continue")
+    return not report['failed']
+
+
+def video_seperation_headless(creds: dict, album_uuids: list | None, new_album_name: str, assume_yes: bool = False,
+                              name_regex: str | None = None) -> bool:
+    """
+    The same as video_seperation without asking anything, for cron and batch files.
+    Without assume_yes it only reports what it found.
+
+    :param creds: Credential dictionary {'instance': <url>, 'api_key': <key>}
+    :param album_uuids: Immich Album UUIDs of the mixed albums
+    :param new_album_name: name of the album that gets created
+    :param assume_yes: actually create the album, otherwise it is a dry run
+    :param name_regex: additionally every album whose name matches, "" means all albums
+    :return: True if everything went fine
+    """
+    album_uuids = list(album_uuids or [])
+    if name_regex is not None:
+        if (albums := _list_albums(creds, name_regex)) is None:
+            print(cg.color("[videos] The albums could not be listed", "pure_red"))
+            return False
+        print(f"[videos] {len(albums)} albums match '{name_regex}'")
+        album_uuids += [album['id'] for album in albums]
+    try:
+        album_videos, missing = _fetch_videos_of_albums(creds, album_uuids)
+    except ImmichApiError as err:
+        print(cg.color(f"[videos] {err}", "pure_red"))
+        return False
+    for album_uuid in missing:
+        print(cg.color(f"[videos] Album {album_uuid} could not be fetched", "pure_red"))
+    if missing:
+        return False
+    kumo_size = album_videos.total_size()
+    print(f"[videos] Found {len(album_videos)} videos in {len(set(album_uuids))} albums, with a total size of {sizeof_fmt(kumo_size)}.")
+    if not album_videos:
+        return True
+    if not assume_yes:
+        print(f"[videos] Dry run, no album created. Add --yes to create '{new_album_name}'.")
+        return True
+    album_uuid, report = _put_assets_in_new_album(creds, new_album_name, *album_videos.ids)
+    if album_uuid is None:
+        print(cg.color(f"[videos] Creating album '{new_album_name}' failed", "pure_red"))
+        return False
+    _print_album_report(album_uuid, report, f"[videos] Created album '{new_album_name}'. ")
+    return not report['failed']